@@ -0,0 +1,18 @@
+from django.contrib import admin
+from .models import BillingEntry, MonthlySettlement
+
+
+# -------------------------- 计费流水 Admin 配置 --------------------------
+@admin.register(BillingEntry)
+class BillingEntryAdmin(admin.ModelAdmin):
+    list_display = ('booking', 'applicant', 'entry_type', 'unit_price', 'slot_count', 'amount', 'created_at')
+    list_filter = ('entry_type', 'created_at')
+    search_fields = ('booking__booking_code', 'applicant__name')
+    readonly_fields = ('created_at',)
+
+
+# -------------------------- 月度结算 Admin 配置 --------------------------
+@admin.register(MonthlySettlement)
+class MonthlySettlementAdmin(admin.ModelAdmin):
+    list_display = ('month', 'charge_total', 'refund_total', 'net_total', 'charge_count', 'refund_count', 'generated_at')
+    readonly_fields = ('generated_at',)
@@ -0,0 +1,46 @@
+"""
+月度结算命令（按计费流水汇总收费、退款与净收入）
+使用方法：python manage.py monthly_settlement [--month YYYY-MM]
+建议每月1日通过定时任务运行一次，结算上一个月
+"""
+import time as time_module
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from billing.utils import settle_month
+
+
+class Command(BaseCommand):
+    help = '按计费流水生成月度结算'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month',
+            type=str,
+            help='结算月份（格式：YYYY-MM，默认上个月）',
+        )
+
+    def handle(self, *args, **options):
+        month_input = options.get('month')
+
+        if month_input:
+            try:
+                month_start = datetime.strptime(month_input, '%Y-%m').date()
+            except ValueError:
+                self.stdout.write(self.style.ERROR('月份格式错误，应为 YYYY-MM'))
+                return
+        else:
+            # 上个月1日
+            month_start = (timezone.localdate().replace(day=1) - timedelta(days=1)).replace(day=1)
+
+        started = time_module.perf_counter()
+        settlement = settle_month(month_start)
+        elapsed = time_module.perf_counter() - started
+
+        self.stdout.write(f'  收费：{settlement.charge_count} 笔，合计 {settlement.charge_total} 元')
+        self.stdout.write(f'  退款：{settlement.refund_count} 笔，合计 {settlement.refund_total} 元')
+        self.stdout.write(self.style.SUCCESS(
+            f'{month_start:%Y-%m} 结算完成，净收入 {settlement.net_total} 元，耗时 {elapsed:.3f} 秒'
+        ))
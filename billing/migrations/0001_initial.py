@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:04
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('booking', '0007_booking_expiry'),
+        ('user', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlySettlement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True, verbose_name='结算月份')),
+                ('charge_total', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12, verbose_name='收费合计（元）')),
+                ('refund_total', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12, verbose_name='退款合计（元）')),
+                ('net_total', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12, verbose_name='净收入（元）')),
+                ('charge_count', models.IntegerField(default=0, verbose_name='收费笔数')),
+                ('refund_count', models.IntegerField(default=0, verbose_name='退款笔数')),
+                ('generated_at', models.DateTimeField(auto_now=True, verbose_name='生成时间')),
+            ],
+            options={
+                'verbose_name': '月度结算',
+                'verbose_name_plural': '月度结算',
+                'ordering': ['-month'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BillingEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_type', models.CharField(choices=[('charge', '收费'), ('refund', '退款')], max_length=10, verbose_name='流水类型')),
+                ('unit_price', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=10, verbose_name='单价（元/2小时）')),
+                ('slot_count', models.PositiveSmallIntegerField(default=1, verbose_name='时段数')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='金额（元）')),
+                ('remark', models.CharField(blank=True, max_length=200, null=True, verbose_name='备注')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='记账时间')),
+                ('applicant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='user.userinfo', verbose_name='付费人')),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='billing_entries', to='booking.booking', verbose_name='关联预约')),
+                ('operator', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='操作人')),
+            ],
+            options={
+                'verbose_name': '计费流水',
+                'verbose_name_plural': '计费流水',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at', 'entry_type'], name='billing_bil_created_299382_idx')],
+                'constraints': [models.UniqueConstraint(fields=('booking', 'entry_type'), name='uniq_billing_entry_per_booking')],
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+from decimal import Decimal
+
+from django.db import models
+from django.contrib.auth.models import User
+
+from booking.models import Booking
+from user.models import UserInfo
+
+
+class BillingEntry(models.Model):
+    """计费流水：预约全部审批通过时记一笔收费，撤销时记一笔退款（金额为负）"""
+    ENTRY_TYPE_CHOICES = (
+        ('charge', '收费'),
+        ('refund', '退款'),
+    )
+
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='billing_entries', verbose_name='关联预约')
+    applicant = models.ForeignKey(UserInfo, on_delete=models.CASCADE, verbose_name='付费人')
+    entry_type = models.CharField(max_length=10, choices=ENTRY_TYPE_CHOICES, verbose_name='流水类型')
+    # 审批通过时的单价快照（元/2小时），之后设备调价不影响历史流水
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0'), verbose_name='单价（元/2小时）')
+    slot_count = models.PositiveSmallIntegerField(default=1, verbose_name='时段数')
+    amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='金额（元）')
+    operator = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='操作人')
+    remark = models.CharField(max_length=200, blank=True, null=True, verbose_name='备注')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='记账时间')
+
+    class Meta:
+        verbose_name = '计费流水'
+        verbose_name_plural = '计费流水'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'entry_type']),
+        ]
+        constraints = [
+            # 每个预约最多一笔收费、一笔退款
+            models.UniqueConstraint(fields=['booking', 'entry_type'], name='uniq_billing_entry_per_booking'),
+        ]
+
+    def __str__(self):
+        return f"{self.booking.booking_code} {self.get_entry_type_display()} {self.amount}"
+
+
+class MonthlySettlement(models.Model):
+    """月度结算：由 monthly_settlement 命令按计费流水汇总生成"""
+    month = models.DateField(unique=True, verbose_name='结算月份')  # 存每月1日
+    charge_total = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0'), verbose_name='收费合计（元）')
+    refund_total = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0'), verbose_name='退款合计（元）')
+    net_total = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0'), verbose_name='净收入（元）')
+    charge_count = models.IntegerField(default=0, verbose_name='收费笔数')
+    refund_count = models.IntegerField(default=0, verbose_name='退款笔数')
+    generated_at = models.DateTimeField(auto_now=True, verbose_name='生成时间')
+
+    class Meta:
+        verbose_name = '月度结算'
+        verbose_name_plural = '月度结算'
+        ordering = ['-month']
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} 净收入 {self.net_total}"
@@ -0,0 +1,107 @@
+from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
+
+from booking.models import Booking
+from devices.models import Device
+from user.models import UserInfo
+from billing.models import BillingEntry
+from billing.utils import booking_charge_amount, can_cancel, record_charge, record_refund, settle_month
+from labadmin.views import generate_report_data
+
+
+class BillingTestCase(TestCase):
+    """计费流水与月度结算测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        self.device = Device.objects.create(
+            device_code='DEV001', model='测试设备A', status='available',
+            price_internal=Decimal('50.00'), price_external=Decimal('100.00')
+        )
+        self.external = UserInfo.objects.create(
+            user_code='E001', name='王先生', user_type='external', department='外部公司', phone='13800138003'
+        )
+        self.teacher = UserInfo.objects.create(
+            user_code='T001', name='张老师', user_type='teacher', department='计算机学院', phone='13800138001'
+        )
+        self.booking = Booking.objects.create(
+            booking_code='BOOK20990101001', applicant=self.external, device=self.device,
+            booking_date=date.today() + timedelta(days=3), time_slot=4, slot_count=2, status='manager_approved'
+        )
+
+    def test_charge_snapshots_price(self):
+        """测试收费按审批时单价快照，之后调价不影响"""
+        entry = record_charge(self.booking)
+        self.assertEqual(entry.amount, Decimal('200.00'))
+        self.device.price_external = Decimal('999.00')
+        self.device.save()
+        self.assertEqual(record_charge(self.booking).amount, Decimal('200.00'))
+        self.assertEqual(BillingEntry.objects.count(), 1)
+
+    def test_internal_not_charged(self):
+        """测试校内人员不收费"""
+        self.booking.applicant = self.teacher
+        self.assertIsNone(record_charge(self.booking))
+
+    def test_refund_95_percent(self):
+        """测试撤销退款95%"""
+        self.assertIsNone(record_refund(self.booking))
+        record_charge(self.booking)
+        refund = record_refund(self.booking)
+        self.assertEqual(refund.amount, Decimal('-190.00'))
+
+    def test_cancel_deadline(self):
+        """测试需至少提前一天撤销"""
+        self.assertTrue(can_cancel(self.booking))
+        self.booking.booking_date = date.today()
+        self.assertFalse(can_cancel(self.booking))
+
+    def test_monthly_settlement(self):
+        """测试月度结算汇总"""
+        record_charge(self.booking)
+        record_refund(self.booking)
+        settlement = settle_month(date.today().replace(day=1))
+        self.assertEqual(settlement.charge_total, Decimal('200.00'))
+        self.assertEqual(settlement.refund_total, Decimal('190.00'))
+        self.assertEqual(settlement.net_total, Decimal('10.00'))
+        self.assertEqual((settlement.charge_count, settlement.refund_count), (1, 1))
+
+    def test_charged_amount_by_user_type(self):
+        """测试计费金额快照按用户类型取校内/校外价"""
+        self.assertEqual(booking_charge_amount(self.booking), Decimal('200.00'))
+        self.booking.applicant = self.teacher
+        self.assertEqual(booking_charge_amount(self.booking), Decimal('100.00'))
+
+    def test_report_revenue_uses_snapshot(self):
+        """测试收入统计汇总计费金额快照，调价不影响"""
+        self.booking.charged_amount = booking_charge_amount(self.booking)
+        self.booking.save()
+        self.device.price_external = Decimal('999.00')
+        self.device.save()
+        day = self.booking.booking_date
+        data = generate_report_data('daily', day, day)
+        self.assertEqual(data['summary']['total_revenue'], 200.0)
+        self.assertEqual(data['device_usage'][0]['revenue'], 200.0)
+
+    def test_report_revenue_matches_ledger(self):
+        """测试报表收入只统计收费的用户类型，与计费流水、月度结算一致"""
+        from labadmin.management.commands.generate_reports import Command
+
+        internal = Booking.objects.create(
+            booking_code='BOOK20990101002', applicant=self.teacher, device=self.device,
+            booking_date=self.booking.booking_date, time_slot=6, status='manager_approved'
+        )
+        for booking in (self.booking, internal):
+            booking.charged_amount = booking_charge_amount(booking)
+            booking.save()
+            record_charge(booking)
+        charged = sum(BillingEntry.objects.filter(entry_type='charge').values_list('amount', flat=True))
+        self.assertEqual(charged, Decimal('200.00'))
+
+        day = self.booking.booking_date
+        for data in (generate_report_data('daily', day, day), Command()._generate_report_data('week', day, day)):
+            self.assertEqual(data['summary']['total_revenue'], float(charged))
+            self.assertEqual(sum(item['revenue'] for item in data['device_usage']), float(charged))
+            self.assertEqual(data['summary']['approved_count'], 2)
+        self.assertEqual(settle_month(date.today().replace(day=1)).charge_total, charged)
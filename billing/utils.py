@@ -0,0 +1,121 @@
+"""
+计费记账：校外人员的预约全部审批通过时按当时的设备单价记收费流水，
+提前一天以上撤销已付费的预约时按收费金额的95%记退款流水。
+"""
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from devices.models import Device
+from .models import BillingEntry, MonthlySettlement
+
+# 退款比例
+REFUND_RATE = Decimal('0.95')
+# 需付费的用户类型（校内人员免费）
+PAID_USER_TYPES = ('external',)
+# 至少提前多少天撤销
+CANCEL_ADVANCE_DAYS = 1
+
+
+def price_field(user_type):
+    """按用户类型取设备价格字段：校外人员取校外价，其余取校内价"""
+    return 'price_external' if user_type in PAID_USER_TYPES else 'price_internal'
+
+
+def booking_unit_price(booking):
+    """预约的单价（元/2小时）：具体设备取设备价格，型号池预约取该型号设备的最高价格"""
+    field = price_field(booking.applicant.user_type)
+    if booking.device_id:
+        return getattr(booking.device, field)
+    if booking.device_type_id:
+        prices = Device.objects.filter(device_type_id=booking.device_type_id).values_list(field, flat=True)
+        return max(prices, default=Decimal('0'))
+    return Decimal('0')
+
+
+def booking_charge_amount(booking):
+    """预约全部审批通过时的计费金额快照：单价 × 连续时段数"""
+    return booking_unit_price(booking) * booking.slot_count
+
+
+def can_cancel(booking, today=None):
+    """撤销规则：需至少提前一天（预约日期晚于今天）"""
+    today = today or timezone.localdate()
+    return booking.booking_date >= today + timedelta(days=CANCEL_ADVANCE_DAYS)
+
+
+def record_charge(booking, operator=None):
+    """预约全部审批通过时记收费流水（校内人员不收费），返回流水或 None"""
+    if booking.applicant.user_type not in PAID_USER_TYPES:
+        return None
+    unit_price = booking_unit_price(booking)
+    # 优先使用审批通过时写入预约的金额快照
+    amount = booking.charged_amount if booking.charged_amount is not None else unit_price * booking.slot_count
+    entry, _ = BillingEntry.objects.get_or_create(
+        booking=booking,
+        entry_type='charge',
+        defaults={
+            'applicant': booking.applicant,
+            'unit_price': unit_price,
+            'slot_count': booking.slot_count,
+            'amount': amount,
+            'operator': operator,
+        },
+    )
+    return entry
+
+
+def record_refund(booking, operator=None):
+    """已收费的预约撤销时按95%记退款流水（金额为负），未收费时返回 None"""
+    charge = BillingEntry.objects.filter(booking=booking, entry_type='charge').first()
+    if charge is None:
+        return None
+    refund_amount = (charge.amount * REFUND_RATE).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    entry, _ = BillingEntry.objects.get_or_create(
+        booking=booking,
+        entry_type='refund',
+        defaults={
+            'applicant': booking.applicant,
+            'unit_price': charge.unit_price,
+            'slot_count': charge.slot_count,
+            'amount': -refund_amount,
+            'operator': operator,
+            'remark': f'提前撤销，按 {int(REFUND_RATE * 100)}% 退款',
+        },
+    )
+    return entry
+
+
+def month_range(month_start):
+    """某月1日 → (本月1日, 下月1日)"""
+    if month_start.month == 12:
+        return month_start, month_start.replace(year=month_start.year + 1, month=1)
+    return month_start, month_start.replace(month=month_start.month + 1)
+
+
+def settle_month(month_start):
+    """用一次分组查询汇总某月的计费流水，写入（或更新）月度结算"""
+    start, end = month_range(month_start)
+    rows = BillingEntry.objects.filter(
+        created_at__date__gte=start,
+        created_at__date__lt=end,
+    ).values('entry_type').annotate(total=Sum('amount'), count=Count('id'))
+    totals = {row['entry_type']: row for row in rows}
+
+    charge = totals.get('charge', {})
+    refund = totals.get('refund', {})
+    charge_total = charge.get('total') or Decimal('0')
+    refund_total = -(refund.get('total') or Decimal('0'))
+    settlement, _ = MonthlySettlement.objects.update_or_create(
+        month=start,
+        defaults={
+            'charge_total': charge_total,
+            'refund_total': refund_total,
+            'net_total': charge_total - refund_total,
+            'charge_count': charge.get('count', 0),
+            'refund_count': refund.get('count', 0),
+        },
+    )
+    return settlement
@@ -1,6 +1,6 @@
 # 假设模型在 booking app 下，路径为 booking/admin.py
 from django.contrib import admin
-from .models import Booking, ApprovalRecord  # 导入你的两个模型
+from .models import Booking, BookingSeries, ApprovalRecord, DeviceTypeSlotCounter, BookingWaitlist, SlotCatalog, InboxCounter  # 导入预约相关模型
 
 # -------------------------- 审批记录 内联显示配置 --------------------------
 # 让审批记录可以在预约申请页面直接查看/编辑（更友好）
@@ -15,29 +15,30 @@ class ApprovalRecordInline(admin.TabularInline):
 class BookingAdmin(admin.ModelAdmin):
     # 列表页显示的字段
     list_display = (
-        'booking_code', 'applicant', 'device', 'booking_date', 
-        'time_slot', 'status', 'create_time'
+        'booking_code', 'applicant', 'device', 'device_type', 'booking_date', 
+        'time_slot_label', 'status', 'create_time'
     )
     # 支持搜索的字段
     search_fields = ('booking_code', 'applicant__name', 'device__device_name', 'purpose')
     # 支持筛选的字段
     list_filter = ('status', 'booking_date', 'applicant__user_type')
     # 只读字段（自动生成/不允许手动修改的）
-    readonly_fields = ('create_time', 'update_time')
+    readonly_fields = ('charged_amount', 'create_time', 'update_time')
     # 详情页分组显示字段
     fieldsets = (
         ('基础信息', {
-            'fields': ('booking_code', 'applicant', 'device', 'booking_date', 'time_slot')
+            'fields': ('booking_code', 'applicant', 'device', 'device_type', 'booking_date', 'time_slot', 'slot_count')
         }),
         ('申请信息', {
-            'fields': ('purpose', 'teacher_id')
+            'fields': ('purpose', 'teacher_id', 'advisor')
         }),
         ('审批状态', {
-            'fields': ('status', 'create_time', 'update_time')
+            'fields': ('status', 'charged_amount', 'create_time', 'update_time')
         }),
     )
     # 内联显示审批记录（在预约申请详情页直接看审批记录）
     inlines = [ApprovalRecordInline]
+    raw_id_fields = ('advisor',)
 
 # -------------------------- 审批记录 Admin 配置 --------------------------
 @admin.register(ApprovalRecord)
@@ -53,5 +54,39 @@ class ApprovalRecordAdmin(admin.ModelAdmin):
     # 详情页显示的字段
     fields = ('booking', 'approver', 'approval_level', 'action', 'comment', 'approval_time')
 
+# -------------------------- 预约时段目录 Admin 配置 --------------------------
+@admin.register(SlotCatalog)
+class SlotCatalogAdmin(admin.ModelAdmin):
+    list_display = ('index', 'label', 'is_blackout', 'blackout_reason')
+    list_editable = ('label', 'is_blackout', 'blackout_reason')
+    ordering = ('index',)
+
+# -------------------------- 型号池时段计数 Admin 配置 --------------------------
+@admin.register(DeviceTypeSlotCounter)
+class DeviceTypeSlotCounterAdmin(admin.ModelAdmin):
+    list_display = ('device_type', 'booking_date', 'time_slot', 'reserved_count')
+    list_filter = ('device_type', 'booking_date')
+
+# -------------------------- 周期预约 Admin 配置 --------------------------
+@admin.register(BookingSeries)
+class BookingSeriesAdmin(admin.ModelAdmin):
+    list_display = ('applicant', 'device', 'time_slot_label', 'start_date', 'end_date', 'interval_weeks', 'create_time')
+    search_fields = ('applicant__name', 'device__device_code')
+
+# -------------------------- 候补队列 Admin 配置 --------------------------
+@admin.register(BookingWaitlist)
+class BookingWaitlistAdmin(admin.ModelAdmin):
+    list_display = ('booking', 'device', 'device_type', 'booking_date', 'time_slot', 'create_time')
+    list_filter = ('booking_date',)
+    search_fields = ('booking__booking_code',)
+
+# -------------------------- 审批收件箱计数 Admin 配置 --------------------------
+@admin.register(InboxCounter)
+class InboxCounterAdmin(admin.ModelAdmin):
+    # 计数随预约状态自动维护，不一致时用 rebuild_inbox_counters 命令重建
+    list_display = ('role', 'owner_key', 'count')
+    list_filter = ('role',)
+    readonly_fields = ('role', 'owner_key', 'count')
+
 # 如果你的模型不在 booking app 下，只需把导入路径改成正确的即可，比如：
 # from devices.models import Booking, ApprovalRecord
\ No newline at end of file
@@ -0,0 +1,48 @@
+"""
+指导教师审批：学生的预约先由指导教师审批，通过后进入管理员审批。
+学生与指导教师按外键关联（UserInfo.advisor_teacher / Booking.advisor），
+教师的待审批收件箱按 (advisor, status, create_time) 联合索引查询。
+"""
+from django.db import transaction
+
+from user.models import UserInfo
+from .models import ApprovalRecord, Booking
+from .waitlist import free_booking_slot
+
+
+def resolve_advisor(user_info, teacher_id=''):
+    """学生预约的指导教师：填写了教师编号时按编号查找，否则取学生已关联的指导教师"""
+    if user_info.user_type != 'student':
+        return None
+    if teacher_id:
+        return UserInfo.objects.filter(user_code=teacher_id, user_type='teacher').first()
+    return user_info.advisor_teacher
+
+
+def advisor_inbox(teacher):
+    """教师待审批的学生预约（按提交时间先后）"""
+    return Booking.objects.filter(
+        advisor=teacher,
+        status='advisor_pending',
+    ).select_related('applicant', 'device', 'device_type').order_by('create_time')
+
+
+def advisor_decide(booking, operator, action, comment=''):
+    """
+    指导教师审批：批准后转为待管理员审批，拒绝后释放时段并递补候补队首
+    返回被递补的预约（没有则为 None）
+    """
+    promoted = None
+    with transaction.atomic():
+        booking.status = 'pending' if action == 'approve' else 'advisor_rejected'
+        booking.save(update_fields=['status', 'update_time'])
+        ApprovalRecord.objects.create(
+            booking=booking,
+            approver=operator,
+            approval_level='advisor',
+            action=action,
+            comment=comment,
+        )
+        if action == 'reject':
+            promoted = free_booking_slot(booking)
+    return promoted
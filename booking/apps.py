@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BookingConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "booking"
+
+    def ready(self):
+        # 启动时编译预约规则表（规则配置有误时尽早报错）
+        from . import rules  # noqa: F401
@@ -0,0 +1,166 @@
+"""
+型号池设备单元批量分配引擎
+把某型号某一天所有已批准的预约看作时间区间，按区间图着色一次性分配设备单元：
+按开始时间排序后贪心地复用最早空闲的单元（对纯区间图是最优着色，所用单元数等于最大重叠数），
+同一申请人的连续预约优先沿用上一次的单元以减少换机，已分配的预约保持不动避免重排。
+"""
+import heapq
+import math
+from bisect import bisect_left
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from devices.models import AVAILABLE_STATUSES, Device
+from ledger.models import DeviceLedger
+from .models import Booking
+from devices.maintenance import find_maintenance_windows, slot_datetime_range
+from .slots import slot_minutes
+
+def plan_assignments(units, fixed, pending):
+    """
+    纯计算部分（不访问数据库）
+    units: 设备单元ID列表（按优先顺序）
+    fixed: [(unit_id, start, end)] 已占用的区间（已分配的预约或直接预约具体设备的）
+    pending: [(booking_id, applicant_id, start, end)] 待分配的预约
+    返回 (assignments, unassigned)：{booking_id: unit_id} 和无法分配的 booking_id 列表
+    """
+    order = {unit: index for index, unit in enumerate(units)}
+
+    # 每个单元的固定占用区间（按开始时间排序，便于二分查找冲突）
+    fixed_by_unit = {}
+    for unit, start, end in fixed:
+        if unit in order:
+            fixed_by_unit.setdefault(unit, []).append((start, end))
+    fixed_starts = {}
+    for unit, intervals in fixed_by_unit.items():
+        intervals.sort()
+        fixed_starts[unit] = [start for start, _ in intervals]
+
+    def conflicts_fixed(unit, start, end):
+        intervals = fixed_by_unit.get(unit)
+        if not intervals:
+            return False
+        # 只有开始时间早于 end 的固定区间才可能重叠
+        index = bisect_left(fixed_starts[unit], end)
+        return any(fixed_end > start for _, fixed_end in intervals[:index])
+
+    free_heap = [order[unit] for unit in units]
+    heapq.heapify(free_heap)
+    free_set = set(units)
+    busy_heap = []  # (结束时间, 单元顺序)
+    last_unit_by_applicant = {}
+
+    assignments = {}
+    unassigned = []
+    for booking_id, applicant_id, start, end in sorted(pending, key=lambda item: (item[2], item[3], item[0])):
+        # 释放已结束的单元
+        while busy_heap and busy_heap[0][0] <= start:
+            _, unit_index = heapq.heappop(busy_heap)
+            free_set.add(units[unit_index])
+            heapq.heappush(free_heap, unit_index)
+
+        chosen = None
+        preferred = last_unit_by_applicant.get(applicant_id)
+        if preferred in free_set and not conflicts_fixed(preferred, start, end):
+            chosen = preferred
+        else:
+            skipped = []
+            while free_heap:
+                unit_index = heapq.heappop(free_heap)
+                unit = units[unit_index]
+                if unit not in free_set:
+                    continue  # 惰性删除：已被优先分配占用
+                if conflicts_fixed(unit, start, end):
+                    skipped.append(unit_index)
+                    continue
+                chosen = unit
+                break
+            for unit_index in skipped:
+                heapq.heappush(free_heap, unit_index)
+
+        if chosen is None:
+            unassigned.append(booking_id)
+            continue
+        free_set.discard(chosen)
+        heapq.heappush(busy_heap, (end, order[chosen]))
+        assignments[booking_id] = chosen
+        last_unit_by_applicant[applicant_id] = chosen
+
+    return assignments, unassigned
+
+
+def assign_pool_units(device_type, booking_date, operator=None):
+    """
+    为某型号某一天已批准但未分配单元的预约批量分配设备，并批量写入借出台账
+    返回 (已分配数量, 未能分配的预约列表)
+    """
+    # 只分配可预约的单元，维修中或报废的单元不参与分配（与池容量的统计口径一致）
+    units = list(
+        Device.objects.filter(
+            device_type=device_type, status__in=AVAILABLE_STATUSES
+        ).order_by('device_code').values_list('id', flat=True)
+    )
+    bookings = list(
+        Booking.objects.filter(
+            booking_date=booking_date,
+            status__in=Booking.ACTIVE_STATUSES,
+        ).filter(
+            # 型号池预约 + 直接预约该型号具体设备的预约（后者作为固定占用）
+            Q(device_type=device_type) | Q(device__device_type=device_type)
+        ).select_related('applicant')
+    )
+
+    fixed = []
+    pending = []
+    pending_by_id = {}
+    for booking in bookings:
+        start, end = slot_minutes(booking.time_slot, booking.slot_count)
+        if booking.device_id:
+            fixed.append((booking.device_id, start, end))
+        elif booking.status == 'manager_approved':
+            pending.append((booking.id, booking.applicant_id, start, end))
+            pending_by_id[booking.id] = booking
+
+    # 单元自身的维护计划作为固定占用（查进程内维护区间索引）
+    day_start, day_end = slot_datetime_range(booking_date, 0, 24 * 60)
+    for unit in units:
+        for window in find_maintenance_windows(unit, None, day_start, day_end):
+            start = max(math.floor((window.start_time - day_start).total_seconds() / 60), 0)
+            end = min(math.ceil((window.end_time - day_start).total_seconds() / 60), 24 * 60)
+            fixed.append((unit, start, end))
+
+    assignments, unassigned = plan_assignments(units, fixed, pending)
+    if not assignments:
+        return 0, [pending_by_id[booking_id] for booking_id in unassigned]
+
+    devices = Device.objects.in_bulk(set(assignments.values()))
+    now = timezone.now()
+    assigned = []
+    ledgers = []
+    for booking_id, unit_id in assignments.items():
+        booking = pending_by_id[booking_id]
+        booking.device = devices[unit_id]
+        _, end = slot_minutes(booking.time_slot, booking.slot_count)
+        assigned.append(booking)
+        ledgers.append(DeviceLedger(
+            device=booking.device,
+            device_name=booking.device.model,
+            user=booking.applicant,
+            operation_type='borrow',
+            operation_date=now,
+            expected_return_date=timezone.make_aware(
+                datetime.combine(booking.booking_date, time.min) + timedelta(minutes=end)
+            ),
+            status_after_operation='unavailable',
+            description=f'预约编号：{booking.booking_code}，用途：{booking.purpose or "无"}（型号池批量分配）',
+            operator=operator,
+        ))
+
+    with transaction.atomic():
+        Booking.objects.bulk_update(assigned, ['device'], batch_size=500)
+        DeviceLedger.objects.bulk_create(ledgers, batch_size=500)
+
+    return len(assigned), [pending_by_id[booking_id] for booking_id in unassigned]
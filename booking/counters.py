@@ -0,0 +1,92 @@
+"""
+用户借用次数计数：UserInfo 上冗余保存 总次数 与 各状态分组的次数，
+预约创建、状态变化、删除时在同一事务内按 F() 增减，用户管理与人员台账直接按这些带索引的列排序和筛选，
+不再对预约表做 JOIN + GROUP BY。计数不一致时用 rebuild_user_booking_counters 按预约表重建。
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from user.models import UserInfo
+
+TOTAL_FIELD = 'booking_count'
+# 预约状态 → UserInfo 上的分组计数列
+STATUS_COUNTER_FIELDS = {
+    'advisor_pending': 'pending_booking_count',
+    'pending': 'pending_booking_count',
+    'admin_approved': 'pending_booking_count',
+    'waitlisted': 'pending_booking_count',
+    'manager_approved': 'approved_booking_count',
+    'advisor_rejected': 'rejected_booking_count',
+    'admin_rejected': 'rejected_booking_count',
+    'manager_rejected': 'rejected_booking_count',
+    'cancelled': 'cancelled_booking_count',
+    'expired': 'cancelled_booking_count',
+}
+COUNTER_FIELDS = (TOTAL_FIELD,) + tuple(dict.fromkeys(STATUS_COUNTER_FIELDS.values()))
+
+
+def _add(fields, status, n):
+    """一条（或 n 条）状态为 status 的预约计入 fields"""
+    fields[TOTAL_FIELD] += n
+    if status in STATUS_COUNTER_FIELDS:
+        fields[STATUS_COUNTER_FIELDS[status]] += n
+
+
+def adjust_user_booking_counters(deltas):
+    """按 {申请人ID: {计数列: 增减数}} 原子地更新计数，每个申请人一条 UPDATE"""
+    for applicant_id, fields in deltas.items():
+        changes = {field: F(field) + n for field, n in fields.items() if n}
+        if changes:
+            UserInfo.objects.filter(id=applicant_id).update(**changes)
+
+
+def move_user_booking_counter(applicant_id, old_status, new_status):
+    """单条预约状态从 old_status 变为 new_status（None 表示新建 / 删除）时调整申请人的计数"""
+    fields = Counter()
+    if old_status is not None:
+        _add(fields, old_status, -1)
+    if new_status is not None:
+        _add(fields, new_status, 1)
+    adjust_user_booking_counters({applicant_id: fields})
+
+
+def user_booking_deltas(bookings, sign=1):
+    """一批预约对计数的影响：已加载的预约在内存中统计，QuerySet 用一次分组查询统计"""
+    if isinstance(bookings, (list, tuple)):
+        rows = Counter((booking.applicant_id, booking.status) for booking in bookings).items()
+    else:
+        rows = (
+            ((row['applicant_id'], row['status']), row['n'])
+            for row in bookings.values('applicant_id', 'status').annotate(n=Count('id')).order_by()
+        )
+    deltas = defaultdict(Counter)
+    for (applicant_id, status), n in rows:
+        _add(deltas[applicant_id], status, sign * n)
+    return deltas
+
+
+def status_change_deltas(bookings, new_status):
+    """一批预约统一改为 new_status 时的计数变化（总次数不变，只在状态分组之间转移）"""
+    deltas = user_booking_deltas(bookings, sign=-1)
+    for fields in deltas.values():
+        _add(fields, new_status, -fields[TOTAL_FIELD])
+    return deltas
+
+
+def rebuild_user_booking_counters():
+    """按预约表重新统计全部用户的计数，只写回不一致的用户，返回修正的用户数"""
+    from .models import Booking
+
+    totals = user_booking_deltas(Booking.objects.all())
+    changed = []
+    for user in UserInfo.objects.only('id', *COUNTER_FIELDS):
+        expected = totals.get(user.id, {})
+        if any(getattr(user, field) != expected.get(field, 0) for field in COUNTER_FIELDS):
+            for field in COUNTER_FIELDS:
+                setattr(user, field, expected.get(field, 0))
+            changed.append(user)
+    with transaction.atomic():
+        UserInfo.objects.bulk_update(changed, COUNTER_FIELDS, batch_size=500)
+    return len(changed)
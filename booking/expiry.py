@@ -0,0 +1,50 @@
+"""
+过期预约批量清理：预约日期已过仍处于 待审批 / 待负责人审批 / 候补中 的预约统一改为"已过期"，
+每种状态只执行一次带条件的批量 UPDATE，并批量写入对应的审批记录，避免审批队列无限增长。
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .counters import adjust_user_booking_counters, status_change_deltas
+from .inbox import adjust_inbox_counters, inbox_deltas
+from .models import ApprovalRecord, Booking, BookingWaitlist
+
+EXPIRE_COMMENT = '预约日期已过，系统自动过期'
+
+
+def expire_stale_bookings(cutoff_date, dry_run=False):
+    """
+    把 booking_date 早于 cutoff_date 的未完成预约批量改为已过期
+    返回 {状态: 过期数量}
+    """
+    counts = {}
+    for status, approval_level in Booking.EXPIRABLE_STATUSES.items():
+        with transaction.atomic():
+            stale = Booking.objects.filter(status=status, booking_date__lt=cutoff_date)
+            # 先锁定并取出要过期的预约ID（用于写审批记录），再用同一条件批量更新
+            booking_ids = list(stale.select_for_update().values_list('id', flat=True))
+            if not booking_ids or dry_run:
+                counts[status] = len(booking_ids)
+                continue
+            # 批量 UPDATE 不经过 save()，先分组统计再调整审批收件箱计数与申请人的借用次数计数
+            expiring = Booking.objects.filter(id__in=booking_ids)
+            deltas = inbox_deltas(expiring, sign=-1)
+            user_deltas = status_change_deltas(expiring, 'expired')
+            counts[status] = stale.filter(id__in=booking_ids).update(
+                status='expired', update_time=timezone.now()
+            )
+            adjust_inbox_counters(deltas)
+            adjust_user_booking_counters(user_deltas)
+            ApprovalRecord.objects.bulk_create([
+                ApprovalRecord(
+                    booking_id=booking_id,
+                    approver=None,
+                    approval_level=approval_level,
+                    action='expire',
+                    comment=EXPIRE_COMMENT,
+                )
+                for booking_id in booking_ids
+            ], batch_size=500)
+            if status == 'waitlisted':
+                BookingWaitlist.objects.filter(booking_id__in=booking_ids).delete()
+    return counts
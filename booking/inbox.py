@@ -0,0 +1,206 @@
+"""
+审批收件箱：指导教师 / 管理员 / 负责人各自的待审批预约。
+列表接口按 (提交时间, ID) 游标分页，用 values() 一次取出关联的申请人与设备字段；
+待审批角标数量来自 InboxCounter 计数表，预约状态每次变化时增减对应计数，读取为 O(1)。
+"""
+import base64
+from collections import Counter
+from datetime import datetime
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from user.models import UserInfo
+from .models import Booking, InboxCounter
+from .slots import slot_label
+
+# 各状态所在的收件箱
+INBOX_ROLES = {
+    'advisor_pending': 'advisor',
+    'pending': 'admin',
+    'admin_approved': 'manager',
+}
+ROLE_STATUSES = {role: status for status, role in INBOX_ROLES.items()}
+# 管理员/负责人收件箱的 owner_key
+GLOBAL_OWNER = 0
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# 列表接口取出的字段（含关联表字段，一次查询）
+INBOX_FIELDS = (
+    'id', 'booking_code', 'booking_date', 'time_slot', 'slot_count', 'status', 'purpose', 'create_time',
+    'applicant__user_code', 'applicant__name', 'applicant__user_type',
+    'device__device_code', 'device__model', 'device_type__model',
+)
+
+
+class InvalidCursor(ValueError):
+    """游标格式错误"""
+
+
+def inbox_key(status, advisor_id):
+    """预约状态对应的收件箱 (角色, owner_key)，不在任何收件箱时返回 None"""
+    role = INBOX_ROLES.get(status)
+    if role is None:
+        return None
+    if role == 'advisor':
+        return role, advisor_id or GLOBAL_OWNER
+    return role, GLOBAL_OWNER
+
+
+def adjust_inbox_counters(deltas):
+    """按 {(角色, owner_key): 增减数} 原子地更新计数（计数行不存在时先创建）"""
+    for (role, owner_key), delta in deltas.items():
+        if not delta:
+            continue
+        updated = InboxCounter.objects.filter(role=role, owner_key=owner_key).update(count=F('count') + delta)
+        if not updated:
+            with transaction.atomic():
+                InboxCounter.objects.get_or_create(role=role, owner_key=owner_key)
+            InboxCounter.objects.filter(role=role, owner_key=owner_key).update(count=F('count') + delta)
+
+
+def move_inbox_counter(previous, current):
+    """单条预约的 (状态, 指导教师) 从 previous 变为 current 时调整计数"""
+    deltas = Counter()
+    old_key = inbox_key(*previous)
+    new_key = inbox_key(*current)
+    if old_key == new_key:
+        return
+    if old_key:
+        deltas[old_key] -= 1
+    if new_key:
+        deltas[new_key] += 1
+    adjust_inbox_counters(deltas)
+
+
+def inbox_deltas(bookings, sign=1):
+    """一批预约对计数的影响：已加载的预约在内存中统计，QuerySet 用一次分组查询统计"""
+    deltas = Counter()
+    if isinstance(bookings, (list, tuple)):
+        rows = Counter((booking.status, booking.advisor_id) for booking in bookings).items()
+    else:
+        rows = (
+            ((row['status'], row['advisor_id']), row['n'])
+            for row in bookings.filter(status__in=INBOX_ROLES)
+            .values('status', 'advisor_id').annotate(n=Count('id')).order_by()
+        )
+    for (status, advisor_id), n in rows:
+        key = inbox_key(status, advisor_id)
+        if key:
+            deltas[key] += sign * n
+    return deltas
+
+
+def rebuild_inbox_counters():
+    """按预约表重新统计全部计数（计数表初始化或修复时使用），返回 {(角色, owner_key): 数量}"""
+    totals = inbox_deltas(Booking.objects.all())
+    with transaction.atomic():
+        InboxCounter.objects.all().delete()
+        InboxCounter.objects.bulk_create([
+            InboxCounter(role=role, owner_key=owner_key, count=count)
+            for (role, owner_key), count in totals.items()
+        ])
+    return dict(totals)
+
+
+def inbox_counts(keys):
+    """一次查询读取多个收件箱的计数：keys 为 [(角色, owner_key)]，返回 {角色: 数量}"""
+    if not keys:
+        return {}
+    condition = Q()
+    for role, owner_key in keys:
+        condition |= Q(role=role, owner_key=owner_key)
+    counts = {role: 0 for role, _ in keys}
+    for role, owner_key, count in InboxCounter.objects.filter(condition).values_list('role', 'owner_key', 'count'):
+        if (role, owner_key) in keys:
+            counts[role] = count
+    return counts
+
+
+def user_inboxes(user):
+    """登录用户可查看的收件箱 {角色: owner_key}：按角色组判断管理员/负责人，教师可查看本人的指导教师收件箱"""
+    inboxes = {}
+    groups = set(user.groups.values_list('name', flat=True))
+    if '设备管理员' in groups:
+        inboxes['admin'] = GLOBAL_OWNER
+    if '实验室负责人' in groups:
+        inboxes['manager'] = GLOBAL_OWNER
+    teacher_id = UserInfo.objects.filter(auth_user=user, user_type='teacher').values_list('id', flat=True).first()
+    if teacher_id:
+        inboxes['advisor'] = teacher_id
+    return inboxes
+
+
+def encode_cursor(create_time, booking_id):
+    raw = f"{create_time.isoformat()}|{booking_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        create_time, booking_id = raw.split('|')
+        return datetime.fromisoformat(create_time), int(booking_id)
+    except (ValueError, UnicodeError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def inbox_queryset(role, owner_key=GLOBAL_OWNER, filters=None):
+    """收件箱查询：按状态（指导教师另按本人）过滤，再应用筛选条件"""
+    bookings = Booking.objects.filter(status=ROLE_STATUSES[role])
+    if role == 'advisor':
+        bookings = bookings.filter(advisor_id=owner_key)
+    elif role == 'manager':
+        bookings = bookings.filter(applicant__user_type='external')
+    filters = filters or {}
+    if filters.get('user_type'):
+        bookings = bookings.filter(applicant__user_type=filters['user_type'])
+    if filters.get('device'):
+        bookings = bookings.filter(device__device_code=filters['device'])
+    if filters.get('date_from'):
+        bookings = bookings.filter(booking_date__gte=filters['date_from'])
+    if filters.get('date_to'):
+        bookings = bookings.filter(booking_date__lte=filters['date_to'])
+    if filters.get('code'):
+        bookings = bookings.filter(booking_code__startswith=filters['code'])
+    return bookings
+
+
+def inbox_page(role, owner_key=GLOBAL_OWNER, filters=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    取一页收件箱（按提交时间先后），返回 (结果列表, 下一页游标)
+    多取一条判断是否还有下一页，整页只执行一次查询
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    bookings = inbox_queryset(role, owner_key, filters)
+    if cursor:
+        create_time, booking_id = decode_cursor(cursor)
+        bookings = bookings.filter(Q(create_time__gt=create_time) | Q(create_time=create_time, id__gt=booking_id))
+    rows = list(bookings.order_by('create_time', 'id').values(*INBOX_FIELDS)[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['create_time'], rows[-1]['id'])
+    return [serialize_inbox_row(row) for row in rows], next_cursor
+
+
+def serialize_inbox_row(row):
+    return {
+        'id': row['id'],
+        'booking_code': row['booking_code'],
+        'booking_date': row['booking_date'].strftime('%Y-%m-%d'),
+        'time_slot': row['time_slot'],
+        'slot_count': row['slot_count'],
+        'time_slot_label': slot_label(row['time_slot'], row['slot_count']),
+        'status': row['status'],
+        'purpose': row['purpose'] or '',
+        'create_time': row['create_time'].isoformat(),
+        'applicant': {
+            'user_code': row['applicant__user_code'],
+            'name': row['applicant__name'],
+            'user_type': row['applicant__user_type'],
+        },
+        'device_code': row['device__device_code'] or '',
+        'model': row['device__model'] or row['device_type__model'] or '',
+    }
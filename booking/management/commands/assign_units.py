@@ -0,0 +1,70 @@
+"""
+型号池设备单元批量分配命令
+使用方法：python manage.py assign_units [--date YYYY-MM-DD] [--type 型号]
+建议每天借出前（如前一晚）通过定时任务运行一次
+"""
+import time as time_module
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from booking.assignment import assign_pool_units
+from booking.models import Booking
+from devices.models import DeviceType
+
+
+class Command(BaseCommand):
+    help = '为型号池预约批量分配具体设备单元'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            type=str,
+            help='分配日期（格式：YYYY-MM-DD，默认明天）',
+        )
+        parser.add_argument(
+            '--type',
+            type=str,
+            help='只分配指定型号（默认所有有待分配预约的型号）',
+        )
+
+    def handle(self, *args, **options):
+        date_input = options.get('date')
+        type_input = options.get('type')
+
+        if date_input:
+            try:
+                booking_date = datetime.strptime(date_input, '%Y-%m-%d').date()
+            except ValueError:
+                self.stdout.write(self.style.ERROR('日期格式错误，应为 YYYY-MM-DD'))
+                return
+        else:
+            booking_date = timezone.now().date() + timedelta(days=1)
+
+        # 找出当天有待分配预约的型号（一次查询）
+        type_ids = Booking.objects.filter(
+            booking_date=booking_date,
+            status='manager_approved',
+            device__isnull=True,
+            device_type__isnull=False,
+        ).values_list('device_type_id', flat=True).distinct()
+        device_types = DeviceType.objects.filter(id__in=type_ids)
+        if type_input:
+            device_types = device_types.filter(model=type_input)
+
+        total_assigned = 0
+        started = time_module.perf_counter()
+        for device_type in device_types:
+            assigned, unassigned = assign_pool_units(device_type, booking_date)
+            total_assigned += assigned
+            self.stdout.write(f'  {device_type.model}：已分配 {assigned} 条')
+            for booking in unassigned:
+                self.stdout.write(self.style.WARNING(
+                    f'    预约 {booking.booking_code}（{booking.time_slot_label}）无可用设备单元，请人工处理'
+                ))
+
+        elapsed = time_module.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{booking_date} 共分配 {total_assigned} 条型号池预约，耗时 {elapsed:.3f} 秒'
+        ))
@@ -0,0 +1,59 @@
+"""
+过期预约清理命令（预约日期已过仍未审批完成的预约自动过期）
+使用方法：python manage.py expire_bookings [--date YYYY-MM-DD] [--dry-run]
+建议通过定时任务每天凌晨运行一次
+"""
+import time as time_module
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from booking.expiry import expire_stale_bookings
+from booking.models import Booking
+
+
+class Command(BaseCommand):
+    help = '将预约日期已过仍待审批的预约批量改为已过期'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            type=str,
+            help='截止日期（格式：YYYY-MM-DD，早于该日期的预约会过期，默认今天）',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='仅统计将要过期的预约数量，不实际修改',
+        )
+
+    def handle(self, *args, **options):
+        date_input = options.get('date')
+        dry_run = options.get('dry_run', False)
+
+        if date_input:
+            try:
+                cutoff_date = datetime.strptime(date_input, '%Y-%m-%d').date()
+            except ValueError:
+                self.stdout.write(self.style.ERROR('日期格式错误，应为 YYYY-MM-DD'))
+                return
+        else:
+            cutoff_date = timezone.localdate()
+
+        started = time_module.perf_counter()
+        counts = expire_stale_bookings(cutoff_date, dry_run=dry_run)
+        elapsed = time_module.perf_counter() - started
+
+        status_labels = dict(Booking.APPROVAL_STATUS)
+        for status, count in counts.items():
+            self.stdout.write(f'  {status_labels[status]}：{count} 条')
+        total = sum(counts.values())
+        if dry_run:
+            self.stdout.write(self.style.WARNING(
+                f'[预览] {cutoff_date} 之前共有 {total} 条预约将过期，耗时 {elapsed:.3f} 秒'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'{cutoff_date} 之前共过期 {total} 条预约，耗时 {elapsed:.3f} 秒'
+            ))
@@ -0,0 +1,20 @@
+"""
+审批收件箱计数重建命令（计数表与预约表不一致时修复，如直接改库或批量删除预约之后）
+使用方法：python manage.py rebuild_inbox_counters
+"""
+from django.core.management.base import BaseCommand
+
+from booking.inbox import rebuild_inbox_counters
+from booking.models import InboxCounter
+
+
+class Command(BaseCommand):
+    help = '按预约表重新统计审批收件箱计数'
+
+    def handle(self, *args, **options):
+        totals = rebuild_inbox_counters()
+        role_labels = dict(InboxCounter.ROLE_CHOICES)
+        for (role, owner_key), count in sorted(totals.items()):
+            owner = f'（指导教师 {owner_key}）' if role == 'advisor' else ''
+            self.stdout.write(f'  {role_labels[role]}{owner}：{count} 条')
+        self.stdout.write(self.style.SUCCESS(f'已重建 {len(totals)} 个收件箱计数'))
@@ -0,0 +1,15 @@
+"""
+用户借用次数计数修复命令（计数与预约表不一致时使用，如直接改库、删除设备级联删除预约之后）
+使用方法：python manage.py rebuild_user_booking_counters
+"""
+from django.core.management.base import BaseCommand
+
+from booking.counters import rebuild_user_booking_counters
+
+
+class Command(BaseCommand):
+    help = '按预约表重新统计用户的借用次数计数'
+
+    def handle(self, *args, **options):
+        changed = rebuild_user_booking_counters()
+        self.stdout.write(self.style.SUCCESS(f'已修正 {changed} 个用户的借用次数计数'))
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0001_initial'),
+        ('devices', '0002_device_type_pool'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='device_type',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='devices.devicetype', verbose_name='预约型号'),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='device',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='devices.device', verbose_name='预约设备'),
+        ),
+        migrations.CreateModel(
+            name='DeviceTypeSlotCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('booking_date', models.DateField(verbose_name='预约日期')),
+                ('time_slot', models.CharField(max_length=20, verbose_name='预约时段')),
+                ('reserved_count', models.PositiveIntegerField(default=0, verbose_name='已占用数量')),
+                ('device_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='devices.devicetype', verbose_name='设备型号')),
+            ],
+            options={
+                'verbose_name': '型号池时段计数',
+                'verbose_name_plural': '型号池时段计数',
+                'constraints': [models.UniqueConstraint(fields=('device_type', 'booking_date', 'time_slot'), name='uniq_device_type_slot_counter')],
+            },
+        ),
+    ]
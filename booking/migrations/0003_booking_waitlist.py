@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0002_device_type_pool'),
+        ('devices', '0002_device_type_pool'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='booking',
+            name='status',
+            field=models.CharField(choices=[('pending', '待管理员审批'), ('admin_approved', '管理员已批准（待负责人审批）'), ('manager_approved', '全部审批通过'), ('admin_rejected', '管理员已拒绝'), ('manager_rejected', '负责人已拒绝'), ('cancelled', '用户已撤销'), ('waitlisted', '候补中')], default='pending', max_length=20, verbose_name='审批状态'),
+        ),
+        migrations.CreateModel(
+            name='BookingWaitlist',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('booking_date', models.DateField(verbose_name='预约日期')),
+                ('time_slot', models.CharField(max_length=20, verbose_name='预约时段')),
+                ('create_time', models.DateTimeField(auto_now_add=True, verbose_name='加入时间')),
+                ('booking', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entry', to='booking.booking', verbose_name='候补预约')),
+                ('device', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='devices.device', verbose_name='候补设备')),
+                ('device_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='devices.devicetype', verbose_name='候补型号')),
+            ],
+            options={
+                'verbose_name': '候补队列',
+                'verbose_name_plural': '候补队列',
+                'ordering': ['create_time', 'id'],
+                'indexes': [models.Index(fields=['device', 'booking_date', 'time_slot', 'create_time'], name='booking_boo_device__cd0fa9_idx'), models.Index(fields=['device_type', 'booking_date', 'time_slot', 'create_time'], name='booking_boo_device__6be5c3_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0003_booking_waitlist'),
+        ('devices', '0002_device_type_pool'),
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('time_slot', models.CharField(max_length=20, verbose_name='预约时段')),
+                ('start_date', models.DateField(verbose_name='开始日期')),
+                ('end_date', models.DateField(verbose_name='结束日期')),
+                ('interval_weeks', models.PositiveSmallIntegerField(choices=[(1, '每周'), (2, '隔周')], default=1, verbose_name='重复方式')),
+                ('purpose', models.TextField(blank=True, null=True, verbose_name='借用用途')),
+                ('create_time', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('applicant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='user.userinfo', verbose_name='申请人')),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='devices.device', verbose_name='预约设备')),
+            ],
+            options={
+                'verbose_name': '周期预约',
+                'verbose_name_plural': '周期预约',
+            },
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bookings', to='booking.bookingseries', verbose_name='所属周期预约'),
+        ),
+    ]
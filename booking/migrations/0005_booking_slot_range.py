@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:51
+
+import logging
+
+from django.db import migrations, models
+
+logger = logging.getLogger(__name__)
+
+# 以下时段划分与解析规则为迁移编写时的定义，复制在此，不随 booking.slots 的修改而变化
+SLOT_MINUTES = 120
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+LEGACY_SLOT_NAMES = {
+    '上午': (4, 2),
+    '下午': (7, 2),
+    '晚上': (9, 2),
+    '全天': (0, SLOTS_PER_DAY),
+}
+
+
+def parse_legacy_slot(time_slot):
+    """
+    把旧时段文本（"08:00-14:00"、"上午" 等）换算为 (起始时段, 时段数)
+    不在整时段边界上的时间取覆盖它的时段（"09:00-11:00" → 08:00-12:00），无法识别的返回 None
+    """
+    if time_slot in LEGACY_SLOT_NAMES:
+        return LEGACY_SLOT_NAMES[time_slot]
+    try:
+        start, end = time_slot.split('-')
+        start_h, start_m = map(int, start.split(':'))
+        end_h, end_m = map(int, end.split(':'))
+    except (AttributeError, ValueError):
+        return None
+    if not (0 <= start_m < 60 and 0 <= end_m < 60):
+        return None
+    start_min = start_h * 60 + start_m
+    end_min = end_h * 60 + end_m
+    if start_min < 0 or end_min <= start_min or end_min > 24 * 60:
+        return None
+    first = start_min // SLOT_MINUTES
+    last = -(-end_min // SLOT_MINUTES)
+    return first, last - first
+
+
+def backfill_slot_range(apps, schema_editor):
+    """按已有的时段文本回填起始时段与连续时段数，无法识别的保持为空并记录警告"""
+    Booking = apps.get_model('booking', 'Booking')
+    to_update = []
+    for booking in Booking.objects.only('id', 'time_slot').iterator():
+        parsed = parse_legacy_slot(booking.time_slot)
+        if parsed is None:
+            logger.warning('预约 %s 的时段文本 %r 无法识别，未回填时段', booking.id, booking.time_slot)
+            continue
+        booking.slot_index, booking.slot_count = parsed
+        to_update.append(booking)
+    Booking.objects.bulk_update(to_update, ['slot_index', 'slot_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0004_booking_series'),
+        ('devices', '0002_device_type_pool'),
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='slot_count',
+            field=models.PositiveSmallIntegerField(default=1, verbose_name='连续时段数'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='slot_index',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='起始时段'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['device', 'booking_date', 'slot_index'], name='booking_boo_device__f83842_idx'),
+        ),
+        migrations.RunPython(backfill_slot_range, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,264 @@
+import logging
+
+from django.db import migrations, models
+
+logger = logging.getLogger(__name__)
+
+# 以下时段划分与解析规则为迁移编写时的定义，复制在此，不随 booking.slots 的修改而变化
+SLOT_MINUTES = 120
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+LEGACY_SLOT_NAMES = {
+    '上午': (4, 2),
+    '下午': (7, 2),
+    '晚上': (9, 2),
+    '全天': (0, SLOTS_PER_DAY),
+}
+# 无法识别的旧预约只占用第一个时段，避免按全天占用设备、按全天计费
+UNPARSED_SLOT_RANGE = (0, 1)
+
+
+def _format_minutes(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def default_slot_label(slot_index):
+    start = slot_index * SLOT_MINUTES
+    return f"{_format_minutes(start)}-{_format_minutes(start + SLOT_MINUTES)}"
+
+
+def parse_legacy_slot(time_slot):
+    """
+    把旧时段文本（"08:00-14:00"、"上午" 等）换算为 (起始时段, 时段数)
+    不在整时段边界上的时间取覆盖它的时段（"09:00-11:00" → 08:00-12:00），无法识别的返回 None
+    """
+    if time_slot in LEGACY_SLOT_NAMES:
+        return LEGACY_SLOT_NAMES[time_slot]
+    try:
+        start, end = time_slot.split('-')
+        start_h, start_m = map(int, start.split(':'))
+        end_h, end_m = map(int, end.split(':'))
+    except (AttributeError, ValueError):
+        return None
+    if not (0 <= start_m < 60 and 0 <= end_m < 60):
+        return None
+    start_min = start_h * 60 + start_m
+    end_min = end_h * 60 + end_m
+    if start_min < 0 or end_min <= start_min or end_min > 24 * 60:
+        return None
+    first = start_min // SLOT_MINUTES
+    last = -(-end_min // SLOT_MINUTES)
+    return first, last - first
+
+
+def seed_slot_catalog(apps, schema_editor):
+    """初始化一天12个时段"""
+    SlotCatalog = apps.get_model('booking', 'SlotCatalog')
+    SlotCatalog.objects.bulk_create([
+        SlotCatalog(index=index, label=default_slot_label(index))
+        for index in range(SLOTS_PER_DAY)
+    ])
+
+
+def fill_booking_slot_index(apps, schema_editor):
+    """
+    上一步未能回填时段的预约（时段文本无法识别）：记录警告，只占用第一个时段，
+    由管理员按日志核对后在后台修正
+    """
+    Booking = apps.get_model('booking', 'Booking')
+    to_update = []
+    for booking in Booking.objects.filter(slot_index__isnull=True).only('id', 'time_slot').iterator():
+        logger.warning('预约 %s 的时段文本 %r 无法识别，暂记为第一个时段，请人工核对', booking.id, booking.time_slot)
+        booking.slot_index, booking.slot_count = UNPARSED_SLOT_RANGE
+        to_update.append(booking)
+    Booking.objects.bulk_update(to_update, ['slot_index', 'slot_count'], batch_size=500)
+
+
+def convert_waitlist_slots(apps, schema_editor):
+    """候补记录的时段文本转换到 time_slot_index 临时字段，无法识别的候补记录删除"""
+    Waitlist = apps.get_model('booking', 'BookingWaitlist')
+    to_update = []
+    for entry in Waitlist.objects.only('id', 'time_slot').iterator():
+        parsed = parse_legacy_slot(entry.time_slot)
+        if parsed is None:
+            logger.warning('候补记录 %s 的时段文本 %r 无法识别，已删除', entry.id, entry.time_slot)
+            entry.delete()
+            continue
+        entry.time_slot_index = parsed[0]
+        to_update.append(entry)
+    Waitlist.objects.bulk_update(to_update, ['time_slot_index'], batch_size=500)
+
+
+def convert_series_slots(apps, schema_editor):
+    """周期预约的时段文本转换到 time_slot_index 临时字段，无法识别的与预约同样处理"""
+    Series = apps.get_model('booking', 'BookingSeries')
+    to_update = []
+    for series in Series.objects.only('id', 'time_slot').iterator():
+        parsed = parse_legacy_slot(series.time_slot)
+        if parsed is None:
+            logger.warning('周期预约 %s 的时段文本 %r 无法识别，暂记为第一个时段，请人工核对', series.id, series.time_slot)
+            parsed = UNPARSED_SLOT_RANGE
+        series.time_slot_index, series.slot_count = parsed
+        to_update.append(series)
+    Series.objects.bulk_update(to_update, ['time_slot_index', 'slot_count'], batch_size=500)
+
+
+def convert_counter_slots(apps, schema_editor):
+    """型号池计数器按单个时段计数，无法换算的旧计数直接删除"""
+    Counter = apps.get_model('booking', 'DeviceTypeSlotCounter')
+    to_update = []
+    for counter in Counter.objects.only('id', 'time_slot').iterator():
+        parsed = parse_legacy_slot(counter.time_slot)
+        if parsed is None or parsed[1] != 1:
+            counter.delete()
+            continue
+        counter.time_slot_index = parsed[0]
+        to_update.append(counter)
+    Counter.objects.bulk_update(to_update, ['time_slot_index'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0005_booking_slot_range'),
+        ('devices', '0002_device_type_pool'),
+    ]
+
+    operations = [
+        # 时段目录
+        migrations.CreateModel(
+            name='SlotCatalog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveSmallIntegerField(unique=True, verbose_name='时段编号')),
+                ('label', models.CharField(max_length=20, verbose_name='时段名称')),
+                ('is_blackout', models.BooleanField(default=False, verbose_name='维护停用')),
+                ('blackout_reason', models.CharField(blank=True, max_length=100, null=True, verbose_name='停用原因')),
+            ],
+            options={
+                'verbose_name': '预约时段',
+                'verbose_name_plural': '预约时段',
+                'ordering': ['index'],
+            },
+        ),
+        migrations.RunPython(seed_slot_catalog, migrations.RunPython.noop),
+
+        # 预约：slot_index 取代时段文本成为整数 time_slot
+        migrations.RunPython(fill_booking_slot_index, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_boo_device__f83842_idx',
+        ),
+        migrations.RemoveField(
+            model_name='booking',
+            name='time_slot',
+        ),
+        migrations.RenameField(
+            model_name='booking',
+            old_name='slot_index',
+            new_name='time_slot',
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='time_slot',
+            field=models.PositiveSmallIntegerField(db_index=True, verbose_name='起始时段'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['device', 'booking_date', 'time_slot'], name='booking_boo_device__3c8287_idx'),
+        ),
+
+        # 型号池计数器
+        migrations.RemoveConstraint(
+            model_name='devicetypeslotcounter',
+            name='uniq_device_type_slot_counter',
+        ),
+        migrations.AddField(
+            model_name='devicetypeslotcounter',
+            name='time_slot_index',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.RunPython(convert_counter_slots, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='devicetypeslotcounter',
+            name='time_slot',
+        ),
+        migrations.RenameField(
+            model_name='devicetypeslotcounter',
+            old_name='time_slot_index',
+            new_name='time_slot',
+        ),
+        migrations.AlterField(
+            model_name='devicetypeslotcounter',
+            name='time_slot',
+            field=models.PositiveSmallIntegerField(verbose_name='时段编号'),
+        ),
+        migrations.AddConstraint(
+            model_name='devicetypeslotcounter',
+            constraint=models.UniqueConstraint(fields=('device_type', 'booking_date', 'time_slot'), name='uniq_device_type_slot_counter'),
+        ),
+
+        # 候补队列
+        migrations.RemoveIndex(
+            model_name='bookingwaitlist',
+            name='booking_boo_device__cd0fa9_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='bookingwaitlist',
+            name='booking_boo_device__6be5c3_idx',
+        ),
+        migrations.AddField(
+            model_name='bookingwaitlist',
+            name='time_slot_index',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.RunPython(convert_waitlist_slots, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='bookingwaitlist',
+            name='time_slot',
+        ),
+        migrations.RenameField(
+            model_name='bookingwaitlist',
+            old_name='time_slot_index',
+            new_name='time_slot',
+        ),
+        migrations.AlterField(
+            model_name='bookingwaitlist',
+            name='time_slot',
+            field=models.PositiveSmallIntegerField(verbose_name='起始时段'),
+        ),
+        migrations.AddIndex(
+            model_name='bookingwaitlist',
+            index=models.Index(fields=['device', 'booking_date', 'time_slot', 'create_time'], name='booking_boo_device__cd0fa9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookingwaitlist',
+            index=models.Index(fields=['device_type', 'booking_date', 'time_slot', 'create_time'], name='booking_boo_device__6be5c3_idx'),
+        ),
+
+        # 周期预约
+        migrations.AddField(
+            model_name='bookingseries',
+            name='slot_count',
+            field=models.PositiveSmallIntegerField(default=1, verbose_name='连续时段数'),
+        ),
+        migrations.AddField(
+            model_name='bookingseries',
+            name='time_slot_index',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.RunPython(convert_series_slots, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='bookingseries',
+            name='time_slot',
+        ),
+        migrations.RenameField(
+            model_name='bookingseries',
+            old_name='time_slot_index',
+            new_name='time_slot',
+        ),
+        migrations.AlterField(
+            model_name='bookingseries',
+            name='time_slot',
+            field=models.PositiveSmallIntegerField(verbose_name='起始时段'),
+        ),
+    ]
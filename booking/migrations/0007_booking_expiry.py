@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0006_slot_catalog_integer_time_slot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='approvalrecord',
+            name='action',
+            field=models.CharField(choices=[('approve', '批准'), ('reject', '拒绝'), ('expire', '过期')], max_length=10, verbose_name='审批操作'),
+        ),
+        migrations.AlterField(
+            model_name='approvalrecord',
+            name='approver',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='审批人'),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='status',
+            field=models.CharField(choices=[('pending', '待管理员审批'), ('admin_approved', '管理员已批准（待负责人审批）'), ('manager_approved', '全部审批通过'), ('admin_rejected', '管理员已拒绝'), ('manager_rejected', '负责人已拒绝'), ('cancelled', '用户已撤销'), ('waitlisted', '候补中'), ('expired', '已过期')], default='pending', max_length=20, verbose_name='审批状态'),
+        ),
+    ]
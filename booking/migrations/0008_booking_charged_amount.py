@@ -0,0 +1,60 @@
+from decimal import Decimal
+
+from django.db import migrations, models
+
+# 与 billing.utils.PAID_USER_TYPES 一致
+PAID_USER_TYPES = ('external',)
+
+
+def backfill_charged_amount(apps, schema_editor):
+    """
+    已全部审批通过的预约补写计费金额：
+    已有收费流水的取流水金额，其余按当前设备价格（校内/校外）× 时段数估算
+    """
+    Booking = apps.get_model('booking', 'Booking')
+    Device = apps.get_model('devices', 'Device')
+    BillingEntry = apps.get_model('billing', 'BillingEntry')
+
+    charged = dict(BillingEntry.objects.filter(entry_type='charge').values_list('booking_id', 'amount'))
+    type_prices = {}
+    for type_id, internal, external in Device.objects.filter(device_type__isnull=False).values_list(
+        'device_type_id', 'price_internal', 'price_external'
+    ):
+        prices = type_prices.setdefault(type_id, [Decimal('0'), Decimal('0')])
+        prices[0] = max(prices[0], internal)
+        prices[1] = max(prices[1], external)
+
+    to_update = []
+    bookings = Booking.objects.filter(
+        status='manager_approved', charged_amount__isnull=True
+    ).select_related('applicant', 'device')
+    for booking in bookings.iterator():
+        paid = booking.applicant.user_type in PAID_USER_TYPES
+        if booking.id in charged:
+            booking.charged_amount = charged[booking.id]
+        elif booking.device_id:
+            price = booking.device.price_external if paid else booking.device.price_internal
+            booking.charged_amount = price * booking.slot_count
+        else:
+            prices = type_prices.get(booking.device_type_id, [Decimal('0'), Decimal('0')])
+            booking.charged_amount = prices[1 if paid else 0] * booking.slot_count
+        to_update.append(booking)
+    Booking.objects.bulk_update(to_update, ['charged_amount'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0007_booking_expiry'),
+        ('billing', '0001_initial'),
+        ('devices', '0003_maintenance_window'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='charged_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='计费金额（元）'),
+        ),
+        migrations.RunPython(backfill_charged_amount, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_booking_advisor(apps, schema_editor):
+    """按学生预约填写的指导教师编号关联指导教师（已提交的预约不再补走指导教师审批）"""
+    Booking = apps.get_model('booking', 'Booking')
+    UserInfo = apps.get_model('user', 'UserInfo')
+    teachers = dict(UserInfo.objects.filter(user_type='teacher').values_list('user_code', 'id'))
+    to_update = []
+    bookings = Booking.objects.filter(applicant__user_type='student').exclude(teacher_id__isnull=True).exclude(teacher_id='')
+    for booking in bookings.only('id', 'teacher_id').iterator():
+        if booking.teacher_id in teachers:
+            booking.advisor_id = teachers[booking.teacher_id]
+            to_update.append(booking)
+    Booking.objects.bulk_update(to_update, ['advisor'], batch_size=500)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0008_booking_charged_amount'),
+        ('devices', '0003_maintenance_window'),
+        ('user', '0002_userinfo_advisor_teacher'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='advisor',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='advised_bookings', to='user.userinfo', verbose_name='指导教师'),
+        ),
+        migrations.AlterField(
+            model_name='approvalrecord',
+            name='approval_level',
+            field=models.CharField(choices=[('advisor', '指导教师'), ('admin', '管理员'), ('manager', '负责人')], max_length=20, verbose_name='审批级别'),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='status',
+            field=models.CharField(choices=[('advisor_pending', '待指导教师审批'), ('advisor_rejected', '指导教师已拒绝'), ('pending', '待管理员审批'), ('admin_approved', '管理员已批准（待负责人审批）'), ('manager_approved', '全部审批通过'), ('admin_rejected', '管理员已拒绝'), ('manager_rejected', '负责人已拒绝'), ('cancelled', '用户已撤销'), ('waitlisted', '候补中'), ('expired', '已过期')], default='pending', max_length=20, verbose_name='审批状态'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['advisor', 'status', 'create_time'], name='booking_boo_advisor_db21be_idx'),
+        ),
+        migrations.RunPython(link_booking_advisor, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:19
+
+from django.db import migrations, models
+from django.db.models import Count
+
+# 与 booking.inbox.INBOX_ROLES 一致
+INBOX_ROLES = {
+    'advisor_pending': 'advisor',
+    'pending': 'admin',
+    'admin_approved': 'manager',
+}
+
+
+def seed_inbox_counters(apps, schema_editor):
+    """按现有预约初始化审批收件箱计数"""
+    Booking = apps.get_model('booking', 'Booking')
+    InboxCounter = apps.get_model('booking', 'InboxCounter')
+    totals = {}
+    rows = Booking.objects.filter(status__in=INBOX_ROLES).values('status', 'advisor_id').annotate(n=Count('id')).order_by()
+    for row in rows:
+        role = INBOX_ROLES[row['status']]
+        owner_key = (row['advisor_id'] or 0) if role == 'advisor' else 0
+        totals[(role, owner_key)] = totals.get((role, owner_key), 0) + row['n']
+    InboxCounter.objects.bulk_create([
+        InboxCounter(role=role, owner_key=owner_key, count=count)
+        for (role, owner_key), count in totals.items()
+    ])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0009_booking_advisor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InboxCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('advisor', '指导教师'), ('admin', '管理员'), ('manager', '负责人')], max_length=10, verbose_name='审批角色')),
+                ('owner_key', models.PositiveIntegerField(default=0, verbose_name='审批人')),
+                ('count', models.IntegerField(default=0, verbose_name='待审批数量')),
+            ],
+            options={
+                'verbose_name': '审批收件箱计数',
+                'verbose_name_plural': '审批收件箱计数',
+                'constraints': [models.UniqueConstraint(fields=('role', 'owner_key'), name='uniq_inbox_counter')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', 'create_time'], name='booking_boo_status_dd59fd_idx'),
+        ),
+        migrations.RunPython(seed_inbox_counters, migrations.RunPython.noop),
+    ]
@@ -1,52 +1,299 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from user.models import UserInfo
 
-from devices.models import Device
+from devices.models import Device, DeviceType
+from .slots import slot_label, clear_slot_catalog_cache
+
+# 时段目录（一天12个2小时时段，可配置名称与维护停用）
+class SlotCatalog(models.Model):
+    index = models.PositiveSmallIntegerField(unique=True, verbose_name='时段编号')
+    label = models.CharField(max_length=20, verbose_name='时段名称')
+    is_blackout = models.BooleanField(default=False, verbose_name='维护停用')
+    blackout_reason = models.CharField(max_length=100, blank=True, null=True, verbose_name='停用原因')
+
+    class Meta:
+        verbose_name = '预约时段'
+        verbose_name_plural = '预约时段'
+        ordering = ['index']
+
+    def __str__(self):
+        return f"{self.index} - {self.label}"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        clear_slot_catalog_cache()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        clear_slot_catalog_cache()
+        return result
 
 # 预约申请模型
 class Booking(models.Model):
     # 审批状态（适配多级审批）
     APPROVAL_STATUS = (
+        ('advisor_pending', '待指导教师审批'),
+        ('advisor_rejected', '指导教师已拒绝'),
         ('pending', '待管理员审批'),
         ('admin_approved', '管理员已批准（待负责人审批）'),
         ('manager_approved', '全部审批通过'),
         ('admin_rejected', '管理员已拒绝'),
         ('manager_rejected', '负责人已拒绝'),
         ('cancelled', '用户已撤销'),
+        ('waitlisted', '候补中'),
+        ('expired', '已过期'),
     )
+    # 占用时段的状态（待审批或已批准的预约视为占用）
+    ACTIVE_STATUSES = ('advisor_pending', 'pending', 'admin_approved', 'manager_approved')
+    # 已批准（锁定时段）的状态，新申请与之冲突时只能候补
+    HELD_STATUSES = ('admin_approved', 'manager_approved')
+    # 预约日期已过仍未审批完成时自动过期的状态，及对应的审批级别
+    EXPIRABLE_STATUSES = {
+        'advisor_pending': 'advisor',
+        'pending': 'admin',
+        'admin_approved': 'manager',
+        'waitlisted': 'admin',
+    }
     
     booking_code = models.CharField(max_length=20, unique=True, verbose_name='预约编号')
     applicant = models.ForeignKey(UserInfo, on_delete=models.CASCADE, verbose_name='申请人')
-    device = models.ForeignKey(Device, on_delete=models.CASCADE, verbose_name='预约设备')
+    # 按型号池预约时 device 为空，借出时再分配具体设备单元
+    device = models.ForeignKey(Device, on_delete=models.CASCADE, null=True, blank=True, verbose_name='预约设备')
+    device_type = models.ForeignKey(DeviceType, on_delete=models.CASCADE, null=True, blank=True, verbose_name='预约型号')
     booking_date = models.DateField(verbose_name='预约日期')
-    time_slot = models.CharField(max_length=20, verbose_name='预约时段')
+    # 起始时段编号（0-11，见 SlotCatalog）+ 连续时段数
+    time_slot = models.PositiveSmallIntegerField(db_index=True, verbose_name='起始时段')
+    slot_count = models.PositiveSmallIntegerField(default=1, verbose_name='连续时段数')
     purpose = models.TextField(verbose_name='借用用途', blank=True, null=True)
     teacher_id = models.CharField(max_length=20, blank=True, null=True, verbose_name='指导教师编号')
+    # 学生预约的指导教师（先由指导教师审批，再进入管理员审批）；以 advisor 开头的联合索引已覆盖外键查询
+    advisor = models.ForeignKey(
+        UserInfo, on_delete=models.SET_NULL, null=True, blank=True, db_index=False,
+        related_name='advised_bookings', verbose_name='指导教师'
+    )
     status = models.CharField(max_length=20, choices=APPROVAL_STATUS, default='pending', verbose_name='审批状态')
+    # 全部审批通过时按当时的设备价格（校内/校外）× 时段数写入的金额快照，收入统计汇总收费用户类型（billing.utils.PAID_USER_TYPES）的此列
+    charged_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, verbose_name='计费金额（元）')
+    # 周期预约生成的预约关联到所属系列
+    series = models.ForeignKey('BookingSeries', on_delete=models.SET_NULL, null=True, blank=True, related_name='bookings', verbose_name='所属周期预约')
     create_time = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
     update_time = models.DateTimeField(auto_now=True, verbose_name='更新时间')
 
     def __str__(self):
-        return f"{self.booking_code} - {self.applicant.name} - {self.device.model}"
+        return f"{self.booking_code} - {self.applicant.name} - {self.device_model}"
+
+    @property
+    def time_slot_label(self):
+        """时段展示文本，如 "08:00-14:00" """
+        return slot_label(self.time_slot, self.slot_count)
+
+    @property
+    def device_model(self):
+        """预约的设备型号（具体设备优先，型号池预约时取型号）"""
+        if self.device_id:
+            return self.device.model
+        if self.device_type_id:
+            return self.device_type.model
+        return ''
+
+    @property
+    def device_code_display(self):
+        """设备编号展示（型号池预约未分配单元时显示型号）"""
+        if self.device_id:
+            return self.device.device_code
+        return f"{self.device_model}（待分配）"
+
+    def submitted_status(self):
+        """提交（或候补递补）后的初始审批状态：学生先由指导教师审批"""
+        if self.applicant.user_type == 'student' and self.advisor_id:
+            return 'advisor_pending'
+        return 'pending'
+
+    @property
+    def is_pooled(self):
+        """是否为按型号池预约"""
+        return self.device_type_id is not None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 记录加载时的 (状态, 指导教师)，保存时据此增减审批收件箱计数与申请人的借用次数计数；字段未加载时记为未知
+        instance._inbox_state = instance._loaded_inbox_state()
+        return instance
+
+    def _current_inbox_state(self):
+        return (self.status, self.advisor_id)
+
+    def _loaded_inbox_state(self):
+        if 'status' in self.__dict__ and 'advisor_id' in self.__dict__:
+            return self._current_inbox_state()
+        return None
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._inbox_state = self._loaded_inbox_state()
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        tracked = update_fields is None or {'status', 'advisor', 'advisor_id'} & set(update_fields)
+        previous = getattr(self, '_inbox_state', (None, None))
+        with transaction.atomic():
+            if tracked and previous is None:
+                previous = Booking.objects.filter(pk=self.pk).values_list('status', 'advisor_id').first() or (None, None)
+            super().save(*args, **kwargs)
+            if tracked:
+                current = self._current_inbox_state()
+                if current != previous:
+                    from .counters import move_user_booking_counter
+                    from .inbox import move_inbox_counter
+                    move_inbox_counter(previous, current)
+                    if current[0] != previous[0]:
+                        move_user_booking_counter(self.applicant_id, previous[0], current[0])
+                self._inbox_state = current
+
+    def delete(self, *args, **kwargs):
+        # 计数的扣减在 post_delete 中完成（级联删除同样触发），这里只补全字段未加载时的状态
+        with transaction.atomic():
+            if getattr(self, '_inbox_state', None) is None:
+                self._inbox_state = (
+                    Booking.objects.filter(pk=self.pk).values_list('status', 'advisor_id').first() or (None, None)
+                )
+            return super().delete(*args, **kwargs)
 
     class Meta:
         verbose_name = '预约申请'
         verbose_name_plural = '预约申请'
+        indexes = [
+            models.Index(fields=['device', 'booking_date', 'time_slot']),
+            # 指导教师审批收件箱
+            models.Index(fields=['advisor', 'status', 'create_time']),
+            # 管理员/负责人审批收件箱（按状态过滤、按提交时间游标分页）
+            models.Index(fields=['status', 'create_time']),
+        ]
+
+@receiver(post_delete, sender=Booking)
+def release_booking_counters(sender, instance, **kwargs):
+    """
+    预约删除后扣减审批收件箱计数与申请人的借用次数计数
+    删除设备 / 用户时预约由级联删除，不经过 Booking.delete，但删除收集器会为每条预约发送 post_delete
+    """
+    from .counters import move_user_booking_counter
+    from .inbox import move_inbox_counter
+
+    previous = getattr(instance, '_inbox_state', None) or (None, None)
+    move_inbox_counter(previous, (None, None))
+    if previous[0] is not None:
+        move_user_booking_counter(instance.applicant_id, previous[0], None)
+    instance._inbox_state = (None, None)
+
+# 型号池时段计数器（每个 型号-日期-时段 一行，记录已占用的单元数）
+class DeviceTypeSlotCounter(models.Model):
+    device_type = models.ForeignKey(DeviceType, on_delete=models.CASCADE, verbose_name='设备型号')
+    booking_date = models.DateField(verbose_name='预约日期')
+    time_slot = models.PositiveSmallIntegerField(verbose_name='时段编号')
+    reserved_count = models.PositiveIntegerField(default=0, verbose_name='已占用数量')
+
+    class Meta:
+        verbose_name = '型号池时段计数'
+        verbose_name_plural = '型号池时段计数'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['device_type', 'booking_date', 'time_slot'],
+                name='uniq_device_type_slot_counter',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.device_type.model} {self.booking_date} {slot_label(self.time_slot)}：{self.reserved_count}"
+
+# 审批收件箱计数（每个 角色-审批人 一行，预约状态变化时增减，待审批角标直接读取，不再 COUNT 预约表）
+class InboxCounter(models.Model):
+    ROLE_CHOICES = (
+        ('advisor', '指导教师'),
+        ('admin', '管理员'),
+        ('manager', '负责人'),
+    )
+    role = models.CharField(max_length=10, choices=ROLE_CHOICES, verbose_name='审批角色')
+    # 指导教师收件箱按教师（UserInfo ID）区分；管理员/负责人的收件箱全局共享，取 0
+    owner_key = models.PositiveIntegerField(default=0, verbose_name='审批人')
+    count = models.IntegerField(default=0, verbose_name='待审批数量')
+
+    class Meta:
+        verbose_name = '审批收件箱计数'
+        verbose_name_plural = '审批收件箱计数'
+        constraints = [
+            models.UniqueConstraint(fields=['role', 'owner_key'], name='uniq_inbox_counter'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_role_display()} {self.owner_key}：{self.count}"
+
+# 周期预约（每周/隔周同一时段，适用于整学期的实验课）
+class BookingSeries(models.Model):
+    INTERVAL_CHOICES = (
+        (1, '每周'),
+        (2, '隔周'),
+    )
+    applicant = models.ForeignKey(UserInfo, on_delete=models.CASCADE, verbose_name='申请人')
+    device = models.ForeignKey(Device, on_delete=models.CASCADE, verbose_name='预约设备')
+    time_slot = models.PositiveSmallIntegerField(verbose_name='起始时段')
+    slot_count = models.PositiveSmallIntegerField(default=1, verbose_name='连续时段数')
+    start_date = models.DateField(verbose_name='开始日期')
+    end_date = models.DateField(verbose_name='结束日期')
+    interval_weeks = models.PositiveSmallIntegerField(choices=INTERVAL_CHOICES, default=1, verbose_name='重复方式')
+    purpose = models.TextField(verbose_name='借用用途', blank=True, null=True)
+    create_time = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+
+    class Meta:
+        verbose_name = '周期预约'
+        verbose_name_plural = '周期预约'
+
+    def __str__(self):
+        return f"{self.applicant.name} - {self.device.device_code} {self.get_interval_weeks_display()} {self.time_slot_label}"
+
+    @property
+    def time_slot_label(self):
+        return slot_label(self.time_slot, self.slot_count)
 
 # 审批记录模型（记录每一步审批操作）
 class ApprovalRecord(models.Model):
     APPROVAL_ACTION = (
         ('approve', '批准'),
         ('reject', '拒绝'),
+        ('expire', '过期'),
     )
     booking = models.ForeignKey(Booking, on_delete=models.CASCADE, verbose_name='关联预约')
-    approver = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='审批人')
-    approval_level = models.CharField(max_length=20, choices=[('admin', '管理员'), ('manager', '负责人')], verbose_name='审批级别')
+    # 系统自动处理（如过期）的记录没有审批人
+    approver = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, verbose_name='审批人')
+    approval_level = models.CharField(max_length=20, choices=[('advisor', '指导教师'), ('admin', '管理员'), ('manager', '负责人')], verbose_name='审批级别')
     action = models.CharField(max_length=10, choices=APPROVAL_ACTION, verbose_name='审批操作')
     comment = models.TextField(blank=True, null=True, verbose_name='审批备注')
     approval_time = models.DateTimeField(auto_now_add=True, verbose_name='审批时间')
 
     class Meta:
         verbose_name = '审批记录'
-        verbose_name_plural = '审批记录'
\ No newline at end of file
+        verbose_name_plural = '审批记录'
+
+# 候补队列（每个 设备/型号-日期-时段 一个先进先出队列，时段释放时自动递补队首）
+class BookingWaitlist(models.Model):
+    booking = models.OneToOneField(Booking, on_delete=models.CASCADE, related_name='waitlist_entry', verbose_name='候补预约')
+    device = models.ForeignKey(Device, on_delete=models.CASCADE, null=True, blank=True, verbose_name='候补设备')
+    device_type = models.ForeignKey(DeviceType, on_delete=models.CASCADE, null=True, blank=True, verbose_name='候补型号')
+    booking_date = models.DateField(verbose_name='预约日期')
+    time_slot = models.PositiveSmallIntegerField(verbose_name='起始时段')
+    create_time = models.DateTimeField(auto_now_add=True, verbose_name='加入时间')
+
+    class Meta:
+        verbose_name = '候补队列'
+        verbose_name_plural = '候补队列'
+        ordering = ['create_time', 'id']
+        indexes = [
+            models.Index(fields=['device', 'booking_date', 'time_slot', 'create_time']),
+            models.Index(fields=['device_type', 'booking_date', 'time_slot', 'create_time']),
+        ]
+
+    def __str__(self):
+        return f"{self.booking.booking_code} 候补 {self.booking_date} {self.booking.time_slot_label}"
@@ -0,0 +1,85 @@
+"""
+设备型号池：按型号预约（"任意一台X型号设备"）
+每个 型号-日期-时段 维护一个已占用计数，可用性判断只需一次计数比较；
+跨多个连续时段的预约按单个时段分别计数，全部占用成功才算成功；
+具体设备单元由 assignment 模块在借出前按天批量分配。
+"""
+from django.db import transaction
+from django.db.models import F, Max
+
+from devices.models import DeviceType
+from .models import Booking, DeviceTypeSlotCounter
+from .slots import slot_overlap_q, slot_units
+
+
+class PoolSlotFull(Exception):
+    """某个时段已无空闲单元（用于回滚多时段占用）"""
+
+
+def pool_remaining(device_type, booking_date, time_slot, slot_count=1):
+    """返回型号池在指定日期时段的剩余单元数（多时段取其中最紧张的时段）"""
+    reserved = DeviceTypeSlotCounter.objects.filter(
+        device_type=device_type,
+        booking_date=booking_date,
+        time_slot__in=slot_units(time_slot, slot_count),
+    ).aggregate(max_reserved=Max('reserved_count'))['max_reserved'] or 0
+    return max(device_type.unit_count - reserved, 0)
+
+
+def reserve_pool_slot(device_type, booking_date, time_slot, slot_count=1):
+    """
+    原子地占用型号池中的一个单元
+    返回 True 表示占用成功，False 表示该时段（或其中任一单个时段）已满
+    """
+    capacity = DeviceType.objects.filter(pk=device_type.pk).values('unit_count')[:1]
+    try:
+        with transaction.atomic():
+            for unit_slot in slot_units(time_slot, slot_count):
+                counter, _ = DeviceTypeSlotCounter.objects.get_or_create(
+                    device_type=device_type,
+                    booking_date=booking_date,
+                    time_slot=unit_slot,
+                )
+                # 条件更新：只有计数小于容量时才加一，并发提交时由数据库保证不会超卖
+                updated = DeviceTypeSlotCounter.objects.filter(
+                    pk=counter.pk,
+                    reserved_count__lt=capacity,
+                ).update(reserved_count=F('reserved_count') + 1)
+                if updated != 1:
+                    raise PoolSlotFull
+    except PoolSlotFull:
+        return False
+    return True
+
+
+def release_pool_slot(device_type_id, booking_date, time_slot, slot_count=1):
+    """释放型号池中的一个单元（预约撤销/被拒绝时调用）"""
+    DeviceTypeSlotCounter.objects.filter(
+        device_type_id=device_type_id,
+        booking_date=booking_date,
+        time_slot__in=slot_units(time_slot, slot_count),
+        reserved_count__gt=0,
+    ).update(reserved_count=F('reserved_count') - 1)
+
+
+def claim_booking_slot(booking):
+    """
+    提交申请或候补递补时占用预约的时段，返回 False 表示时段已满（只能候补）
+    型号池原子地占用一个单元；具体设备与已批准（Booking.HELD_STATUSES）的预约时段重叠时视为已满，
+    待审批的预约之间不互相阻塞，由管理员审批时处理冲突
+    """
+    if booking.is_pooled:
+        return reserve_pool_slot(booking.device_type, booking.booking_date, booking.time_slot, booking.slot_count)
+    return not Booking.objects.filter(
+        slot_overlap_q(booking.time_slot, booking.slot_count),
+        device_id=booking.device_id,
+        booking_date=booking.booking_date,
+        status__in=Booking.HELD_STATUSES,
+    ).exists()
+
+
+def release_booking_slot(booking):
+    """预约不再占用时段时释放其型号池计数（非型号池预约直接忽略）"""
+    if booking.is_pooled:
+        release_pool_slot(booking.device_type_id, booking.booking_date, booking.time_slot, booking.slot_count)
+
@@ -0,0 +1,143 @@
+"""
+预约冲突批量处理（校内人员优先）
+一次查询取出某天所有占用时段的预约，按 设备-时段（或 型号池-时段）分组，
+组内按 已全部批准 > 校内人员 > 校外人员、再按提交时间排序，
+为整天的待审批预约一次性给出 批准 / 候补 / 拒绝 的处理方案，管理员审核方案即可。
+跨多个连续时段的预约与其重叠的预约归入同一组，按单个时段统计占用。
+"""
+from .models import Booking
+from .slots import booking_maintenance, slot_label, slot_overlap_q, slot_units
+
+# 校内人员类型（冲突时优先）
+INTERNAL_USER_TYPES = ('student', 'teacher')
+# 每个时段保留的候补数量，超出的直接建议拒绝
+WAITLIST_DEPTH = 3
+
+DECISION_LABELS = {
+    'keep': '已批准',
+    'approve': '建议批准',
+    'waitlist': '建议候补',
+    'reject': '建议拒绝',
+    'maintenance': '维护期间，建议拒绝',
+}
+
+
+def priority_key(booking):
+    """排序键：已全部批准的最先，其次校内人员，再按提交时间"""
+    return (
+        0 if booking.status == 'manager_approved' else 1,
+        0 if booking.applicant.user_type in INTERNAL_USER_TYPES else 1,
+        booking.create_time,
+        booking.id,
+    )
+
+
+def slot_key(booking):
+    """冲突分组键：具体设备按设备分组，型号池按型号分组"""
+    if booking.device_id:
+        return ('device', booking.device_id)
+    return ('type', booking.device_type_id)
+
+
+def overlap_clusters(members):
+    """把同一设备/型号的预约按时段范围拆分为互相重叠的簇"""
+    clusters = []
+    cluster_end = None
+    for booking in sorted(members, key=lambda item: (item.time_slot, item.slot_count)):
+        start, end = booking.time_slot, booking.time_slot + booking.slot_count
+        if cluster_end is None or start >= cluster_end:
+            clusters.append([])
+            cluster_end = end
+        clusters[-1].append(booking)
+        cluster_end = max(cluster_end, end)
+    return clusters
+
+
+def cluster_label(cluster):
+    """簇覆盖的时段文本"""
+    start = min(booking.time_slot for booking in cluster)
+    end = max(booking.time_slot + booking.slot_count for booking in cluster)
+    return slot_label(start, end - start)
+
+
+def build_resolution_plan(booking_date):
+    """
+    生成某一天的冲突处理方案
+    返回分组列表，每组包含 设备/时段/容量 与按优先级排好序的处理决定
+    """
+    bookings = Booking.objects.filter(
+        booking_date=booking_date,
+        status__in=Booking.ACTIVE_STATUSES,
+    ).select_related('applicant', 'device', 'device_type')
+
+    groups = {}
+    for booking in bookings:
+        groups.setdefault(slot_key(booking), []).append(booking)
+
+    plan = []
+    for key, device_members in groups.items():
+        first = device_members[0]
+        capacity = 1 if key[0] == 'device' else first.device_type.unit_count
+        for members in overlap_clusters(device_members):
+            members.sort(key=priority_key)
+            # 每个单个时段已分配的数量
+            occupied = {}
+            waitlisted = 0
+            contested = False
+            decisions = []
+            for booking in members:
+                units = slot_units(booking.time_slot, booking.slot_count)
+                label = None
+                fits = all(occupied.get(unit, 0) < capacity for unit in units)
+                if booking.status == 'manager_approved':
+                    decision = 'keep'
+                elif booking_maintenance(booking):
+                    # 与维护计划重叠（查进程内索引，不访问数据库）
+                    decision = 'reject'
+                    label = DECISION_LABELS['maintenance']
+                elif fits:
+                    decision = 'approve'
+                elif waitlisted < WAITLIST_DEPTH:
+                    decision = 'waitlist'
+                    waitlisted += 1
+                else:
+                    decision = 'reject'
+                if not fits:
+                    contested = True
+                if decision in ('keep', 'approve'):
+                    for unit in units:
+                        occupied[unit] = occupied.get(unit, 0) + 1
+                decisions.append({
+                    'booking': booking,
+                    'decision': decision,
+                    'decision_label': label or DECISION_LABELS[decision],
+                    'is_internal': booking.applicant.user_type in INTERNAL_USER_TYPES,
+                })
+            plan.append({
+                'device_label': first.device_code_display if key[0] == 'device' else f'{first.device_model}（型号池）',
+                'time_slot': cluster_label(members),
+                'slot_start': min(booking.time_slot for booking in members),
+                'capacity': capacity,
+                'contested': contested,
+                'decisions': decisions,
+            })
+
+    # 有冲突的分组排在前面
+    plan.sort(key=lambda group: (not group['contested'], group['device_label'], group['slot_start']))
+    return plan
+
+
+def internal_conflict_exists(booking):
+    """校外人员的预约是否与校内人员的占用预约冲突（审批校外预约前检查）"""
+    if booking.applicant.user_type in INTERNAL_USER_TYPES:
+        return False
+    conflicts = Booking.objects.filter(
+        slot_overlap_q(booking.time_slot, booking.slot_count),
+        booking_date=booking.booking_date,
+        status__in=Booking.ACTIVE_STATUSES,
+        applicant__user_type__in=INTERNAL_USER_TYPES,
+    ).exclude(id=booking.id)
+    if booking.device_id:
+        return conflicts.filter(device_id=booking.device_id).exists()
+    # 型号池：只有在校内预约已占满整个池时才算冲突
+    return conflicts.filter(device_type_id=booking.device_type_id).count() >= booking.device_type.unit_count
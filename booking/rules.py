@@ -0,0 +1,185 @@
+"""
+预约业务规则引擎：规则以声明式的表格列出（规则编号、适用环节、检查函数、提示），
+模块加载时按环节编译为元组，之后每次检查只需遍历对应环节的规则。
+检查前用 build_context 一次性预取一批预约共用的数据（申请人、指导教师等），
+因此校验单条预约与校验整个审批队列/周期预约的查询次数相同。
+"""
+from collections import namedtuple
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+from billing.utils import can_cancel
+from user.models import UserInfo
+
+# 规则适用的环节：提交申请 / 周期预约场次 / 指导教师审批 / 管理员与负责人审批 / 撤销
+STAGES = ('apply', 'series', 'advisor', 'approve', 'cancel')
+# 提前预约的天数范围
+MIN_ADVANCE_DAYS = 1
+MAX_ADVANCE_DAYS = 7
+# 各审批级别可以处理（批准 / 拒绝）的状态
+APPROVAL_STATUSES = {
+    'admin': ('pending',),
+    'manager': ('admin_approved',),
+}
+# 可撤销的状态
+CANCELLABLE_STATUSES = ('advisor_pending', 'pending', 'admin_approved', 'manager_approved', 'waitlisted')
+
+Rule = namedtuple('Rule', ['code', 'stages', 'check', 'message'])
+RuleViolation = namedtuple('RuleViolation', ['code', 'message'])
+
+
+class RuleContext:
+    """一批预约共用的预取数据"""
+
+    def __init__(self, today, applicants, advisor_ids, options):
+        self.today = today
+        self.applicants = applicants
+        self.advisor_ids = advisor_ids
+        self.options = options
+
+    def applicant(self, booking):
+        return self.applicants[booking.applicant_id]
+
+
+def build_context(bookings, today=None, **options):
+    """
+    预取一批预约的检查数据：未加载的申请人一次查询取出，学生预约的指导教师一次查询核对是否为在职教师
+    options 为环节参数，如审批环节的 level（'admin' / 'manager'）
+    """
+    applicant_field = bookings[0]._meta.get_field('applicant') if bookings else None
+    applicants = {}
+    missing = set()
+    for booking in bookings:
+        if applicant_field.is_cached(booking):
+            applicants[booking.applicant_id] = booking.applicant
+        else:
+            missing.add(booking.applicant_id)
+    missing -= applicants.keys()
+    if missing:
+        applicants.update(UserInfo.objects.in_bulk(missing))
+
+    wanted = {
+        booking.advisor_id for booking in bookings
+        if booking.advisor_id and applicants[booking.applicant_id].user_type == 'student'
+    }
+    advisor_ids = set()
+    if wanted:
+        advisor_ids = set(
+            UserInfo.objects.filter(id__in=wanted, user_type='teacher', is_active=True)
+            .values_list('id', flat=True)
+        )
+    return RuleContext(today or timezone.localdate(), applicants, advisor_ids, options)
+
+
+# -------------------------- 规则检查函数（返回 True 表示通过） --------------------------
+
+def _applicant_active(booking, ctx):
+    return ctx.applicant(booking).is_active
+
+
+def _advance_window(booking, ctx):
+    days = (booking.booking_date - ctx.today).days
+    return MIN_ADVANCE_DAYS <= days <= MAX_ADVANCE_DAYS
+
+
+def _min_advance(booking, ctx):
+    return (booking.booking_date - ctx.today).days >= MIN_ADVANCE_DAYS
+
+
+def _student_advisor(booking, ctx):
+    # 指导关系直接比较外键：预约的指导教师须是学生已关联的指导教师（尚未关联时任一在职教师均可）
+    applicant = ctx.applicant(booking)
+    if applicant.user_type != 'student':
+        return True
+    if booking.advisor_id not in ctx.advisor_ids:
+        return False
+    return applicant.advisor_teacher_id in (None, booking.advisor_id)
+
+
+def _advisor_approved(booking, ctx):
+    return not (ctx.applicant(booking).user_type == 'student' and booking.status == 'advisor_pending')
+
+
+def _external_two_level(booking, ctx):
+    # 校外人员：负责人只能终审管理员已批准的申请
+    if ctx.applicant(booking).user_type != 'external' or ctx.options.get('level') != 'manager':
+        return True
+    return booking.status == 'admin_approved'
+
+
+def _approve_status(booking, ctx):
+    # 已撤销、已过期、候补中或已审批完成的预约不能再批准（重复提交、过期的批量勾选）
+    level = ctx.options.get('level')
+    if level is None:
+        return any(booking.status in statuses for statuses in APPROVAL_STATUSES.values())
+    return booking.status in APPROVAL_STATUSES[level]
+
+
+def _cancel_status(booking, ctx):
+    return booking.status in CANCELLABLE_STATUSES
+
+
+def _cancel_deadline(booking, ctx):
+    # 候补中的预约未占用时段，随时可撤销
+    return booking.status == 'waitlisted' or can_cancel(booking, ctx.today)
+
+
+RULES = (
+    Rule('applicant_active', ('apply', 'series', 'advisor', 'approve'), _applicant_active,
+         '申请人的借用资格已被禁用，请联系管理员！'),
+    Rule('advance_window', ('apply',), _advance_window,
+         f'预约需提前 {MIN_ADVANCE_DAYS}-{MAX_ADVANCE_DAYS} 天申请！'),
+    Rule('series_advance', ('series',), _min_advance,
+         f'场次需至少提前 {MIN_ADVANCE_DAYS} 天申请'),
+    Rule('student_advisor', ('apply', 'series', 'approve'), _student_advisor,
+         '学生用户必须填写本人的指导教师编号！'),
+    Rule('advisor_approved', ('approve',), _advisor_approved,
+         '学生的申请需先经指导教师审批！'),
+    Rule('external_two_level', ('approve',), _external_two_level,
+         '校外人员的申请需先经管理员批准，再由负责人最终审批！'),
+    Rule('approve_status', ('approve',), _approve_status,
+         '该申请当前不在待审批状态，无法批准！'),
+    Rule('cancel_status', ('cancel',), _cancel_status,
+         '该申请已结束，无法撤销！'),
+    Rule('cancel_deadline', ('cancel',), _cancel_deadline,
+         '预约需至少提前一天撤销，当前已无法撤销！'),
+)
+
+
+def compile_rules(rules):
+    """按环节编译规则表：{环节: (规则, ...)}，规则引用未知环节时报错"""
+    compiled = {stage: [] for stage in STAGES}
+    for rule in rules:
+        for stage in rule.stages:
+            if stage not in compiled:
+                raise ImproperlyConfigured(f'预约规则 {rule.code} 引用了未知环节：{stage}')
+            compiled[stage].append(rule)
+    return {stage: tuple(stage_rules) for stage, stage_rules in compiled.items()}
+
+
+_COMPILED_RULES = compile_rules(RULES)
+
+
+def _check(booking, stage, ctx):
+    return [
+        RuleViolation(rule.code, rule.message)
+        for rule in _COMPILED_RULES[stage]
+        if not rule.check(booking, ctx)
+    ]
+
+
+def evaluate(booking, stage, context=None, **options):
+    """检查单条预约，返回违反的规则列表（空列表表示通过）；批量处理时传入共用的 context"""
+    if context is None:
+        context = build_context([booking], **options)
+    return _check(booking, stage, context)
+
+
+def evaluate_batch(bookings, stage, **options):
+    """批量检查，共用一次预取；返回与 bookings 顺序一致的违规列表"""
+    bookings = list(bookings)
+    if not bookings:
+        return []
+    context = build_context(bookings, **options)
+    return [_check(booking, stage, context) for booking in bookings]
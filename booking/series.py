@@ -0,0 +1,116 @@
+"""
+周期预约：按每周/隔周规律展开为多次预约，
+所有日期与已有预约的冲突用一次集合查询完成，业务规则对全部场次批量检查（共用一次预取），
+无冲突的场次一次性 bulk_create，冲突的场次逐条报告。
+"""
+from datetime import timedelta
+
+from django.db import transaction
+
+from .counters import adjust_user_booking_counters, user_booking_deltas
+from .inbox import adjust_inbox_counters, inbox_deltas
+from .models import Booking
+from .rules import evaluate_batch
+from .slots import slot_maintenance, slot_overlap_q
+from .utils import generate_booking_codes
+
+# 单个周期预约最多展开的场次（一个学期约20周）
+MAX_OCCURRENCES = 30
+
+
+def count_series_dates(start_date, end_date, interval_weeks):
+    """日期范围内按间隔周数应有的场次数（不受 MAX_OCCURRENCES 限制，用于提交前校验）"""
+    if end_date < start_date:
+        return 0
+    return (end_date - start_date).days // (7 * interval_weeks) + 1
+
+
+def expand_series_dates(start_date, end_date, interval_weeks):
+    """按间隔周数展开日期（以开始日期的星期几为准），超出 MAX_OCCURRENCES 的部分由调用方提前拒绝"""
+    step = timedelta(weeks=interval_weeks)
+    dates = []
+    current = start_date
+    while current <= end_date and len(dates) < MAX_OCCURRENCES:
+        dates.append(current)
+        current += step
+    return dates
+
+
+def check_series_conflicts(device, time_slot, slot_count, dates):
+    """一次查询找出与已批准预约（时段重叠）冲突的日期集合"""
+    return set(
+        Booking.objects.filter(
+            slot_overlap_q(time_slot, slot_count),
+            device=device,
+            booking_date__in=dates,
+            status__in=Booking.HELD_STATUSES,
+        ).values_list('booking_date', flat=True)
+    )
+
+
+def create_series_bookings(series, teacher_id='', advisor=None):
+    """
+    展开周期预约并批量创建无冲突的场次
+    返回每个场次的结果列表：{'date', 'status': 'created'/'conflict'/'maintenance'/'rule', 'booking_code', 'message'}
+    """
+    dates = expand_series_dates(series.start_date, series.end_date, series.interval_weeks)
+    conflicts = check_series_conflicts(series.device, series.time_slot, series.slot_count, dates)
+    # 维护计划查进程内索引，不额外访问数据库
+    maintenance_dates = {
+        d for d in dates
+        if slot_maintenance(series.device, None, d, series.time_slot, series.slot_count)
+    }
+    candidates = [
+        Booking(
+            applicant=series.applicant,
+            device=series.device,
+            booking_date=d,
+            time_slot=series.time_slot,
+            slot_count=series.slot_count,
+            purpose=series.purpose,
+            teacher_id=teacher_id,
+            advisor=advisor,
+            series=series,
+        )
+        for d in dates if d not in conflicts and d not in maintenance_dates
+    ]
+    for booking in candidates:
+        booking.status = booking.submitted_status()
+    # 业务规则批量检查
+    rule_messages = {}
+    bookings = []
+    for booking, violations in zip(candidates, evaluate_batch(candidates, 'series')):
+        if violations:
+            rule_messages[booking.booking_date] = violations[0].message
+        else:
+            bookings.append(booking)
+
+    code_by_date = {}
+    for booking, code in zip(bookings, generate_booking_codes(len(bookings))):
+        booking.booking_code = code
+        code_by_date[booking.booking_date] = code
+    with transaction.atomic():
+        Booking.objects.bulk_create(bookings, batch_size=200)
+        # bulk_create 不经过 save()，审批收件箱计数与申请人的借用次数按整批一次调整
+        adjust_inbox_counters(inbox_deltas(bookings))
+        adjust_user_booking_counters(user_booking_deltas(bookings))
+    for booking in bookings:
+        booking._inbox_state = booking._current_inbox_state()
+
+    results = []
+    for d in dates:
+        if d in maintenance_dates:
+            status = 'maintenance'
+        elif d in conflicts:
+            status = 'conflict'
+        elif d in rule_messages:
+            status = 'rule'
+        else:
+            status = 'created'
+        results.append({
+            'date': d,
+            'status': status,
+            'booking_code': code_by_date.get(d, ''),
+            'message': rule_messages.get(d, ''),
+        })
+    return results
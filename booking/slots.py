@@ -0,0 +1,134 @@
+"""
+预约时段单元：一天按2小时划分为12个时段（0 = 00:00-02:00，4 = 08:00-10:00，……），
+预约以 起始时段 time_slot + 连续时段数 slot_count 两个整数存储，一次申请可覆盖多个连续时段；
+时段是否被占用用一次区间重叠查询判断：已有.start < 新.end 且 已有.start + 已有.count > 新.start。
+时段名称与维护停用状态来自 SlotCatalog，在进程内缓存，修改后自动失效。
+"""
+import time
+
+from django.db.models import F, Q
+
+from devices.maintenance import find_maintenance, slot_datetime_range
+
+SLOT_MINUTES = 120
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+MAX_SLOT_COUNT = SLOTS_PER_DAY
+# 时段目录进程内缓存的最长有效期（秒），多进程部署时其他进程的修改最迟在此时间后生效
+CATALOG_CACHE_SECONDS = 60
+
+# 旧版时段文本到 (起始时段, 时段数) 的对应关系（旧数据导入使用）
+LEGACY_SLOT_NAMES = {
+    '上午': (4, 2),
+    '下午': (7, 2),
+    '晚上': (9, 2),
+    '全天': (0, SLOTS_PER_DAY),
+}
+
+_catalog_cache = {'slots': None, 'loaded_at': 0.0}
+
+
+def _format_minutes(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def default_slot_label(slot_index, slot_count=1):
+    """按时间计算的时段文本，如 "08:00-14:00" """
+    start = slot_index * SLOT_MINUTES
+    end = (slot_index + slot_count) * SLOT_MINUTES
+    return f"{_format_minutes(start)}-{_format_minutes(end)}"
+
+
+def parse_time_slot(time_slot):
+    """
+    把 "08:00-14:00" 形式的旧时段文本解析为 (起始时段, 时段数)
+    不是整时段边界的文本返回 None（旧数据导入使用）
+    """
+    try:
+        start, end = time_slot.split('-')
+        start_h, start_m = map(int, start.split(':'))
+        end_h, end_m = map(int, end.split(':'))
+    except (AttributeError, ValueError):
+        return LEGACY_SLOT_NAMES.get(time_slot)
+    start_min = start_h * 60 + start_m
+    end_min = end_h * 60 + end_m
+    if start_min % SLOT_MINUTES or end_min % SLOT_MINUTES or end_min <= start_min or end_min > 24 * 60:
+        return None
+    return start_min // SLOT_MINUTES, (end_min - start_min) // SLOT_MINUTES
+
+
+def get_slot_catalog():
+    """返回 {时段编号: SlotCatalog} 字典（进程内缓存）"""
+    now = time.monotonic()
+    slots = _catalog_cache['slots']
+    if slots is None or now - _catalog_cache['loaded_at'] > CATALOG_CACHE_SECONDS:
+        from .models import SlotCatalog
+        slots = {slot.index: slot for slot in SlotCatalog.objects.all()}
+        _catalog_cache['slots'] = slots
+        _catalog_cache['loaded_at'] = now
+    return slots
+
+
+def clear_slot_catalog_cache():
+    """时段目录修改后清空缓存"""
+    _catalog_cache['slots'] = None
+
+
+def slot_label(slot_index, slot_count=1):
+    """时段展示文本：单个时段优先使用目录中配置的名称"""
+    if slot_index is None:
+        return ''
+    if slot_count == 1:
+        slot = get_slot_catalog().get(slot_index)
+        if slot is not None and slot.label:
+            return slot.label
+    return default_slot_label(slot_index, slot_count)
+
+
+def bookable_slots():
+    """可预约（未停用）的时段列表，供申请页面渲染下拉框"""
+    return [slot for index, slot in sorted(get_slot_catalog().items()) if not slot.is_blackout]
+
+
+def validate_slot_range(slot_index, slot_count):
+    """校验时段范围，返回错误提示，合法时返回 None"""
+    if slot_index < 0 or slot_count < 1 or slot_index + slot_count > SLOTS_PER_DAY:
+        return '预约时段超出当天范围，请重新选择！'
+    catalog = get_slot_catalog()
+    for index in range(slot_index, slot_index + slot_count):
+        slot = catalog.get(index)
+        if slot is not None and slot.is_blackout:
+            return f'时段 {slot_label(index)} 正在维护停用（{slot.blackout_reason or "维护"}），请重新选择！'
+    return None
+
+
+def slot_units(slot_index, slot_count):
+    """时段范围拆分为单个时段编号（型号池按单个时段计数）"""
+    return list(range(slot_index, slot_index + slot_count))
+
+
+def slot_minutes(slot_index, slot_count):
+    """时段范围对应的 (开始分钟, 结束分钟)"""
+    return slot_index * SLOT_MINUTES, (slot_index + slot_count) * SLOT_MINUTES
+
+
+def slot_overlap_q(slot_index, slot_count, prefix=''):
+    """与给定时段范围重叠的预约过滤条件（prefix 用于跨关联查询，如 'booking__'）"""
+    return Q(**{
+        f'{prefix}time_slot__lt': slot_index + slot_count,
+        f'{prefix}time_slot__gt': slot_index - F(f'{prefix}slot_count'),
+    })
+
+
+def slot_maintenance(device, device_type, booking_date, slot_index, slot_count):
+    """预约时段范围内的维护计划（查进程内区间索引，不访问数据库），没有则返回 None"""
+    start, end = slot_datetime_range(booking_date, *slot_minutes(slot_index, slot_count))
+    if device is not None:
+        return find_maintenance(device.id, device.device_type_id, start, end)
+    if device_type is not None:
+        return find_maintenance(None, device_type.id, start, end)
+    return None
+
+
+def booking_maintenance(booking):
+    """预约所在时段的维护计划"""
+    return slot_maintenance(booking.device, booking.device_type, booking.booking_date, booking.time_slot, booking.slot_count)
@@ -0,0 +1,135 @@
+"""
+空闲时段推荐：所选时段被占用时，按 日期 → 时段 → 设备 的顺序首次适配（first-fit）给出最近的 K 个空闲时段
+一次查询取出搜索窗口内所有相关预约，按 设备-日期 构建时段占用位图（第 i 位 = 第 i 个时段被占用），
+判断一个候选时段只需一次位运算；时段停用与维护计划分别来自进程内的时段目录和维护区间索引。
+"""
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from devices.models import AVAILABLE_STATUSES, Device
+from .models import Booking
+from .slots import SLOTS_PER_DAY, SLOT_MINUTES, get_slot_catalog, slot_label, slot_maintenance
+
+# 搜索窗口最多天数
+MAX_SEARCH_DAYS = 14
+# 默认/最多返回的推荐数量
+DEFAULT_LIMIT = 5
+MAX_LIMIT = 20
+
+
+def range_mask(slot_index, slot_count):
+    """时段范围对应的位掩码"""
+    return ((1 << slot_count) - 1) << slot_index
+
+
+def find_devices(keyword):
+    """按型号（精确匹配优先）或关键字（型号/设备编号模糊匹配）查找候选设备，只返回可预约的设备"""
+    available = Device.objects.filter(status__in=AVAILABLE_STATUSES).order_by('device_code')
+    devices = list(available.filter(Q(model=keyword) | Q(device_type__model=keyword)))
+    if not devices:
+        devices = list(available.filter(Q(model__icontains=keyword) | Q(device_code__icontains=keyword)))
+    return devices
+
+
+def build_occupancy(devices, start_date, end_date):
+    """
+    一次查询构建占用位图
+    返回 (device_masks, pool_usage)：
+      device_masks {(设备ID, 日期): 位图}
+      pool_usage {(型号ID, 日期, 时段): 未分配单元的型号池预约数}
+    """
+    device_ids = [device.id for device in devices]
+    type_ids = {device.device_type_id for device in devices if device.device_type_id}
+    bookings = Booking.objects.filter(
+        booking_date__gte=start_date,
+        booking_date__lte=end_date,
+        status__in=Booking.ACTIVE_STATUSES,
+    ).filter(
+        Q(device_id__in=device_ids) | Q(device__isnull=True, device_type_id__in=type_ids)
+    ).values_list('device_id', 'device_type_id', 'booking_date', 'time_slot', 'slot_count')
+
+    device_masks = {}
+    pool_usage = {}
+    for device_id, device_type_id, booking_date, time_slot, slot_count in bookings:
+        if device_id:
+            key = (device_id, booking_date)
+            device_masks[key] = device_masks.get(key, 0) | range_mask(time_slot, slot_count)
+        else:
+            for index in range(time_slot, time_slot + slot_count):
+                key = (device_type_id, booking_date, index)
+                pool_usage[key] = pool_usage.get(key, 0) + 1
+    return device_masks, pool_usage
+
+
+def find_free_slots(devices, start_date, days=7, slot_count=1, limit=DEFAULT_LIMIT):
+    """
+    在 devices 中查找最近的 limit 个空闲时段
+    返回 [{'device', 'date', 'time_slot', 'slot_count', 'label'}]，按日期、时段、设备编号排序
+    """
+    if not devices:
+        return []
+    days = max(1, min(days, MAX_SEARCH_DAYS))
+    slot_count = max(1, min(slot_count, SLOTS_PER_DAY))
+    limit = max(1, min(limit, MAX_LIMIT))
+    end_date = start_date + timedelta(days=days - 1)
+    device_masks, pool_usage = build_occupancy(devices, start_date, end_date)
+
+    blackout_mask = 0
+    for index, slot in get_slot_catalog().items():
+        if slot.is_blackout:
+            blackout_mask |= 1 << index
+
+    # 型号池容量与当天各单元的直接占用，用于判断未分配的型号池预约是否已占满
+    units_by_type = {}
+    for device in devices:
+        if device.device_type_id:
+            units_by_type.setdefault(device.device_type_id, []).append(device.id)
+
+    now = timezone.localtime()
+    results = []
+    for offset in range(days):
+        day = start_date + timedelta(days=offset)
+        # 今天已开始的时段不再推荐
+        first_slot = 0
+        if day == now.date():
+            first_slot = (now.hour * 60 + now.minute) // SLOT_MINUTES + 1
+        for slot_index in range(first_slot, SLOTS_PER_DAY - slot_count + 1):
+            mask = range_mask(slot_index, slot_count)
+            if mask & blackout_mask:
+                continue
+            for device in devices:
+                if device_masks.get((device.id, day), 0) & mask:
+                    continue
+                if device.device_type_id and not _pool_has_room(
+                    device, day, slot_index, slot_count, units_by_type, device_masks, pool_usage
+                ):
+                    continue
+                if slot_maintenance(device, None, day, slot_index, slot_count):
+                    continue
+                results.append({
+                    'device': device,
+                    'date': day,
+                    'time_slot': slot_index,
+                    'slot_count': slot_count,
+                    'label': slot_label(slot_index, slot_count),
+                })
+                if len(results) >= limit:
+                    return results
+    return results
+
+
+def _pool_has_room(device, day, slot_index, slot_count, units_by_type, device_masks, pool_usage):
+    """未分配的型号池预约会占用该型号的空闲单元：空闲单元数需大于型号池预约数"""
+    type_id = device.device_type_id
+    units = units_by_type[type_id]
+    for index in range(slot_index, slot_index + slot_count):
+        pooled = pool_usage.get((type_id, day, index), 0)
+        if not pooled:
+            continue
+        bit = 1 << index
+        idle_units = sum(1 for unit in units if not device_masks.get((unit, day), 0) & bit)
+        if idle_units <= pooled:
+            return False
+    return True
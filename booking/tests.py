@@ -1,3 +1,909 @@
-from django.test import TestCase
+from django.test import TestCase, SimpleTestCase
+from datetime import date, timedelta
+from decimal import Decimal
+from importlib import import_module
 
-# Create your tests here.
+from devices.models import Device, DeviceType
+from devices.cache import bump_catalog_generation
+from devices.picker import clear_picker_index
+from user.models import UserInfo
+from booking.models import ApprovalRecord, Booking, BookingSeries, BookingWaitlist, DeviceTypeSlotCounter, SlotCatalog
+from booking.pool import pool_remaining, reserve_pool_slot, release_pool_slot
+from booking.assignment import plan_assignments, assign_pool_units
+from booking.resolver import build_resolution_plan, internal_conflict_exists
+from booking.waitlist import join_waitlist, free_booking_slot, promote_waitlist, waitlist_queue
+from booking.expiry import expire_stale_bookings
+from booking.rules import evaluate, evaluate_batch
+from booking.advisor import advisor_decide, advisor_inbox, resolve_advisor
+from booking.counters import rebuild_user_booking_counters
+from booking.inbox import inbox_counts, inbox_page, rebuild_inbox_counters
+from booking.models import InboxCounter
+from booking.series import count_series_dates, create_series_bookings, expand_series_dates
+from booking.suggest import DEFAULT_LIMIT, find_devices, find_free_slots
+from booking.slots import (
+    clear_slot_catalog_cache, get_slot_catalog, parse_time_slot, slot_label, slot_minutes, slot_overlap_q, validate_slot_range
+)
+from ledger.models import DeviceLedger
+
+
+class DeviceTypePoolTestCase(TestCase):
+    """设备型号池测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        self.device_type = DeviceType.objects.create(model='示波器X1', manufacturer='测试厂商')
+        self.device1 = Device.objects.create(
+            device_code='OSC001',
+            model='示波器X1',
+            status='available',
+            price_external=Decimal('50.00'),
+            device_type=self.device_type
+        )
+        self.device2 = Device.objects.create(
+            device_code='OSC002',
+            model='示波器X1',
+            status='available',
+            price_external=Decimal('50.00'),
+            device_type=self.device_type
+        )
+        self.device_type.refresh_from_db()
+
+        self.teacher = UserInfo.objects.create(
+            user_code='T001',
+            name='张老师',
+            user_type='teacher',
+            department='计算机学院',
+            phone='13800138001'
+        )
+        self.booking_date = date.today() + timedelta(days=2)
+
+    def test_unit_count_maintained(self):
+        """测试池容量随设备增删自动维护"""
+        self.assertEqual(self.device_type.unit_count, 2)
+        self.device2.delete()
+        self.device_type.refresh_from_db()
+        self.assertEqual(self.device_type.unit_count, 1)
+
+    def test_unit_count_excludes_unavailable(self):
+        """测试不可用的单元不计入池容量（单台保存与批量改状态）"""
+        from devices.bulk import bulk_set_status
+
+        self.device1.status = 'unavailable'
+        self.device1.save()
+        self.device_type.refresh_from_db()
+        self.assertEqual(self.device_type.unit_count, 1)
+        bulk_set_status([self.device2.id], 'unavailable')
+        self.device_type.refresh_from_db()
+        self.assertEqual(self.device_type.unit_count, 0)
+        bulk_set_status([self.device1.id, self.device2.id], 'available')
+        self.device_type.refresh_from_db()
+        self.assertEqual(self.device_type.unit_count, 2)
+
+    def test_apply_rolls_back_reservation(self):
+        """测试预约保存失败时型号池占用一并回滚"""
+        from unittest import mock
+        from django.contrib.auth.models import User
+        from django.db import IntegrityError
+
+        user = User.objects.create_user(username='T001', password='teacher123')
+        UserInfo.objects.filter(id=self.teacher.id).update(auth_user=user)
+        self.client.force_login(user)
+        self.client.raise_request_exception = False
+        with mock.patch.object(Booking, 'save', side_effect=IntegrityError):
+            response = self.client.post('/user/booking/apply/', {
+                'device_type_id': self.device_type.id, 'booking_date': self.booking_date.isoformat(),
+                'time_slot': 4, 'purpose': '测试',
+            })
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(pool_remaining(self.device_type, self.booking_date, 4), 2)
+
+    def test_reserve_until_full(self):
+        """测试占用计数不会超过池容量"""
+        self.assertTrue(reserve_pool_slot(self.device_type, self.booking_date, 4))
+        self.assertTrue(reserve_pool_slot(self.device_type, self.booking_date, 4))
+        self.assertFalse(reserve_pool_slot(self.device_type, self.booking_date, 4))
+        self.assertEqual(pool_remaining(self.device_type, self.booking_date, 4), 0)
+
+        release_pool_slot(self.device_type.id, self.booking_date, 4)
+        self.assertEqual(pool_remaining(self.device_type, self.booking_date, 4), 1)
+        counter = DeviceTypeSlotCounter.objects.get(device_type=self.device_type)
+        self.assertEqual(counter.reserved_count, 1)
+
+    def test_assign_units_skips_busy_device(self):
+        """测试批量分配跳过已被直接预约占用的设备单元"""
+        Booking.objects.create(
+            booking_code='BOOK20990101001',
+            applicant=self.teacher,
+            device=self.device1,
+            booking_date=self.booking_date,
+            time_slot=4,
+            status='manager_approved'
+        )
+        pooled = Booking.objects.create(
+            booking_code='BOOK20990101002',
+            applicant=self.teacher,
+            device_type=self.device_type,
+            booking_date=self.booking_date,
+            time_slot=4,
+            status='manager_approved'
+        )
+        self.assertEqual(pooled.device_code_display, '示波器X1（待分配）')
+
+        assigned, unassigned = assign_pool_units(self.device_type, self.booking_date)
+        self.assertEqual(assigned, 1)
+        self.assertEqual(unassigned, [])
+        pooled.refresh_from_db()
+        self.assertEqual(pooled.device_id, self.device2.id)
+        self.assertTrue(DeviceLedger.objects.filter(device=self.device2, operation_type='borrow').exists())
+
+    def test_assign_units_skips_unavailable_device(self):
+        """测试批量分配不会把预约分到不可用的设备单元"""
+        self.device1.status = 'unavailable'
+        self.device1.save()
+        pooled = [
+            Booking.objects.create(
+                booking_code=f'BOOK2099010100{index}',
+                applicant=self.teacher,
+                device_type=self.device_type,
+                booking_date=self.booking_date,
+                time_slot=4,
+                status='manager_approved'
+            )
+            for index in (1, 2)
+        ]
+
+        assigned, unassigned = assign_pool_units(self.device_type, self.booking_date)
+        self.assertEqual(assigned, 1)
+        self.assertEqual(len(unassigned), 1)
+        self.assertEqual(
+            Booking.objects.filter(id__in=[booking.id for booking in pooled], device__isnull=False).get().device_id,
+            self.device2.id
+        )
+        self.assertFalse(DeviceLedger.objects.filter(device=self.device1, operation_type='borrow').exists())
+
+
+class AssignmentEngineTestCase(SimpleTestCase):
+    """设备单元分配算法测试（纯计算，不访问数据库）"""
+
+    def test_slot_minutes(self):
+        """测试时段编号换算为分钟区间"""
+        self.assertEqual(slot_minutes(4, 1), (480, 600))
+        self.assertEqual(slot_minutes(4, 3), (480, 840))
+
+    def test_uses_minimum_units(self):
+        """测试所用单元数等于最大重叠数"""
+        pending = [
+            (1, 'a', 480, 600),
+            (2, 'b', 480, 720),
+            (3, 'c', 600, 720),
+            (4, 'd', 720, 840),
+        ]
+        assignments, unassigned = plan_assignments(['U1', 'U2'], [], pending)
+        self.assertEqual(unassigned, [])
+        self.assertEqual(len(assignments), 4)
+        self.assertNotEqual(assignments[1], assignments[2])
+        self.assertNotEqual(assignments[2], assignments[3])
+
+    def test_keeps_applicant_on_same_unit(self):
+        """测试同一申请人的连续预约沿用同一单元"""
+        pending = [
+            (1, 'a', 480, 600),
+            (2, 'b', 480, 600),
+            (3, 'b', 600, 720),
+        ]
+        assignments, _ = plan_assignments(['U1', 'U2'], [], pending)
+        self.assertEqual(assignments[2], assignments[3])
+
+    def test_respects_fixed_and_reports_overflow(self):
+        """测试固定占用不会被覆盖，超出容量的预约被报告"""
+        fixed = [('U1', 600, 720)]
+        pending = [
+            (1, 'a', 480, 720),
+            (2, 'b', 480, 720),
+        ]
+        assignments, unassigned = plan_assignments(['U1', 'U2'], fixed, pending)
+        self.assertEqual(assignments, {1: 'U2'})
+        self.assertEqual(unassigned, [2])
+
+
+class ConflictResolverTestCase(TestCase):
+    """校内优先冲突处理方案测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        self.device = Device.objects.create(device_code='DEV001', model='测试设备A', status='available')
+        self.external = UserInfo.objects.create(
+            user_code='E001', name='王先生', user_type='external', department='外部公司', phone='13800138003'
+        )
+        self.student = UserInfo.objects.create(
+            user_code='S001', name='李同学', user_type='student', department='计算机学院', phone='13800138002'
+        )
+        self.booking_date = date.today() + timedelta(days=3)
+        # 校外人员先提交
+        self.external_booking = Booking.objects.create(
+            booking_code='BOOK20990101001', applicant=self.external, device=self.device,
+            booking_date=self.booking_date, time_slot=4, status='pending'
+        )
+        self.student_booking = Booking.objects.create(
+            booking_code='BOOK20990101002', applicant=self.student, device=self.device,
+            booking_date=self.booking_date, time_slot=4, status='pending'
+        )
+
+    def test_internal_wins(self):
+        """测试校内人员优先于先提交的校外人员"""
+        plan = build_resolution_plan(self.booking_date)
+        self.assertEqual(len(plan), 1)
+        self.assertTrue(plan[0]['contested'])
+        decisions = {item['booking'].id: item['decision'] for item in plan[0]['decisions']}
+        self.assertEqual(decisions[self.student_booking.id], 'approve')
+        self.assertEqual(decisions[self.external_booking.id], 'waitlist')
+
+    def test_internal_conflict_guard(self):
+        """测试校外人员预约与校内预约冲突时被识别"""
+        self.assertTrue(internal_conflict_exists(self.external_booking))
+        self.assertFalse(internal_conflict_exists(self.student_booking))
+
+
+class WaitlistTestCase(TestCase):
+    """候补队列测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        self.device = Device.objects.create(device_code='DEV001', model='测试设备A', status='available')
+        self.teacher = UserInfo.objects.create(
+            user_code='T001', name='张老师', user_type='teacher', department='计算机学院', phone='13800138001'
+        )
+        self.booking_date = date.today() + timedelta(days=3)
+        self.holder = Booking.objects.create(
+            booking_code='BOOK20990101001', applicant=self.teacher, device=self.device,
+            booking_date=self.booking_date, time_slot=4, status='manager_approved'
+        )
+        self.first = Booking.objects.create(
+            booking_code='BOOK20990101002', applicant=self.teacher, device=self.device,
+            booking_date=self.booking_date, time_slot=4, status='waitlisted'
+        )
+        self.second = Booking.objects.create(
+            booking_code='BOOK20990101003', applicant=self.teacher, device=self.device,
+            booking_date=self.booking_date, time_slot=4, status='waitlisted'
+        )
+        join_waitlist(self.first)
+        join_waitlist(self.second)
+
+    def test_promote_head_on_free(self):
+        """测试时段释放后按先进先出递补队首"""
+        self.holder.status = 'cancelled'
+        self.holder.save()
+        promoted = free_booking_slot(self.holder)
+        self.assertEqual(promoted, self.first)
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.status, 'pending')
+        self.assertFalse(BookingWaitlist.objects.filter(booking=self.first).exists())
+        self.assertEqual(waitlist_queue(self.device.id, None, self.booking_date, 4).count(), 1)
+
+    def test_no_promotion_while_occupied(self):
+        """测试时段仍被占用时不递补"""
+        self.assertIsNone(promote_waitlist(self.device.id, None, self.booking_date, 4))
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.status, 'waitlisted')
+
+    def test_skips_blocked_head(self):
+        """测试队首跨越的时段仍被占用时，递补后面第一个时段合适的预约"""
+        Booking.objects.create(
+            booking_code='BOOK20990101004', applicant=self.teacher, device=self.device,
+            booking_date=self.booking_date, time_slot=5, status='manager_approved'
+        )
+        BookingWaitlist.objects.all().delete()
+        wide = Booking.objects.create(
+            booking_code='BOOK20990101005', applicant=self.teacher, device=self.device,
+            booking_date=self.booking_date, time_slot=4, slot_count=2, status='waitlisted'
+        )
+        join_waitlist(wide)
+        join_waitlist(self.first)
+        join_waitlist(self.second)
+        # 待审批的预约与申请时一样不阻塞递补
+        Booking.objects.create(
+            booking_code='BOOK20990101006', applicant=self.teacher, device=self.device,
+            booking_date=self.booking_date, time_slot=4, status='pending'
+        )
+        self.holder.status = 'cancelled'
+        self.holder.save()
+        self.assertEqual(free_booking_slot(self.holder), self.first)
+        wide.refresh_from_db()
+        self.assertEqual(wide.status, 'waitlisted')
+        self.assertEqual(
+            list(waitlist_queue(self.device.id, None, self.booking_date, 4).values_list('booking_id', flat=True)),
+            [wide.id, self.second.id],
+        )
+
+
+class BookingSeriesTestCase(TestCase):
+    """周期预约测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        self.device = Device.objects.create(device_code='DEV001', model='测试设备A', status='available')
+        self.teacher = UserInfo.objects.create(
+            user_code='T001', name='张老师', user_type='teacher', department='计算机学院', phone='13800138001'
+        )
+        self.start_date = date.today() + timedelta(days=7)
+
+    def test_expand_dates(self):
+        """测试隔周展开"""
+        dates = expand_series_dates(self.start_date, self.start_date + timedelta(weeks=6), 2)
+        self.assertEqual(dates, [self.start_date + timedelta(weeks=n) for n in (0, 2, 4, 6)])
+
+    def test_conflicting_occurrence_reported(self):
+        """测试与已批准预约冲突的场次单独报告，其余场次批量创建"""
+        Booking.objects.create(
+            booking_code='BOOK20990101001', applicant=self.teacher, device=self.device,
+            booking_date=self.start_date + timedelta(weeks=1), time_slot=4, status='manager_approved'
+        )
+        series = BookingSeries.objects.create(
+            applicant=self.teacher, device=self.device, time_slot=4,
+            start_date=self.start_date, end_date=self.start_date + timedelta(weeks=3), interval_weeks=1
+        )
+        results = create_series_bookings(series)
+        self.assertEqual([item['status'] for item in results], ['created', 'conflict', 'created', 'created'])
+        created_codes = [item['booking_code'] for item in results if item['status'] == 'created']
+        self.assertEqual(len(set(created_codes)), 3)
+        self.assertEqual(series.bookings.count(), 3)
+
+    def test_apply_rejects_too_many_occurrences(self):
+        """测试日期范围超过场次上限时整体拒绝，而不是只提交前面的场次"""
+        from django.contrib.auth.models import User
+
+        user = User.objects.create_user(username='T001', password='teacher123')
+        UserInfo.objects.filter(id=self.teacher.id).update(auth_user=user)
+        self.client.force_login(user)
+        self.assertEqual(count_series_dates(self.start_date, self.start_date + timedelta(weeks=30), 1), 31)
+        response = self.client.post('/user/booking/series/', {
+            'device_id': 'DEV001', 'time_slot': 4, 'slot_count': 1, 'interval_weeks': 1, 'purpose': '课程实验',
+            'start_date': self.start_date.isoformat(),
+            'end_date': (self.start_date + timedelta(weeks=30)).isoformat(),
+        })
+        self.assertContains(response, '共 31 个场次')
+        self.assertFalse(BookingSeries.objects.exists())
+        self.assertFalse(Booking.objects.exists())
+
+
+class SlotRangeTestCase(TestCase):
+    """连续多时段预约测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        self.device_type = DeviceType.objects.create(model='示波器X1')
+        self.device = Device.objects.create(
+            device_code='DEV001', model='示波器X1', status='available', device_type=self.device_type
+        )
+        self.device_type.refresh_from_db()
+        self.teacher = UserInfo.objects.create(
+            user_code='T001', name='张老师', user_type='teacher', department='计算机学院', phone='13800138001'
+        )
+        self.booking_date = date.today() + timedelta(days=3)
+
+    def test_parse_and_validate(self):
+        """测试旧时段文本换算与时段范围校验"""
+        self.assertEqual(parse_time_slot('08:00-14:00'), (4, 3))
+        self.assertEqual(parse_time_slot('上午'), (4, 2))
+        self.assertIsNone(parse_time_slot('08:30-09:00'))
+        self.assertIsNone(validate_slot_range(4, 3))
+        self.assertIsNotNone(validate_slot_range(10, 3))
+
+    def test_migration_parse_legacy_slot(self):
+        """测试数据迁移中的时段换算：未对齐的时间取覆盖时段，无法识别的不按全天处理"""
+        for name in ('0005_booking_slot_range', '0006_slot_catalog_integer_time_slot'):
+            parse_legacy_slot = import_module(f'booking.migrations.{name}').parse_legacy_slot
+            self.assertEqual(parse_legacy_slot('08:00-14:00'), (4, 3))
+            self.assertEqual(parse_legacy_slot('09:00-11:00'), (4, 2))
+            self.assertEqual(parse_legacy_slot('全天'), (0, 12))
+            self.assertIsNone(parse_legacy_slot('foo'))
+            self.assertIsNone(parse_legacy_slot('11:00-09:00'))
+            self.assertIsNone(parse_legacy_slot(None))
+
+    def test_overlap_query(self):
+        """测试区间重叠查询"""
+        booking = Booking.objects.create(
+            booking_code='BOOK20990101001', applicant=self.teacher, device=self.device,
+            booking_date=self.booking_date, time_slot=4, slot_count=3, status='manager_approved'
+        )
+        self.assertEqual(booking.time_slot_label, '08:00-14:00')
+        held = Booking.objects.filter(device=self.device, booking_date=self.booking_date)
+        self.assertTrue(held.filter(slot_overlap_q(6, 2)).exists())
+        self.assertTrue(held.filter(slot_overlap_q(5, 1)).exists())
+        self.assertFalse(held.filter(slot_overlap_q(7, 1)).exists())
+        self.assertFalse(held.filter(slot_overlap_q(3, 1)).exists())
+
+    def test_pool_reserves_every_slot(self):
+        """测试型号池多时段占用全部成功或全部回滚"""
+        self.assertTrue(reserve_pool_slot(self.device_type, self.booking_date, 5))
+        self.assertFalse(reserve_pool_slot(self.device_type, self.booking_date, 4, 3))
+        # 回滚后 08:00-10:00 仍然空闲
+        self.assertEqual(pool_remaining(self.device_type, self.booking_date, 4), 1)
+        self.assertEqual(pool_remaining(self.device_type, self.booking_date, 4, 3), 0)
+
+
+class SlotCatalogTestCase(TestCase):
+    """时段目录测试"""
+
+    def tearDown(self):
+        """测试数据回滚后清空进程内缓存"""
+        clear_slot_catalog_cache()
+
+    def test_catalog_seeded(self):
+        """测试迁移初始化了12个时段"""
+        self.assertEqual(SlotCatalog.objects.count(), 12)
+        self.assertEqual(slot_label(4), '08:00-10:00')
+        self.assertEqual(slot_label(4, 3), '08:00-14:00')
+
+    def test_blackout_rejected(self):
+        """测试维护停用的时段不可预约，修改后缓存立即失效"""
+        slot = SlotCatalog.objects.get(index=5)
+        slot.is_blackout = True
+        slot.blackout_reason = '设备保养'
+        slot.save()
+        self.assertIn('设备保养', validate_slot_range(4, 3))
+        self.assertIsNone(validate_slot_range(6, 2))
+
+
+class SuggestSlotsTestCase(TestCase):
+    """空闲时段推荐测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        self.device_type = DeviceType.objects.create(model='示波器X1')
+        self.device1 = Device.objects.create(
+            device_code='OSC001', model='示波器X1', status='available', device_type=self.device_type
+        )
+        self.device2 = Device.objects.create(
+            device_code='OSC002', model='示波器X1', status='available', device_type=self.device_type
+        )
+        self.teacher = UserInfo.objects.create(
+            user_code='T001', name='张老师', user_type='teacher', department='计算机学院', phone='13800138001'
+        )
+        self.day = date.today() + timedelta(days=3)
+
+    def test_first_fit_across_units(self):
+        """测试按时段优先、跨设备首次适配"""
+        Booking.objects.create(
+            booking_code='BOOK20990101001', applicant=self.teacher, device=self.device1,
+            booking_date=self.day, time_slot=0, slot_count=5, status='manager_approved'
+        )
+        devices = find_devices('示波器X1')
+        results = find_free_slots(devices, self.day, days=1, slot_count=2, limit=3)
+        found = [(item['device'].device_code, item['time_slot']) for item in results]
+        self.assertEqual(found, [('OSC002', 0), ('OSC002', 1), ('OSC002', 2)])
+
+    def test_pooled_bookings_consume_units(self):
+        """测试未分配的型号池预约占用空闲单元"""
+        for code in ('BOOK20990101001', 'BOOK20990101002'):
+            Booking.objects.create(
+                booking_code=code, applicant=self.teacher, device_type=self.device_type,
+                booking_date=self.day, time_slot=0, status='pending'
+            )
+        devices = find_devices('示波器')
+        self.assertEqual(len(devices), 2)
+        get_slot_catalog()
+        # 占用情况一次查询取出
+        with self.assertNumQueries(1):
+            results = find_free_slots(devices, self.day, days=1, limit=1)
+        self.assertEqual(results[0]['time_slot'], 1)
+
+    def test_skips_unavailable_devices(self):
+        """测试不可用的同型号设备不参与推荐"""
+        Device.objects.create(device_code='OSC000', model='示波器X1', status='unavailable', device_type=self.device_type)
+        Booking.objects.create(
+            booking_code='BOOK20990101001', applicant=self.teacher, device=self.device1,
+            booking_date=self.day, time_slot=0, status='manager_approved'
+        )
+        self.assertEqual([device.device_code for device in find_devices('示波器X1')], ['OSC001', 'OSC002'])
+        self.assertEqual([device.device_code for device in find_devices('OSC')], ['OSC001', 'OSC002'])
+        results = find_free_slots(find_devices('示波器X1'), self.day, days=1, limit=1)
+        self.assertEqual((results[0]['device'].device_code, results[0]['time_slot']), ('OSC002', 0))
+
+    def test_api_limit_is_bounded(self):
+        """测试推荐数量参数无效或越界时按默认值/上下限处理，不返回错误"""
+        params = {'keyword': '示波器X1', 'date': self.day.isoformat(), 'days': 1}
+        for limit, expected in (('0', 1), ('-3', 1), ('x', DEFAULT_LIMIT), ('100', 20)):
+            response = self.client.get('/user/suggest-slots/', {**params, 'limit': limit})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()['results']), expected)
+        response = self.client.get('/user/suggest-slots/', {**params, 'slot_count': -1})
+        self.assertEqual(response.status_code, 200)
+
+
+class ExpireBookingsTestCase(TestCase):
+    """过期预约批量清理测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        self.device = Device.objects.create(device_code='DEV001', model='测试设备A', status='available')
+        self.teacher = UserInfo.objects.create(
+            user_code='T001', name='张老师', user_type='teacher', department='计算机学院', phone='13800138001'
+        )
+        yesterday = date.today() - timedelta(days=1)
+        tomorrow = date.today() + timedelta(days=1)
+        for code, booking_date, status in [
+            ('BOOK20990101001', yesterday, 'pending'),
+            ('BOOK20990101002', yesterday, 'admin_approved'),
+            ('BOOK20990101003', yesterday, 'manager_approved'),
+            ('BOOK20990101004', tomorrow, 'pending'),
+        ]:
+            Booking.objects.create(
+                booking_code=code, applicant=self.teacher, device=self.device,
+                booking_date=booking_date, time_slot=4, status=status
+            )
+
+    def test_expire_with_audit_records(self):
+        """测试只过期已过日期的未完成预约，并写入审批记录"""
+        counts = expire_stale_bookings(date.today())
+        self.assertEqual(counts, {'advisor_pending': 0, 'pending': 1, 'admin_approved': 1, 'waitlisted': 0})
+        self.assertEqual(Booking.objects.filter(status='expired').count(), 2)
+        self.assertEqual(Booking.objects.get(booking_code='BOOK20990101004').status, 'pending')
+        records = ApprovalRecord.objects.filter(action='expire')
+        self.assertEqual(records.count(), 2)
+        self.assertEqual(
+            set(records.values_list('approval_level', flat=True)), {'admin', 'manager'}
+        )
+
+    def test_dry_run(self):
+        """测试预览模式不修改数据"""
+        counts = expire_stale_bookings(date.today(), dry_run=True)
+        self.assertEqual(counts['pending'], 1)
+        self.assertFalse(Booking.objects.filter(status='expired').exists())
+
+
+class BookingRulesTestCase(TestCase):
+    """预约业务规则引擎测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        self.device = Device.objects.create(device_code='DEV001', model='测试设备A', status='available')
+        self.teacher = UserInfo.objects.create(
+            user_code='T001', name='张老师', user_type='teacher', department='计算机学院', phone='13800138001'
+        )
+        self.student = UserInfo.objects.create(
+            user_code='S001', name='李同学', user_type='student', department='计算机学院', phone='13800138002'
+        )
+        self.external = UserInfo.objects.create(
+            user_code='E001', name='王先生', user_type='external', department='外部公司', phone='13800138003'
+        )
+        self.booking_date = date.today() + timedelta(days=2)
+
+    def make_booking(self, applicant, **kwargs):
+        fields = {'device': self.device, 'booking_date': self.booking_date, 'time_slot': 4, 'status': 'pending'}
+        fields.update(kwargs)
+        return Booking(applicant=applicant, **fields)
+
+    def codes(self, violations):
+        return [violation.code for violation in violations]
+
+    def test_advance_window(self):
+        """测试需提前1-7天申请"""
+        self.assertEqual(evaluate(self.make_booking(self.teacher), 'apply'), [])
+        for days in (0, 8):
+            booking = self.make_booking(self.teacher, booking_date=date.today() + timedelta(days=days))
+            self.assertEqual(self.codes(evaluate(booking, 'apply')), ['advance_window'])
+
+    def test_student_advisor_and_disabled_user(self):
+        """测试学生需选择本人的指导教师，禁用用户不能申请"""
+        self.assertEqual(self.codes(evaluate(self.make_booking(self.student), 'apply')), ['student_advisor'])
+        self.assertEqual(evaluate(self.make_booking(self.student, advisor=self.teacher), 'apply'), [])
+        other = UserInfo.objects.create(
+            user_code='T002', name='刘老师', user_type='teacher', department='计算机学院', phone='13800138004'
+        )
+        self.student.set_advisor(other)
+        self.assertEqual(self.codes(evaluate(self.make_booking(self.student, advisor=self.teacher), 'apply')), ['student_advisor'])
+        self.teacher.is_active = False
+        self.assertEqual(self.codes(evaluate(self.make_booking(self.teacher), 'apply')), ['applicant_active'])
+
+    def test_external_two_level_approval(self):
+        """测试校外人员需管理员批准后再由负责人终审"""
+        booking = self.make_booking(self.external)
+        self.assertEqual(evaluate(booking, 'approve', level='admin'), [])
+        self.assertEqual(
+            self.codes(evaluate(booking, 'approve', level='manager')), ['external_two_level', 'approve_status']
+        )
+        booking.status = 'admin_approved'
+        self.assertEqual(evaluate(booking, 'approve', level='manager'), [])
+
+    def test_approve_status(self):
+        """测试只能批准处于本级待审批状态的预约"""
+        for status in ('cancelled', 'expired', 'waitlisted', 'manager_approved', 'admin_rejected'):
+            booking = self.make_booking(self.teacher, status=status)
+            self.assertEqual(self.codes(evaluate(booking, 'approve', level='admin')), ['approve_status'])
+        booking = self.make_booking(self.teacher, status='admin_approved')
+        self.assertEqual(self.codes(evaluate(booking, 'approve', level='admin')), ['approve_status'])
+        self.assertEqual(evaluate(booking, 'approve', level='manager'), [])
+
+    def test_cancel_rules(self):
+        """测试撤销规则：已结束的不能撤销，需提前一天，候补中的除外"""
+        self.assertEqual(evaluate(self.make_booking(self.teacher), 'cancel'), [])
+        self.assertEqual(self.codes(evaluate(self.make_booking(self.teacher, status='cancelled'), 'cancel')), ['cancel_status'])
+        today = self.make_booking(self.teacher, booking_date=date.today())
+        self.assertEqual(self.codes(evaluate(today, 'cancel')), ['cancel_deadline'])
+        today.status = 'waitlisted'
+        self.assertEqual(evaluate(today, 'cancel'), [])
+
+    def test_batch_shares_prefetch(self):
+        """测试批量检查共用预取：查询次数与预约数量无关"""
+        for index in range(50):
+            Booking.objects.create(
+                booking_code=f'BOOK20990101{index:03d}', applicant=self.student if index % 2 else self.external,
+                device=self.device, booking_date=self.booking_date, time_slot=index % 12,
+                advisor=self.teacher if index % 4 == 1 else None, status='pending'
+            )
+        bookings = list(Booking.objects.all())
+        with self.assertNumQueries(2):
+            results = evaluate_batch(bookings, 'approve', level='admin')
+        self.assertEqual(len(results), 50)
+        # 未填写指导教师的学生预约（25 - 13 条）不能批准
+        self.assertEqual(sum(1 for violations in results if violations), 25 - 13)
+
+    def test_series_rules(self):
+        """测试周期预约场次逐条检查规则，过早的场次不提交"""
+        series = BookingSeries.objects.create(
+            applicant=self.teacher, device=self.device, time_slot=4,
+            start_date=date.today(), end_date=date.today() + timedelta(weeks=2), interval_weeks=1
+        )
+        results = create_series_bookings(series)
+        self.assertEqual([item['status'] for item in results], ['rule', 'created', 'created'])
+        self.assertEqual(Booking.objects.filter(series=series).count(), 2)
+
+
+class AdvisorApprovalTestCase(TestCase):
+    """指导教师审批测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        from django.contrib.auth.models import User
+        self.device = Device.objects.create(device_code='DEV001', model='测试设备A', status='available')
+        self.teacher_user = User.objects.create_user(username='T001', password='teacher123')
+        self.teacher = UserInfo.objects.create(
+            user_code='T001', name='张老师', user_type='teacher', department='计算机学院',
+            phone='13800138001', auth_user=self.teacher_user
+        )
+        self.student = UserInfo.objects.create(
+            user_code='S001', name='李同学', user_type='student', department='计算机学院', phone='13800138002'
+        )
+        self.student.set_advisor(self.teacher)
+        self.student.save()
+        self.booking = Booking.objects.create(
+            booking_code='BOOK20990101001', applicant=self.student, device=self.device, advisor=self.teacher,
+            booking_date=date.today() + timedelta(days=2), time_slot=4, status='advisor_pending'
+        )
+
+    def test_submitted_status(self):
+        """测试学生预约先进入指导教师审批"""
+        self.assertEqual(self.booking.submitted_status(), 'advisor_pending')
+        self.assertEqual(resolve_advisor(self.student), self.teacher)
+        self.assertIn(self.booking, advisor_inbox(self.teacher))
+
+    def test_admin_cannot_skip_advisor(self):
+        """测试未经指导教师审批的学生预约不能由管理员批准"""
+        self.assertEqual(
+            [v.code for v in evaluate(self.booking, 'approve', level='admin')], ['advisor_approved', 'approve_status']
+        )
+
+    def test_inbox_approve_and_reject(self):
+        """测试教师在收件箱批准（转管理员审批）和拒绝"""
+        self.client.login(username='T001', password='teacher123')
+        self.client.post('/user/booking/advisor/', {'approve': str(self.booking.id)})
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, 'pending')
+        self.assertTrue(ApprovalRecord.objects.filter(booking=self.booking, approval_level='advisor').exists())
+        self.assertEqual(evaluate(self.booking, 'approve', level='admin'), [])
+
+        other = Booking.objects.create(
+            booking_code='BOOK20990101002', applicant=self.student, device=self.device, advisor=self.teacher,
+            booking_date=date.today() + timedelta(days=2), time_slot=6, status='advisor_pending'
+        )
+        self.client.post('/user/booking/advisor/', {'booking_ids': [str(other.id)], 'batch_reject': '1'})
+        other.refresh_from_db()
+        self.assertEqual(other.status, 'advisor_rejected')
+
+
+class ApprovalInboxTestCase(TestCase):
+    """审批收件箱计数与分页接口测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        from django.contrib.auth.models import Group, User
+        self.device = Device.objects.create(device_code='DEV001', model='测试设备A', status='available')
+        self.teacher = UserInfo.objects.create(
+            user_code='T001', name='张老师', user_type='teacher', department='计算机学院', phone='13800138001'
+        )
+        self.student = UserInfo.objects.create(
+            user_code='S001', name='李同学', user_type='student', department='计算机学院', phone='13800138002'
+        )
+        self.external = UserInfo.objects.create(
+            user_code='E001', name='王先生', user_type='external', department='外部公司', phone='13800138003'
+        )
+        self.admin_user = User.objects.create_user(username='admin', password='admin123')
+        self.admin_user.groups.add(Group.objects.create(name='设备管理员'))
+        self.booking_date = date.today() + timedelta(days=2)
+
+    def make_booking(self, index, applicant, status, **kwargs):
+        return Booking.objects.create(
+            booking_code=f'BOOK20990101{index:03d}', applicant=applicant, device=self.device,
+            booking_date=self.booking_date, time_slot=index % 12, status=status, **kwargs
+        )
+
+    def counts(self):
+        return {
+            (role, owner_key): count
+            for role, owner_key, count in InboxCounter.objects.exclude(count=0).values_list('role', 'owner_key', 'count')
+        }
+
+    def test_counters_follow_transitions(self):
+        """测试计数随状态变化维护，与重建结果一致"""
+        advised = self.make_booking(1, self.student, 'advisor_pending', advisor=self.teacher)
+        self.make_booking(2, self.teacher, 'pending')
+        external = self.make_booking(3, self.external, 'admin_approved')
+        self.assertEqual(inbox_counts([('advisor', self.teacher.id), ('admin', 0), ('manager', 0)]),
+                         {'advisor': 1, 'admin': 1, 'manager': 1})
+
+        advisor_decide(Booking.objects.get(id=advised.id), None, 'approve')
+        external.status = 'manager_approved'
+        external.save()
+        expire_stale_bookings(self.booking_date + timedelta(days=1))
+        self.assertEqual(self.counts(), {})
+
+        series = BookingSeries.objects.create(
+            applicant=self.student, device=self.device, time_slot=4,
+            start_date=self.booking_date, end_date=self.booking_date + timedelta(weeks=1), interval_weeks=1
+        )
+        create_series_bookings(series, advisor=self.teacher)
+        Booking.objects.filter(series=series).first().delete()
+        snapshot = self.counts()
+        self.assertEqual(snapshot, {('advisor', self.teacher.id): 1})
+        rebuild_inbox_counters()
+        self.assertEqual(self.counts(), snapshot)
+
+    def test_cascade_delete_releases_counters(self):
+        """测试删除设备级联删除预约时，收件箱角标与申请人计数同步扣减"""
+        self.make_booking(1, self.teacher, 'pending')
+        self.assertEqual(inbox_counts([('admin', 0)]), {'admin': 1})
+        self.device.delete()
+        self.assertEqual(inbox_counts([('admin', 0)]), {'admin': 0})
+        teacher = UserInfo.objects.get(id=self.teacher.id)
+        self.assertEqual((teacher.booking_count, teacher.pending_booking_count), (0, 0))
+        self.assertEqual(rebuild_user_booking_counters(), 0)
+
+    def test_cursor_pagination(self):
+        """测试游标分页不重不漏，每页一次查询"""
+        for index in range(25):
+            self.make_booking(index, self.teacher, 'pending')
+        self.make_booking(30, self.student, 'advisor_pending', advisor=self.teacher)
+        inbox_page('admin', limit=1)  # 预热进程内时段目录
+        seen = []
+        cursor = None
+        while True:
+            with self.assertNumQueries(1):
+                results, cursor = inbox_page('admin', cursor=cursor, limit=10)
+            seen.extend(item['booking_code'] for item in results)
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len(set(seen)), 25)
+
+    def test_inbox_api(self):
+        """测试收件箱接口的筛选、角标与权限"""
+        self.make_booking(1, self.teacher, 'pending')
+        self.make_booking(2, self.external, 'pending')
+        self.client.login(username='admin', password='admin123')
+        data = self.client.get('/user/booking/inbox/', {'user_type': 'external'}).json()
+        self.assertEqual(data['role'], 'admin')
+        self.assertEqual(data['counts'], {'admin': 2})
+        self.assertEqual([item['booking_code'] for item in data['results']], ['BOOK20990101002'])
+        self.assertEqual(self.client.get('/user/booking/inbox/', {'role': 'manager'}).status_code, 403)
+        self.assertEqual(self.client.get('/user/booking/inbox/', {'cursor': '!!'}).status_code, 400)
+
+
+class UserBookingCounterTestCase(TestCase):
+    """用户借用次数计数测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        self.device = Device.objects.create(device_code='DEV001', model='测试设备A', status='available')
+        self.teacher = UserInfo.objects.create(
+            user_code='T001', name='张老师', user_type='teacher', department='计算机学院', phone='13800138001'
+        )
+        self.booking_date = date.today() + timedelta(days=2)
+
+    def make_booking(self, index, status='pending'):
+        return Booking.objects.create(
+            booking_code=f'BOOK20990102{index:03d}', applicant=self.teacher, device=self.device,
+            booking_date=self.booking_date, time_slot=index, status=status
+        )
+
+    def counters(self):
+        user = UserInfo.objects.get(id=self.teacher.id)
+        return (user.booking_count, user.pending_booking_count, user.approved_booking_count,
+                user.rejected_booking_count, user.cancelled_booking_count)
+
+    def test_counters_follow_bookings(self):
+        """测试计数随预约创建、状态变化、批量过期、删除维护，与重建结果一致"""
+        approved = self.make_booking(1)
+        rejected = self.make_booking(2)
+        self.make_booking(3)
+        self.assertEqual(self.counters(), (3, 3, 0, 0, 0))
+
+        approved.status = 'manager_approved'
+        approved.save(update_fields=['status', 'update_time'])
+        rejected = Booking.objects.only('id', 'applicant_id').get(id=rejected.id)
+        rejected.status = 'admin_rejected'
+        rejected.save(update_fields=['status'])
+        expire_stale_bookings(self.booking_date + timedelta(days=1))
+        self.assertEqual(self.counters(), (3, 0, 1, 1, 1))
+
+        series = BookingSeries.objects.create(
+            applicant=self.teacher, device=self.device, time_slot=6,
+            start_date=self.booking_date, end_date=self.booking_date + timedelta(weeks=1), interval_weeks=1
+        )
+        create_series_bookings(series)
+        approved.delete()
+        self.assertEqual(self.counters(), (4, 2, 0, 1, 1))
+        self.assertEqual(rebuild_user_booking_counters(), 0)
+
+    def test_rebuild_repairs_drift(self):
+        """测试重建命令修复不一致的计数"""
+        self.make_booking(1)
+        UserInfo.objects.filter(id=self.teacher.id).update(booking_count=9, pending_booking_count=0)
+        self.assertEqual(rebuild_user_booking_counters(), 1)
+        self.assertEqual(self.counters(), (1, 1, 0, 0, 0))
+
+
+class DeviceTypeaheadTestCase(TestCase):
+    """预约页面设备输入联想接口与设备缓存测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        from django.contrib.auth.models import User
+        self.device = Device.objects.create(device_code='DEV001', model='测试设备A', status='available')
+        Device.objects.create(device_code='DEV002', model='测试设备B', status='unavailable')
+        user = User.objects.create_user(username='T001', password='teacher123')
+        UserInfo.objects.create(
+            user_code='T001', name='张老师', user_type='teacher', department='计算机学院',
+            phone='13800138001', auth_user=user
+        )
+        self.client.force_login(user)
+
+    def tearDown(self):
+        """测试数据回滚后清空进程内索引与设备缓存"""
+        clear_picker_index()
+        bump_catalog_generation()
+
+    def test_typeahead_api(self):
+        """测试接口只返回可预约设备"""
+        response = self.client.get('/user/booking/devices/', {'q': 'dev'})
+        self.assertEqual(response.json()['results'], [
+            {'device_code': 'DEV001', 'model': '测试设备A', 'manufacturer': '未知厂商'}
+        ])
+        self.assertEqual(self.client.get('/user/booking/devices/', {'q': 'dev', 'limit': 'x'}).status_code, 400)
+
+    def test_apply_page_preselects_device(self):
+        """测试预约页面不再列出设备，从设备查询页进入时预填设备"""
+        response = self.client.get('/user/booking/apply/', {'device_id': self.device.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('devices', response.context)
+        self.assertContains(response, 'value="DEV001"')
+        self.assertNotContains(response, 'DEV002')
+
+    def test_check_availability_uses_device_cache(self):
+        """测试设备缓存命中后，空闲查询只查预约表"""
+        params = {'device_id': 'DEV001', 'date': (date.today() + timedelta(days=2)).isoformat(), 'time_slot': 1}
+        self.assertTrue(self.client.get('/user/check-availability/', params).json()['available'])
+        with self.assertNumQueries(1):  # 只有预约重叠查询
+            self.assertTrue(self.client.get('/user/check-availability/', params).json()['available'])
+
+    def test_check_availability_matches_apply(self):
+        """测试空闲查询与提交申请口径一致：待审批的预约不占用时段，已批准的占用"""
+        booking_date = date.today() + timedelta(days=2)
+        params = {'device_id': 'DEV001', 'date': booking_date.isoformat(), 'time_slot': 4}
+        booking = Booking.objects.create(
+            booking_code='BOOK20990101001', applicant=UserInfo.objects.get(user_code='T001'),
+            device=self.device, booking_date=booking_date, time_slot=4, status='pending'
+        )
+        self.assertTrue(self.client.get('/user/check-availability/', params).json()['available'])
+        Booking.objects.filter(id=booking.id).update(status='admin_approved')
+        self.assertFalse(self.client.get('/user/check-availability/', params).json()['available'])
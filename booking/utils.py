@@ -8,4 +8,10 @@ def generate_booking_code():
     count = Booking.objects.filter(booking_code__startswith=f"BOOK{today}").count() + 1
     # 补零到3位
     serial_num = str(count).zfill(3)
-    return f"BOOK{today}{serial_num}"
\ No newline at end of file
+    return f"BOOK{today}{serial_num}"
+
+def generate_booking_codes(count):
+    """批量生成预约编号：一次统计今日已有数量，再连续分配 count 个序号"""
+    today = datetime.date.today().strftime("%Y%m%d")
+    start = Booking.objects.filter(booking_code__startswith=f"BOOK{today}").count() + 1
+    return [f"BOOK{today}{str(start + offset).zfill(3)}" for offset in range(count)]
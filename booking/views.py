@@ -2,11 +2,33 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from user.models import UserInfo
-from devices.models import Device
-from .models import Booking
+from billing.utils import record_refund
+from devices.models import AVAILABLE_STATUSES, Device, DeviceType
+from devices.cache import get_cached_device, get_device_record
+from devices.picker import DEFAULT_PICKER_LIMIT, pick_devices
+from .models import Booking, BookingSeries
 from .utils import generate_booking_code
+from .series import count_series_dates, create_series_bookings, MAX_OCCURRENCES
+from .pool import claim_booking_slot, pool_remaining
+from .waitlist import join_waitlist, leave_waitlist, free_booking_slot, waitlist_queue
+from .slots import bookable_slots, validate_slot_range, slot_overlap_q, slot_maintenance
+from .suggest import find_devices, find_free_slots, DEFAULT_LIMIT
+from .rules import evaluate, evaluate_batch
+from .advisor import advisor_decide, advisor_inbox, resolve_advisor
+from .inbox import DEFAULT_PAGE_SIZE, InvalidCursor, inbox_counts, inbox_page, user_inboxes
 from django.http import JsonResponse
 from django.urls import reverse
+from django.db import transaction
+from django.utils import timezone
+from datetime import datetime
+
+def _preselected_device(request):
+    """GET 参数 device_id（设备ID）对应的可预约设备，用于预填预约表单"""
+    device_id = request.GET.get('device_id', '')
+    if not device_id.isdigit():
+        return None
+    return get_cached_device(device_id=device_id, statuses=AVAILABLE_STATUSES)
+
 
 # 1. 设备预约申请页面
 @login_required
@@ -19,50 +41,137 @@ def booking_apply(request):
         messages.error(request, '未找到你的个人信息，请联系管理员！')
         return redirect('user_home')
     
-    # 获取所有可用设备
-    devices = Device.objects.filter(status='可用')
+    # 具体设备通过输入联想接口选择（device_typeahead），页面不再列出全部设备
+    # 获取所有型号池（按型号预约）
+    device_types = DeviceType.objects.filter(unit_count__gt=0)
     
     if request.method == 'POST':
         # 获取表单数据
         device_code = request.POST.get('device_id')
+        device_type_id = request.POST.get('device_type_id')
         booking_date = request.POST.get('booking_date')
         time_slot = request.POST.get('time_slot')
+        slot_count = request.POST.get('slot_count', '1')
         purpose = request.POST.get('purpose')
         teacher_id = request.POST.get('teacher_id', '')
+        # 时段已满时是否加入候补队列
+        wants_waitlist = bool(request.POST.get('join_waitlist'))
         
-        # 校验设备是否存在且可用
-        try:
-            device = Device.objects.get(device_code=device_code, status='可用')
-        except Device.DoesNotExist:
-            messages.error(request, '该设备不存在或不可用！')
-            return render(request, 'users/booking_apply.html', {
+        device = None
+        device_type = None
+        if device_code:
+            # 校验设备是否存在且可用（进程内设备缓存，不查询数据库）
+            device = get_cached_device(device_code=device_code, statuses=AVAILABLE_STATUSES)
+            if device is None:
+                messages.error(request, '该设备不存在或不可用！')
+                return render(request, 'user/booking_apply.html', {
+                    'user_info': user_info,
+                    'device_types': device_types,
+                    'time_slots': bookable_slots()
+                })
+        elif device_type_id:
+            # 按型号预约：校验型号池是否存在
+            try:
+                device_type = DeviceType.objects.get(id=device_type_id)
+            except (DeviceType.DoesNotExist, ValueError):
+                messages.error(request, '该设备型号不存在！')
+                return render(request, 'user/booking_apply.html', {
+                    'user_info': user_info,
+                    'device_types': device_types,
+                    'time_slots': bookable_slots()
+                })
+        else:
+            messages.error(request, '请选择设备或设备型号！')
+            return render(request, 'user/booking_apply.html', {
                 'user_info': user_info,
-                'devices': devices
+                'device_types': device_types,
+                'time_slots': bookable_slots()
             })
         
-        # 学生用户必须填写指导教师
-        if user_info.user_type == 'student' and not teacher_id:
-            messages.error(request, '学生用户必须填写指导教师编号！')
-            return render(request, 'users/booking_apply.html', {
+        try:
+            booking_date = datetime.strptime(booking_date, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            messages.error(request, '请选择预约日期！')
+            return render(request, 'user/booking_apply.html', {
                 'user_info': user_info,
-                'devices': devices
+                'device_types': device_types,
+                'time_slots': bookable_slots()
             })
         
-        # 生成预约编号
-        booking_code = generate_booking_code()
+        # 连续占用多个时段：起始时段编号 + 时段数，校验范围与维护停用
+        try:
+            time_slot = int(time_slot)
+            slot_count = int(slot_count)
+            slot_error = validate_slot_range(time_slot, slot_count)
+        except (TypeError, ValueError):
+            slot_error = '请选择预约时段！'
+        if slot_error:
+            messages.error(request, slot_error)
+            return render(request, 'user/booking_apply.html', {
+                'user_info': user_info,
+                'device_types': device_types,
+                'time_slots': bookable_slots()
+            })
         
-        # 创建预约申请
-        Booking.objects.create(
-            booking_code=booking_code,
+        # 业务规则：借用资格、提前天数、学生指导教师等
+        advisor = resolve_advisor(user_info, teacher_id)
+        booking = Booking(
             applicant=user_info,
             device=device,
+            device_type=device_type,
             booking_date=booking_date,
             time_slot=time_slot,
+            slot_count=slot_count,
             purpose=purpose,
-            teacher_id=teacher_id,
-            # 校外人员默认待管理员审批，审批通过后需负责人审批
-            status='pending'
+            teacher_id=advisor.user_code if advisor else teacher_id,
+            advisor=advisor,
         )
+        violations = evaluate(booking, 'apply')
+        if violations:
+            messages.error(request, violations[0].message)
+            return render(request, 'user/booking_apply.html', {
+                'user_info': user_info,
+                'device_types': device_types,
+                'time_slots': bookable_slots()
+            })
+        
+        # 维护期间不可预约（查进程内维护区间索引）
+        maintenance = slot_maintenance(device, device_type, booking_date, time_slot, slot_count)
+        if maintenance:
+            messages.error(request, f'该时段设备维护中（{maintenance.reason}），请选择其他时段！')
+            return render(request, 'user/booking_apply.html', {
+                'user_info': user_info,
+                'device_types': device_types,
+                'time_slots': bookable_slots()
+            })
+        
+        # 占用时段与保存预约在同一事务内：保存失败时型号池计数一并回滚，不会留下没有预约的占用
+        with transaction.atomic():
+            # 判断时段是否已满：型号池原子地占用单元，具体设备看是否已有批准的预约（与候补递补同一规则）
+            slot_full = not claim_booking_slot(booking)
+            if not slot_full or wants_waitlist:
+                # 生成预约编号
+                booking_code = generate_booking_code()
+                
+                # 创建预约申请
+                booking.booking_code = booking_code
+                # 学生先由指导教师审批；校外人员管理员审批通过后需负责人审批；时段已满的进入候补
+                booking.status = 'waitlisted' if slot_full else booking.submitted_status()
+                booking.save()
+                if slot_full:
+                    join_waitlist(booking)
+        
+        if slot_full and not wants_waitlist:
+            messages.error(request, '该时段已被占满，可勾选“加入候补”后重新提交，时段释放时将自动递补！')
+            return render(request, 'user/booking_apply.html', {
+                'user_info': user_info,
+                'device_types': device_types,
+                'time_slots': bookable_slots()
+            })
+        
+        if slot_full:
+            messages.success(request, f'该时段已满，已加入候补队列！预约编号：{booking_code}，时段释放时将自动转为待审批。')
+            return redirect('my_booking')
         
         messages.success(request, f'预约申请提交成功！预约编号：{booking_code}，请等待审批。')
         return redirect('my_booking')
@@ -70,11 +179,148 @@ def booking_apply(request):
     # GET请求：渲染申请页面
     context = {
         'user_info': user_info,
-        'devices': devices
+        'device_types': device_types,
+        'time_slots': bookable_slots(),
+        # 从设备查询页点击“预约”进入时预先填好设备
+        'selected_device': _preselected_device(request),
     }
-    print(context['devices'])
     return render(request, 'user/booking_apply.html', context)
 
+# 1.1 周期预约申请页面
+@login_required
+def booking_series_apply(request):
+    """周期预约申请视图（每周/隔周同一时段，整学期一次提交）"""
+    try:
+        user_info = UserInfo.objects.get(auth_user=request.user)
+    except UserInfo.DoesNotExist:
+        messages.error(request, '未找到你的个人信息，请联系管理员！')
+        return redirect('user_home')
+    
+    context = {
+        'user_info': user_info,
+        'selected_device': _preselected_device(request),
+        'interval_choices': BookingSeries.INTERVAL_CHOICES,
+        'max_occurrences': MAX_OCCURRENCES,
+        'time_slots': bookable_slots(),
+    }
+    
+    if request.method == 'POST':
+        device_code = request.POST.get('device_id')
+        time_slot = request.POST.get('time_slot')
+        slot_count = request.POST.get('slot_count', '1')
+        start_date = request.POST.get('start_date')
+        end_date = request.POST.get('end_date')
+        interval_weeks = request.POST.get('interval_weeks', '1')
+        purpose = request.POST.get('purpose')
+        teacher_id = request.POST.get('teacher_id', '')
+        
+        device = get_cached_device(device_code=device_code, statuses=AVAILABLE_STATUSES)
+        if device is None:
+            messages.error(request, '该设备不存在或不可用！')
+            return render(request, 'user/booking_series.html', context)
+        
+        try:
+            time_slot = int(time_slot)
+            slot_count = int(slot_count)
+            slot_error = validate_slot_range(time_slot, slot_count)
+        except (TypeError, ValueError):
+            slot_error = '请选择预约时段！'
+        if slot_error:
+            messages.error(request, slot_error)
+            return render(request, 'user/booking_series.html', context)
+        
+        try:
+            series = BookingSeries(
+                applicant=user_info,
+                device=device,
+                time_slot=time_slot,
+                slot_count=slot_count,
+                start_date=datetime.strptime(start_date, '%Y-%m-%d').date(),
+                end_date=datetime.strptime(end_date, '%Y-%m-%d').date(),
+                interval_weeks=int(interval_weeks),
+                purpose=purpose,
+            )
+        except (TypeError, ValueError):
+            messages.error(request, '日期或重复方式格式错误！')
+            return render(request, 'user/booking_series.html', context)
+        
+        if series.interval_weeks not in dict(BookingSeries.INTERVAL_CHOICES):
+            messages.error(request, '日期或重复方式格式错误！')
+            return render(request, 'user/booking_series.html', context)
+        
+        if series.start_date > series.end_date:
+            messages.error(request, '开始日期不能晚于结束日期！')
+            return render(request, 'user/booking_series.html', context)
+        
+        # 超过场次上限时整体拒绝，不静默丢弃上限之后的日期
+        occurrences = count_series_dates(series.start_date, series.end_date, series.interval_weeks)
+        if occurrences > MAX_OCCURRENCES:
+            messages.error(
+                request,
+                f'所选日期范围共 {occurrences} 个场次，超过单次周期预约最多 {MAX_OCCURRENCES} 个场次的限制，请缩短结束日期！'
+            )
+            return render(request, 'user/booking_series.html', context)
+        
+        series.save()
+        advisor = resolve_advisor(user_info, teacher_id)
+        results = create_series_bookings(
+            series, teacher_id=advisor.user_code if advisor else teacher_id, advisor=advisor
+        )
+        created = sum(1 for item in results if item['status'] == 'created')
+        conflicted = len(results) - created
+        if conflicted:
+            messages.error(request, f'共 {len(results)} 个场次，其中 {conflicted} 个场次因时段冲突、设备维护或不符合预约规则未提交，详见下表')
+        if created:
+            messages.success(request, f'周期预约提交成功，已生成 {created} 条预约申请，请等待审批。')
+        context.update({'series': series, 'results': results})
+    
+    return render(request, 'user/booking_series.html', context)
+
+# 1.2 指导教师审批收件箱
+@login_required
+def advisor_approval(request):
+    """指导教师审批学生的预约申请（通过后进入管理员审批）"""
+    try:
+        teacher = UserInfo.objects.get(auth_user=request.user, user_type='teacher')
+    except UserInfo.DoesNotExist:
+        messages.error(request, '只有教师可以审批学生的预约申请！')
+        return redirect('user_home')
+    
+    inbox = advisor_inbox(teacher)
+    
+    if request.method == 'POST':
+        if 'approve' in request.POST or 'reject' in request.POST:
+            action = 'approve' if 'approve' in request.POST else 'reject'
+            booking_ids = [request.POST.get(action)]
+        else:
+            action = 'approve' if 'batch_approve' in request.POST else 'reject'
+            booking_ids = request.POST.getlist('booking_ids')
+        # 只能处理自己收件箱中的申请；批准前整批检查业务规则
+        bookings = list(inbox.filter(id__in=[i for i in booking_ids if i and i.isdigit()]))
+        if action == 'approve':
+            results = evaluate_batch(bookings, 'advisor')
+        else:
+            results = [[] for _ in bookings]
+        done = 0
+        for booking, violations in zip(bookings, results):
+            if violations:
+                messages.error(request, f'预约 {booking.booking_code} 无法批准：{violations[0].message}')
+                continue
+            promoted = advisor_decide(booking, request.user, action, request.POST.get(f'comment_{booking.booking_code}', ''))
+            if promoted:
+                messages.info(request, f'时段已释放，候补预约 {promoted.booking_code} 已自动递补')
+            done += 1
+        if done:
+            action_text = '批准' if action == 'approve' else '拒绝'
+            messages.success(request, f'已{action_text} {done} 条学生预约申请')
+        return redirect('advisor_approval')
+    
+    context = {
+        'teacher': teacher,
+        'bookings': inbox,
+    }
+    return render(request, 'user/advisor_approval.html', context)
+
 # 2. 我的预约记录页面
 @login_required
 def my_booking(request):
@@ -117,16 +363,29 @@ def cancel_booking(request, booking_id):
         messages.error(request, '未找到你的个人信息，请联系管理员！')
         return redirect('my_booking')
     
-    # 只能撤销待审批的申请
-    if booking.status not in ['pending', 'admin_approved']:
-        messages.error(request, '该申请已审批完成，无法撤销！')
+    # 只能撤销未结束的申请，且需至少提前一天（候补中的除外）
+    violations = evaluate(booking, 'cancel')
+    if violations:
+        messages.error(request, violations[0].message)
         return redirect('my_booking')
     
-    # 更新状态为已撤销
-    booking.status = 'cancelled'
-    booking.save()
+    was_waitlisted = booking.status == 'waitlisted'
+    with transaction.atomic():
+        # 更新状态为已撤销
+        booking.status = 'cancelled'
+        booking.save()
+        if was_waitlisted:
+            leave_waitlist(booking)
+        else:
+            # 释放时段并递补候补队首
+            free_booking_slot(booking)
+        # 已付费的预约按95%退款
+        refund = record_refund(booking, request.user)
     
-    messages.success(request, '预约申请已成功撤销！')
+    if refund:
+        messages.success(request, f'预约申请已成功撤销！退款 {-refund.amount} 元将原路退回。')
+    else:
+        messages.success(request, '预约申请已成功撤销！')
     return redirect('my_booking')
 def device_booking_detail(request, device_id):
     """设备预约详情页面"""
@@ -143,37 +402,181 @@ def device_booking_detail(request, device_id):
 def check_availability(request):
     """检查设备在指定日期和时段是否空闲"""
     device_id = request.GET.get('device_id')
+    device_type_id = request.GET.get('device_type_id')
     booking_date = request.GET.get('date')
     time_slot = request.GET.get('time_slot')
+    slot_count = request.GET.get('slot_count', '1')
 
     # 验证参数
-    if not all([device_id, booking_date, time_slot]):
+    if not all([device_id or device_type_id, booking_date, time_slot]):
         return JsonResponse({
             'available': False,
             'reason': '参数不完整'
         })
 
-    # 检查设备是否存在
+    # 起始时段编号 + 连续时段数
     try:
-        device = Device.objects.get(device_code=device_id)  # 注意匹配设备编号字段
-    except Device.DoesNotExist:
+        time_slot = int(time_slot)
+        slot_count = int(slot_count)
+        slot_error = validate_slot_range(time_slot, slot_count)
+    except ValueError:
+        slot_error = '时段参数错误'
+    if slot_error:
+        return JsonResponse({
+            'available': False,
+            'reason': slot_error
+        })
+
+    # 按型号查询：一次计数比较即可
+    if not device_id:
+        try:
+            device_type = DeviceType.objects.get(id=device_type_id)
+        except (DeviceType.DoesNotExist, ValueError):
+            return JsonResponse({
+                'available': False,
+                'reason': '设备型号不存在'
+            })
+        maintenance = slot_maintenance(None, device_type, booking_date, time_slot, slot_count)
+        if maintenance:
+            return JsonResponse({
+                'available': False,
+                'reason': f'设备维护中（{maintenance.reason}）'
+            })
+        remaining = pool_remaining(device_type, booking_date, time_slot, slot_count)
+        if remaining > 0:
+            return JsonResponse({'available': True, 'remaining': remaining})
+        return JsonResponse({
+            'available': False,
+            'reason': '该型号在此时段已无空闲设备',
+            'waitlist_length': waitlist_queue(None, device_type.id, booking_date, time_slot, slot_count).count()
+        })
+
+    # 检查设备是否存在（按设备编号查进程内设备缓存）
+    device = get_cached_device(device_code=device_id)
+    if device is None:
         return JsonResponse({
             'available': False,
             'reason': '设备不存在'
         })
 
-    # 检查该时段是否已有预约
+    # 检查该时段是否在维护计划内
+    maintenance = slot_maintenance(device, None, booking_date, time_slot, slot_count)
+    if maintenance:
+        return JsonResponse({
+            'available': False,
+            'reason': f'设备维护中（{maintenance.reason}）'
+        })
+
+    # 检查该时段范围内是否已有预约（一次区间重叠查询，与提交申请时 claim_booking_slot 的判断一致）
     existing_booking = Booking.objects.filter(
-        device__device_code=device_id,  # 关联设备
+        slot_overlap_q(time_slot, slot_count),  # 与预约时段重叠
+        device_id=device.id,  # 关联设备
         booking_date=booking_date,      # 预约日期
-        time_slot=time_slot,            # 预约时段
-        status__in=['pending', 'approved']  # 待审核或已通过的预约视为占用
+        status__in=Booking.HELD_STATUSES  # 已批准的预约视为占用，待审批的不阻塞新申请
     ).exists()
 
     if existing_booking:
         return JsonResponse({
             'available': False,
-            'reason': '已有其他预约'
+            'reason': '已有其他预约',
+            'waitlist_length': waitlist_queue(device.id, None, booking_date, time_slot, slot_count).count()
         })
     else:
-        return JsonResponse({'available': True})
\ No newline at end of file
+        return JsonResponse({'available': True})
+
+def suggest_slots(request):
+    """推荐空闲时段：按型号或关键字在多台设备中查找最近的空闲时段"""
+    keyword = (request.GET.get('keyword') or '').strip()
+    device_code = request.GET.get('device_id')
+    device_type_id = request.GET.get('device_type_id')
+    start = request.GET.get('date')
+    try:
+        days = int(request.GET.get('days', 7))
+        slot_count = int(request.GET.get('slot_count', 1))
+        start_date = datetime.strptime(start, '%Y-%m-%d').date() if start else timezone.localdate()
+    except ValueError:
+        return JsonResponse({'results': [], 'reason': '参数格式错误'})
+    # 推荐数量只影响返回多少条，格式不对时按默认数量处理（上下限由 find_free_slots 限制）
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        limit = DEFAULT_LIMIT
+
+    # 已选具体设备或型号池时，在同型号的所有设备中查找
+    if not keyword and device_code:
+        record = get_device_record(device_code=device_code)
+        keyword = record.model if record else ''
+    if not keyword and device_type_id:
+        device_type = DeviceType.objects.filter(id=device_type_id).first() if device_type_id.isdigit() else None
+        keyword = device_type.model if device_type else ''
+    if not keyword:
+        return JsonResponse({'results': [], 'reason': '请提供设备型号或关键字'})
+
+    start_date = max(start_date, timezone.localdate())
+    results = find_free_slots(find_devices(keyword), start_date, days=days, slot_count=slot_count, limit=limit)
+    return JsonResponse({
+        'keyword': keyword,
+        'results': [
+            {
+                'device_code': item['device'].device_code,
+                'model': item['device'].model,
+                'date': item['date'].strftime('%Y-%m-%d'),
+                'time_slot': item['time_slot'],
+                'slot_count': item['slot_count'],
+                'label': item['label'],
+            }
+            for item in results
+        ],
+    })
+
+# 预约表单的设备输入联想接口
+@login_required
+def device_typeahead(request):
+    """按设备编号或型号前缀返回前 N 台可预约设备（进程内有序索引，不查询数据库）"""
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_PICKER_LIMIT))
+    except ValueError:
+        return JsonResponse({'results': [], 'reason': '参数格式错误'}, status=400)
+    devices = pick_devices(request.GET.get('q', ''), limit)
+    return JsonResponse({
+        'results': [
+            {'device_code': device.device_code, 'model': device.model, 'manufacturer': device.manufacturer}
+            for device in devices
+        ],
+    })
+
+# 审批收件箱接口（管理员 / 负责人 / 指导教师）
+@login_required
+def approval_inbox_api(request):
+    """审批收件箱 JSON 接口：按提交时间游标分页，支持筛选，并返回各收件箱的待审批角标数量"""
+    inboxes = user_inboxes(request.user)
+    if not inboxes:
+        return JsonResponse({'results': [], 'reason': '你无审批权限'}, status=403)
+    role = request.GET.get('role') or next(iter(inboxes))
+    if role not in inboxes:
+        return JsonResponse({'results': [], 'reason': '你无权查看该收件箱'}, status=403)
+
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+        filters = {
+            'user_type': request.GET.get('user_type'),
+            'device': request.GET.get('device'),
+            'code': request.GET.get('code'),
+        }
+        for key in ('date_from', 'date_to'):
+            value = request.GET.get(key)
+            filters[key] = datetime.strptime(value, '%Y-%m-%d').date() if value else None
+        results, next_cursor = inbox_page(
+            role, inboxes[role], filters=filters, cursor=request.GET.get('cursor'), limit=limit
+        )
+    except InvalidCursor:
+        return JsonResponse({'results': [], 'reason': '分页游标无效'}, status=400)
+    except ValueError:
+        return JsonResponse({'results': [], 'reason': '参数格式错误'}, status=400)
+
+    return JsonResponse({
+        'role': role,
+        'counts': inbox_counts(list(inboxes.items())),
+        'results': results,
+        'next_cursor': next_cursor,
+    })
@@ -0,0 +1,79 @@
+"""
+候补队列：时段被占满时申请人可排队候补，
+预约撤销或被拒绝释放时段时，在同一事务内按先进先出递补第一个时段可以占用的预约，无需用户反复轮询空闲状态。
+"""
+from django.db import transaction
+
+from .models import Booking, BookingWaitlist
+from .pool import claim_booking_slot, release_booking_slot
+from .slots import slot_overlap_q
+
+
+def waitlist_queue(device_id, device_type_id, booking_date, time_slot, slot_count=1):
+    """某 设备/型号-日期 与给定时段范围重叠的候补队列（按加入时间排序）"""
+    queue = BookingWaitlist.objects.filter(booking_date=booking_date).filter(
+        slot_overlap_q(time_slot, slot_count, prefix='booking__')
+    )
+    if device_type_id:
+        return queue.filter(device_type_id=device_type_id)
+    return queue.filter(device_id=device_id)
+
+
+def join_waitlist(booking):
+    """把预约加入候补队列（已占用型号池计数的预约先释放计数）"""
+    with transaction.atomic():
+        # 型号池单元在提交时即占用，待审批与已批准的预约都持有计数（与时段冲突判断无关）
+        if booking.status in Booking.ACTIVE_STATUSES:
+            release_booking_slot(booking)
+        booking.status = 'waitlisted'
+        booking.save()
+        BookingWaitlist.objects.get_or_create(
+            booking=booking,
+            defaults={
+                'device_id': None if booking.is_pooled else booking.device_id,
+                'device_type_id': booking.device_type_id,
+                'booking_date': booking.booking_date,
+                'time_slot': booking.time_slot,
+            },
+        )
+
+
+def leave_waitlist(booking):
+    """候补中的预约被撤销时移出队列"""
+    BookingWaitlist.objects.filter(booking=booking).delete()
+
+
+def promote_waitlist(device_id, device_type_id, booking_date, time_slot, slot_count=1):
+    """
+    时段释放后按先进先出递补：从队首起找到第一个时段可以占用的预约，转为待审批并移出队列
+    （队首预约可能跨多个时段，其余时段仍被占用时跳过它，递补后面时段范围合适的预约）
+    返回被递补的预约，没有可递补的预约时返回 None
+    """
+    with transaction.atomic():
+        queue = waitlist_queue(
+            device_id, device_type_id, booking_date, time_slot, slot_count
+        ).select_for_update().select_related('booking', 'booking__device_type')
+        for entry in queue:
+            booking = entry.booking
+            # 与申请时同一套判断：型号池重新占用单元，具体设备看是否仍有已批准的预约
+            if not claim_booking_slot(booking):
+                continue
+            # 学生的预约递补后仍需先经指导教师审批
+            booking.status = booking.submitted_status()
+            booking.save()
+            entry.delete()
+            return booking
+    return None
+
+
+def free_booking_slot(booking):
+    """预约撤销/被拒绝后释放时段并递补候补队首，返回被递补的预约"""
+    with transaction.atomic():
+        release_booking_slot(booking)
+        if booking.is_pooled:
+            return promote_waitlist(
+                None, booking.device_type_id, booking.booking_date, booking.time_slot, booking.slot_count
+            )
+        return promote_waitlist(
+            booking.device_id, None, booking.booking_date, booking.time_slot, booking.slot_count
+        )
@@ -1,6 +1,6 @@
 # manager/admin.py
 from django.contrib import admin
-from .models import Device
+from .models import Device, DeviceType, MaintenanceWindow
 
 # 自定义 Device 模型在 admin 后台的显示样式
 @admin.register(Device)  # 装饰器方式注册，和 admin.site.register(Device, DeviceAdmin) 效果一致
@@ -8,14 +8,14 @@ class DeviceAdmin(admin.ModelAdmin):
     # 列表页显示的字段
     list_display = [
         'device_code', 'model', 'manufacturer', 'status', 
-        'price_internal', 'price_external', 'purchase_date'
+        'price_internal', 'price_external', 'purchase_date', 'device_type'
     ]
     
     # 支持搜索的字段（按设备编号、型号、厂商搜索）
     search_fields = ['device_code', 'model', 'manufacturer']
     
     # 右侧筛选栏（按状态筛选）
-    list_filter = ['status']
+    list_filter = ['status', 'device_type']
     
     # 排序方式（默认按设备编号升序）
     ordering = ['device_code']
@@ -26,7 +26,7 @@ class DeviceAdmin(admin.ModelAdmin):
     # 编辑页字段分组（让表单更整洁）
     fieldsets = (
         ('设备基础信息', {
-            'fields': ('device_code', 'model', 'manufacturer', 'purchase_date', 'purpose', 'status')
+            'fields': ('device_code', 'model', 'manufacturer', 'purchase_date', 'purpose', 'status', 'device_type')
         }),
         ('租用价格信息', {
             'fields': ('price_internal', 'price_external')
@@ -35,4 +35,20 @@ class DeviceAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)  # 可折叠分组
         }),
-    )
\ No newline at end of file
+    )
+
+# 设备型号池
+@admin.register(DeviceType)
+class DeviceTypeAdmin(admin.ModelAdmin):
+    list_display = ['model', 'manufacturer', 'purpose', 'unit_count']
+    search_fields = ['model', 'manufacturer']
+    # 池容量由设备单元自动维护
+    readonly_fields = ['unit_count', 'created_at', 'updated_at']
+
+# 设备维护计划
+@admin.register(MaintenanceWindow)
+class MaintenanceWindowAdmin(admin.ModelAdmin):
+    list_display = ['device', 'device_type', 'start_time', 'end_time', 'reason']
+    list_filter = ['device_type']
+    search_fields = ['device__device_code', 'device_type__model', 'reason']
+    ordering = ['-start_time']
@@ -0,0 +1,83 @@
+"""
+设备批量改状态：管理员在设备列表中勾选多台设备后一次提交。
+先一次查询取出状态确实会变化的设备，再用一条 UPDATE 改状态（不逐条调用 Device.save），
+台账记录与 Device.save / create_return_ledger 的规则一致，按批 bulk_create：
+- 不可用 → 可用：有未归还的借出记录时写入“归还”记录并补上借出记录的实际归还时间；
+- 其他状态变化：写入“设备状态变更”记录。
+涉及的型号池按可用单元重新计算容量。
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from ledger.models import DeviceLedger
+from .cache import bump_catalog_generation
+from .models import DEVICE_STATUS, Device, DeviceType
+
+# 每批处理的设备数（避免超出数据库参数个数限制）
+BULK_BATCH_SIZE = 500
+BULK_STATUSES = dict(DEVICE_STATUS)
+
+
+def _open_borrow_ledgers(device_ids):
+    """每台设备最近一条未归还的借出记录"""
+    latest = {}
+    for ledger in DeviceLedger.objects.filter(
+        device_id__in=device_ids, operation_type='borrow', actual_return_date__isnull=True
+    ).order_by('device_id', '-operation_date'):
+        latest.setdefault(ledger.device_id, ledger)
+    return latest
+
+
+def bulk_set_status(device_ids, status, operator=None):
+    """把选中设备的状态改为 status，返回实际变化的设备数；状态无效时抛出 ValueError"""
+    if status not in BULK_STATUSES:
+        raise ValueError(f'无效的设备状态：{status}')
+    device_ids = sorted({int(device_id) for device_id in device_ids})
+    now = timezone.now()
+    changed = 0
+    type_ids = set()
+    with transaction.atomic():
+        for start in range(0, len(device_ids), BULK_BATCH_SIZE):
+            batch = device_ids[start:start + BULK_BATCH_SIZE]
+            devices = list(
+                Device.objects.filter(id__in=batch).exclude(status=status)
+                .values_list('id', 'device_code', 'model', 'status', 'device_type_id')
+            )
+            if not devices:
+                continue
+            Device.objects.filter(id__in=[device[0] for device in devices]).update(status=status, updated_at=now)
+
+            returned = [device for device in devices if status == 'available' and device[3] == 'unavailable']
+            borrows = _open_borrow_ledgers([device[0] for device in returned]) if returned else {}
+            ledgers = []
+            for device_id, device_code, model, old_status, _ in devices:
+                if status == 'available' and old_status == 'unavailable':
+                    borrow = borrows.get(device_id)
+                    if borrow is None:
+                        continue
+                    borrow.actual_return_date = now
+                    ledgers.append(DeviceLedger(
+                        device_id=device_id, device_name=model, user_id=borrow.user_id,
+                        operation_type='return', operation_date=now, actual_return_date=now,
+                        status_after_operation='available',
+                        description=f'设备归还 - 操作员：{operator.username if operator else "系统"}',
+                        operator=operator,
+                    ))
+                else:
+                    ledgers.append(DeviceLedger(
+                        device_id=device_id, device_name=model, operation_type='other', operation_date=now,
+                        status_after_operation=status,
+                        description=f'设备状态变更：{old_status} → {status}',
+                        operator=operator,
+                    ))
+            DeviceLedger.objects.bulk_create(ledgers, batch_size=BULK_BATCH_SIZE)
+            if borrows:
+                DeviceLedger.objects.bulk_update(list(borrows.values()), ['actual_return_date'], batch_size=BULK_BATCH_SIZE)
+            changed += len(devices)
+            type_ids.update(device[4] for device in devices)
+        # 型号池容量只计可用单元，状态变化后刷新涉及的型号
+        DeviceType.refresh_unit_counts(type_ids)
+        if changed:
+            # 与状态修改一起提交，其他进程看到新版本时也一定能读到新状态
+            bump_catalog_generation()
+    return changed
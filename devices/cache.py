@@ -0,0 +1,103 @@
+"""
+进程内设备缓存：按 设备ID / 设备编号 读穿缓存精简的设备记录（namedtuple），
+设备目录、预约表单、空闲查询等页面按编号查设备时不再访问数据库。
+
+跨进程失效依赖数据库中的设备数据版本（CatalogVersion）：Device.save/delete 与各批量写入路径调用
+bump_catalog_generation 把版本加一（与数据修改在同一事务内提交）。各进程最多每 GENERATION_CHECK_SECONDS
+秒读取一次版本号，版本变化后丢弃本进程的设备缓存、分面统计与输入联想索引。
+本进程的修改另有本地计数，无需等待下一次读取即可失效。
+"""
+import time
+from collections import namedtuple
+
+from django.db.models import F
+from django.utils import timezone
+
+# 读取数据库版本号的最短间隔（秒）
+GENERATION_CHECK_SECONDS = 2
+VERSION_NAME = 'devices'
+# 每个进程最多缓存的条目数（按ID、按编号两份合计，不存在的编号也占条目），达到后整体清空重新读穿
+MAX_CACHED_ENTRIES = 200000
+
+# 字段顺序与 Device 的字段定义顺序一致（用于 Device.from_db 构造实例）
+DeviceRecord = namedtuple('DeviceRecord', [
+    'id', 'device_code', 'model', 'manufacturer', 'purpose', 'status',
+    'price_internal', 'price_external', 'device_type_id',
+])
+
+_generation_state = {'version': None, 'checked_at': 0.0, 'local': 0}
+_device_cache = {'generation': None, 'by_id': {}, 'by_code': {}}
+
+
+def catalog_generation():
+    """当前的设备数据版本：(数据库版本号, 本进程修改计数)，只用于判断是否相等"""
+    from .models import CatalogVersion
+
+    now = time.monotonic()
+    if _generation_state['version'] is None or now - _generation_state['checked_at'] > GENERATION_CHECK_SECONDS:
+        _generation_state['version'] = (
+            CatalogVersion.objects.filter(name=VERSION_NAME).values_list('version', flat=True).first() or 0
+        )
+        _generation_state['checked_at'] = now
+    return _generation_state['version'], _generation_state['local']
+
+
+def bump_catalog_generation():
+    """设备数据变化后调用：数据库版本号加一，本进程缓存立即作废"""
+    from .models import CatalogVersion
+
+    updated = CatalogVersion.objects.filter(name=VERSION_NAME).update(
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+    if not updated:
+        CatalogVersion.objects.get_or_create(name=VERSION_NAME, defaults={'version': 1})
+    _generation_state['local'] += 1
+    _generation_state['version'] = None
+
+
+def _current_maps():
+    generation = catalog_generation()
+    size = len(_device_cache['by_id']) + len(_device_cache['by_code'])
+    if _device_cache['generation'] != generation or size >= MAX_CACHED_ENTRIES:
+        _device_cache['generation'] = generation
+        _device_cache['by_id'] = {}
+        _device_cache['by_code'] = {}
+    return _device_cache['by_id'], _device_cache['by_code']
+
+
+def get_device_record(device_code=None, device_id=None):
+    """按设备编号或ID返回 DeviceRecord，不存在返回 None（不存在的结果同样缓存）"""
+    from .models import Device
+
+    by_id, by_code = _current_maps()
+    if device_code is not None:
+        cache, key, lookup = by_code, str(device_code), {'device_code': str(device_code)}
+    else:
+        try:
+            key = int(device_id)
+        except (TypeError, ValueError):
+            return None
+        cache, lookup = by_id, {'id': key}
+    if key not in cache:
+        row = Device.objects.filter(**lookup).values_list(*DeviceRecord._fields).first()
+        record = DeviceRecord(*row) if row else None
+        cache[key] = record
+        if record:
+            by_id[record.id] = record
+            by_code[record.device_code] = record
+    return cache[key]
+
+
+def device_from_record(record):
+    """由缓存记录构造 Device 实例（未缓存的字段访问时再从数据库加载）"""
+    from .models import Device
+
+    return Device.from_db('default', DeviceRecord._fields, record)
+
+
+def get_cached_device(device_code=None, device_id=None, statuses=None):
+    """按编号或ID取设备实例；statuses 给定时只返回处于这些状态的设备"""
+    record = get_device_record(device_code=device_code, device_id=device_id)
+    if record is None or (statuses is not None and record.status not in statuses):
+        return None
+    return device_from_record(record)
@@ -0,0 +1,143 @@
+"""
+用户端设备目录：分页 + 分面筛选（厂商 / 状态 / 用途 / 型号）
+分面计数由一次 GROUP BY (厂商, 状态, 用途, 型号) 查询得到，按 数据版本 + 搜索关键词 缓存在进程内，
+各分面的计数与结果总数都在内存中从分组结果汇总，翻页时只查询当前页的设备（LIMIT/OFFSET）。
+关键词检索走全文索引（见 search.py）。
+设备数据版本（见 cache.py）变化后重新统计。
+"""
+import time
+from collections import Counter, namedtuple
+
+from django.core.paginator import Paginator
+from django.db.models import Count
+from django.http import QueryDict
+
+from .cache import catalog_generation
+from .models import DEVICE_STATUS, Device
+from .search import keyword_condition, search_devices
+
+CATALOG_PAGE_SIZE = 20
+# 分组统计结果最长有效期（秒，兜底：绕过 bump_catalog_generation 直接改库的情况）
+CATALOG_CACHE_SECONDS = 60
+# 每个数据版本最多缓存的搜索关键词数量
+MAX_CACHED_SEARCHES = 256
+# 分面字段 → 显示名称（顺序即页面显示顺序）
+FACET_FIELDS = (
+    ('manufacturer', '生产厂商'),
+    ('status', '可用状态'),
+    ('purpose', '实验用途'),
+    ('model', '型号'),
+)
+# 每个分面最多显示的选项数（按设备数量从多到少）
+MAX_FACET_OPTIONS = 20
+
+STATUS_LABELS = dict(DEVICE_STATUS)
+
+# query 为点击该选项后的查询串（选中 / 取消该条件，回到第一页）
+FacetOption = namedtuple('FacetOption', ['value', 'label', 'count', 'selected', 'query'])
+Facet = namedtuple('Facet', ['field', 'label', 'options'])
+CatalogPage = namedtuple('CatalogPage', ['page_obj', 'facets', 'filters', 'total'])
+
+_catalog_cache = {'generation': None, 'loaded_at': 0.0, 'groups': {}}
+
+
+def get_facet_groups(keyword=''):
+    """返回 [(厂商, 状态, 用途, 型号, 设备数)]：一次分组查询，按数据版本缓存"""
+    now = time.monotonic()
+    generation = catalog_generation()
+    if _catalog_cache['generation'] != generation or now - _catalog_cache['loaded_at'] > CATALOG_CACHE_SECONDS:
+        _catalog_cache['generation'] = generation
+        _catalog_cache['groups'] = {}
+        _catalog_cache['loaded_at'] = now
+    groups = _catalog_cache['groups']
+    if keyword not in groups:
+        fields = [field for field, _ in FACET_FIELDS]
+        rows = Device.objects.filter(keyword_condition(keyword)).order_by().values_list(*fields).annotate(n=Count('id'))
+        if len(groups) >= MAX_CACHED_SEARCHES:
+            groups.clear()
+        groups[keyword] = [tuple(value or '' for value in row[:-1]) + (row[-1],) for row in rows]
+    return groups[keyword]
+
+
+def _option_label(field, value):
+    if field == 'status':
+        return STATUS_LABELS.get(value, value)
+    return value
+
+
+def _toggle_query(params, field, value):
+    """在当前查询参数上选中 / 取消一个分面条件，并回到第一页"""
+    params = params.copy()
+    params.pop('page', None)
+    if value is None:
+        params.pop(field, None)
+    else:
+        params[field] = value
+    return '?' + params.urlencode()
+
+
+def _build_facets(groups, filters, params):
+    """
+    各分面的计数：应用其他分面已选的条件、不应用本分面自身的条件，
+    这样同一分面内的其他选项仍显示可切换到的数量
+    """
+    facets = []
+    for index, (field, label) in enumerate(FACET_FIELDS):
+        counts = Counter()
+        for row in groups:
+            if all(
+                row[other] == filters[other_field]
+                for other, (other_field, _) in enumerate(FACET_FIELDS)
+                if other != index and other_field in filters
+            ):
+                if row[index]:
+                    counts[row[index]] += row[-1]
+        selected = filters.get(field)
+        options = [
+            FacetOption(
+                value, _option_label(field, value), count, value == selected,
+                _toggle_query(params, field, None if value == selected else value),
+            )
+            for value, count in counts.most_common(MAX_FACET_OPTIONS)
+        ]
+        if selected and not any(option.selected for option in options):
+            options.append(FacetOption(
+                selected, _option_label(field, selected), counts.get(selected, 0), True,
+                _toggle_query(params, field, None),
+            ))
+        facets.append(Facet(field, label, options))
+    return facets
+
+
+def search_catalog(keyword='', filters=None, page=None, page_size=CATALOG_PAGE_SIZE, params=None):
+    """
+    按关键词与分面条件查询设备目录，返回 CatalogPage
+    filters 为 {分面字段: 选中的值}，不认识的字段与空值忽略；params 为生成分面链接所用的当前查询参数
+    """
+    keyword = (keyword or '').strip()
+    facet_fields = [field for field, _ in FACET_FIELDS]
+    filters = {field: value for field, value in (filters or {}).items() if field in facet_fields and value}
+
+    groups = get_facet_groups(keyword)
+    total = sum(
+        row[-1] for row in groups
+        if all(row[facet_fields.index(field)] == value for field, value in filters.items())
+    )
+
+    # 有关键词时按相关度排序
+    devices = search_devices(Device.objects.filter(**filters), keyword)
+    # 总数已由分组统计得到，分页器不再单独 COUNT
+    paginator = Paginator(devices, page_size)
+    paginator.count = total
+    page_obj = paginator.get_page(page)
+    if params is None:
+        params = QueryDict(mutable=True)
+        params.update({'keyword': keyword} if keyword else {})
+        params.update(filters)
+    return CatalogPage(page_obj, _build_facets(groups, filters, params), filters, total)
+
+
+def catalog_from_request(request):
+    """从 GET 参数（keyword / page / 各分面字段）查询设备目录"""
+    filters = {field: request.GET.get(field, '').strip() for field, _ in FACET_FIELDS}
+    return search_catalog(request.GET.get('keyword', ''), filters, request.GET.get('page'), params=request.GET)
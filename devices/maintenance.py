@@ -0,0 +1,99 @@
+"""
+维护计划区间索引
+进程内按 设备/型号 保存按开始时间排序的维护区间数组（开始时间数组 + 结束时间前缀最大值数组），
+判断某段时间是否与维护重叠只需一次二分查找，可用性查询、批量排期和审批都不再额外访问数据库。
+维护计划修改时清空本进程索引；其他进程最迟在 INDEX_CACHE_SECONDS 后重新加载。
+"""
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+# 索引最长有效期（秒）
+INDEX_CACHE_SECONDS = 60
+# 只加载近期及未来的维护计划（更早的预约已无需校验）
+HISTORY_DAYS = 7
+
+_index_cache = {'index': None, 'loaded_at': 0.0}
+
+
+class _WindowList:
+    """同一设备/型号的维护区间（按开始时间排序）"""
+
+    def __init__(self, windows):
+        windows.sort(key=lambda window: window.start_time)
+        self.windows = windows
+        self.starts = [window.start_time for window in windows]
+        # 前缀最大结束时间：starts[:i] 中任一区间与查询区间重叠 ⇔ max_ends[i-1] > 查询开始
+        self.max_ends = []
+        latest = None
+        for window in windows:
+            latest = window.end_time if latest is None else max(latest, window.end_time)
+            self.max_ends.append(latest)
+
+    def find_overlaps(self, start, end):
+        """返回与 [start, end) 重叠的维护区间列表"""
+        count = bisect_left(self.starts, end)
+        if count == 0 or self.max_ends[count - 1] <= start:
+            return []
+        return [window for window in self.windows[:count] if window.end_time > start]
+
+
+def _load_index():
+    from .models import MaintenanceWindow
+
+    since = timezone.now() - timedelta(days=HISTORY_DAYS)
+    grouped = {}
+    for window in MaintenanceWindow.objects.filter(end_time__gte=since):
+        if window.device_id:
+            grouped.setdefault(('device', window.device_id), []).append(window)
+        if window.device_type_id:
+            grouped.setdefault(('type', window.device_type_id), []).append(window)
+    return {key: _WindowList(windows) for key, windows in grouped.items()}
+
+
+def get_maintenance_index():
+    """返回 {('device'|'type', id): _WindowList}（进程内缓存）"""
+    now = time.monotonic()
+    index = _index_cache['index']
+    if index is None or now - _index_cache['loaded_at'] > INDEX_CACHE_SECONDS:
+        index = _load_index()
+        _index_cache['index'] = index
+        _index_cache['loaded_at'] = now
+    return index
+
+
+def clear_maintenance_index():
+    """维护计划修改后清空索引"""
+    _index_cache['index'] = None
+
+
+def find_maintenance_windows(device_id, device_type_id, start, end):
+    """
+    查找与时间段重叠的维护计划列表
+    具体设备同时检查设备本身与其所属型号的维护，型号池预约检查型号维护
+    """
+    index = get_maintenance_index()
+    found = []
+    if not index:
+        return found
+    if device_id and ('device', device_id) in index:
+        found.extend(index[('device', device_id)].find_overlaps(start, end))
+    if device_type_id and ('type', device_type_id) in index:
+        found.extend(index[('type', device_type_id)].find_overlaps(start, end))
+    return found
+
+
+def find_maintenance(device_id, device_type_id, start, end):
+    """返回与时间段重叠的一个维护计划，没有则返回 None"""
+    windows = find_maintenance_windows(device_id, device_type_id, start, end)
+    return windows[0] if windows else None
+
+
+def slot_datetime_range(booking_date, start_minutes, end_minutes):
+    """预约日期 + 分钟区间转换为带时区的时间段"""
+    if isinstance(booking_date, str):
+        booking_date = datetime.strptime(booking_date, '%Y-%m-%d').date()
+    day_start = timezone.make_aware(datetime.combine(booking_date, datetime.min.time()))
+    return day_start + timedelta(minutes=start_minutes), day_start + timedelta(minutes=end_minutes)
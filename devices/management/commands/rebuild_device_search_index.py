@@ -0,0 +1,18 @@
+"""
+设备全文检索索引重建命令（索引与设备表不一致时修复，如直接改库或批量删除设备之后）
+使用方法：python manage.py rebuild_device_search_index
+"""
+from django.core.management.base import BaseCommand
+
+from devices.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = '按设备表重建设备全文检索索引（SQLite FTS5）'
+
+    def handle(self, *args, **options):
+        total = rebuild_search_index()
+        if total is None:
+            self.stdout.write('当前数据库不使用 FTS 索引（PostgreSQL 的 trigram 索引由数据库自动维护），无需重建')
+            return
+        self.stdout.write(self.style.SUCCESS(f'已重建检索索引，共 {total} 台设备'))
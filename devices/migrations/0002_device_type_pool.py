@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceType',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100, unique=True, verbose_name='型号')),
+                ('manufacturer', models.CharField(default='未知厂商', max_length=100, verbose_name='生产厂商')),
+                ('purpose', models.CharField(blank=True, max_length=200, null=True, verbose_name='实验用途')),
+                ('unit_count', models.PositiveIntegerField(default=0, verbose_name='设备单元数量')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '设备型号',
+                'verbose_name_plural': '设备型号池',
+                'ordering': ['model'],
+            },
+        ),
+        migrations.AddField(
+            model_name='device',
+            name='device_type',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='devices', to='devices.devicetype', verbose_name='设备型号池'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0002_device_type_pool'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaintenanceWindow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_time', models.DateTimeField(verbose_name='开始时间')),
+                ('end_time', models.DateTimeField(verbose_name='结束时间')),
+                ('reason', models.CharField(default='设备维护', max_length=200, verbose_name='维护原因')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('device', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='maintenance_windows', to='devices.device', verbose_name='维护设备')),
+                ('device_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='maintenance_windows', to='devices.devicetype', verbose_name='维护型号')),
+            ],
+            options={
+                'verbose_name': '维护计划',
+                'verbose_name_plural': '维护计划',
+                'ordering': ['start_time'],
+                'indexes': [models.Index(fields=['end_time'], name='devices_mai_end_tim_641be8_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# 设备全文检索索引：SQLite 建 FTS5（trigram）虚拟表并写入现有设备，PostgreSQL 建 pg_trgm GIN 索引
+
+from django.db import migrations
+
+FTS_TABLE = 'devices_device_fts'
+SEARCH_FIELDS = ('device_code', 'model', 'manufacturer', 'purpose')
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        columns = ', '.join(SEARCH_FIELDS)
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5({columns}, tokenize='trigram')"
+        )
+        values = ', '.join(f"COALESCE({field}, '')" for field in SEARCH_FIELDS)
+        schema_editor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, {columns}) SELECT id, {values} FROM devices_device'
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for field in SEARCH_FIELDS:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS devices_device_{field}_trgm '
+                f'ON devices_device USING gin ({field} gin_trgm_ops)'
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    elif vendor == 'postgresql':
+        for field in SEARCH_FIELDS:
+            schema_editor.execute(f'DROP INDEX IF EXISTS devices_device_{field}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0003_maintenance_window'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -2,12 +2,43 @@ from django.db import models
 from decimal import Decimal
 from django.utils import timezone
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 
 # 设备可用状态枚举（匹配你的下拉选项）
 DEVICE_STATUS = (
     ('available', '可用'),
     ('unavailable', '不可用'),
 )
+# 可预约的状态值（早期数据以中文“可用”保存，Device.status 的默认值也是“可用”）
+AVAILABLE_STATUSES = ('available', '可用')
+
+class DeviceType(models.Model):
+    """设备型号池：同一型号的所有设备单元共用一个预约池，用户按型号预约，借出时再分配具体单元"""
+    model = models.CharField(max_length=100, verbose_name='型号', unique=True)
+    manufacturer = models.CharField(max_length=100, verbose_name='生产厂商', default='未知厂商')
+    purpose = models.CharField(max_length=200, verbose_name='实验用途', null=True, blank=True)
+    # 池容量：该型号下可预约（AVAILABLE_STATUSES）的设备单元数量（由 Device.save/delete 及批量改状态自动维护）
+    unit_count = models.PositiveIntegerField(default=0, verbose_name='设备单元数量')
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+
+    class Meta:
+        verbose_name = '设备型号'
+        verbose_name_plural = '设备型号池'
+        ordering = ['model']
+
+    def __str__(self):
+        return f"{self.model}（{self.unit_count}台）"
+
+    @classmethod
+    def refresh_unit_counts(cls, type_ids):
+        """按当前可预约的设备单元重新计算指定型号池的容量（不可用的单元不计入）"""
+        for type_id in set(type_ids) - {None}:
+            cls.objects.filter(pk=type_id).update(
+                unit_count=Device.objects.filter(device_type_id=type_id, status__in=AVAILABLE_STATUSES).count()
+            )
+
 
 class Device(models.Model):
     """实验室设备模型（适配现有页面字段）"""
@@ -21,6 +52,11 @@ class Device(models.Model):
     # 关键修改：给价格字段加默认值（Decimal类型默认值用数字）
     price_internal = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='校内租用价格（元/2小时）', default=Decimal('0'))
     price_external = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='校外租用价格（元/2小时）', default=Decimal('0'))
+    # 所属型号池（可选，按型号预约时使用）
+    device_type = models.ForeignKey(
+        DeviceType, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='devices', verbose_name='设备型号池'
+    )
 
     # 时间戳（自动生成，无需页面输入）
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
@@ -37,19 +73,29 @@ class Device(models.Model):
     def save(self, *args, **kwargs):
         """重写save方法，自动记录设备操作"""
         from ledger.models import DeviceLedger
+        from .cache import bump_catalog_generation
+        from .search import index_devices
 
         is_new = self.pk is None
         old_status = None
+        old_type_id = None
 
         if not is_new:
             try:
                 old_device = Device.objects.get(pk=self.pk)
                 old_status = old_device.status
+                old_type_id = old_device.device_type_id
             except Device.DoesNotExist:
                 pass
 
         # 调用父类save方法
         super().save(*args, **kwargs)
+        index_devices([self])
+
+        # 同步型号池容量（新旧型号都要刷新，状态变化同样影响容量）
+        if old_type_id or self.device_type_id:
+            DeviceType.refresh_unit_counts([old_type_id, self.device_type_id])
+        bump_catalog_generation()
 
         # 获取当前用户（如果有的话）
         User = get_user_model()
@@ -94,6 +140,8 @@ class Device(models.Model):
     def delete(self, *args, **kwargs):
         """重写delete方法，记录设备删除操作"""
         from ledger.models import DeviceLedger
+        from .cache import bump_catalog_generation
+        from .search import unindex_device
 
         # 获取当前用户
         User = get_user_model()
@@ -115,5 +163,73 @@ class Device(models.Model):
             user=None  # 删除操作没有特定用户
         )
 
+        type_id = self.device_type_id
+        device_id = self.pk
+
         # 调用父类delete方法
-        super().delete(*args, **kwargs)
\ No newline at end of file
+        super().delete(*args, **kwargs)
+        unindex_device(device_id)
+
+        if type_id:
+            DeviceType.refresh_unit_counts([type_id])
+        bump_catalog_generation()
+
+class CatalogVersion(models.Model):
+    """设备数据版本：设备新增、修改、删除时加一，各进程据此判断本进程的设备缓存是否过期"""
+    name = models.CharField(max_length=50, unique=True, verbose_name='名称')
+    version = models.PositiveBigIntegerField(default=0, verbose_name='版本号')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+
+    class Meta:
+        verbose_name = '设备数据版本'
+        verbose_name_plural = '设备数据版本'
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class MaintenanceWindow(models.Model):
+    """维护计划：指定设备或整个型号在某段时间内停用，期间不可预约"""
+    device = models.ForeignKey(
+        Device, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='maintenance_windows', verbose_name='维护设备'
+    )
+    device_type = models.ForeignKey(
+        DeviceType, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='maintenance_windows', verbose_name='维护型号'
+    )
+    start_time = models.DateTimeField(verbose_name='开始时间')
+    end_time = models.DateTimeField(verbose_name='结束时间')
+    reason = models.CharField(max_length=200, verbose_name='维护原因', default='设备维护')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+
+    class Meta:
+        verbose_name = '维护计划'
+        verbose_name_plural = '维护计划'
+        ordering = ['start_time']
+        indexes = [
+            models.Index(fields=['end_time']),
+        ]
+
+    def __str__(self):
+        target = self.device.device_code if self.device_id else (self.device_type.model if self.device_type_id else '')
+        return f"{target} 维护 {self.start_time:%Y-%m-%d %H:%M} - {self.end_time:%Y-%m-%d %H:%M}"
+
+    def clean(self):
+        if not self.device_id and not self.device_type_id:
+            raise ValidationError('请选择维护的设备或型号')
+        if self.start_time and self.end_time and self.end_time <= self.start_time:
+            raise ValidationError('结束时间必须晚于开始时间')
+
+    def save(self, *args, **kwargs):
+        from .maintenance import clear_maintenance_index
+
+        super().save(*args, **kwargs)
+        clear_maintenance_index()
+
+    def delete(self, *args, **kwargs):
+        from .maintenance import clear_maintenance_index
+
+        result = super().delete(*args, **kwargs)
+        clear_maintenance_index()
+        return result
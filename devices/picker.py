@@ -0,0 +1,84 @@
+"""
+预约表单的设备选择（输入联想）：进程内保存可预约设备按 设备编号 / 型号 排序的两份数组，
+按前缀二分查找返回前 N 台设备，预约页面不再把全部设备渲染进下拉框。
+索引记录构建时的设备数据版本（见 cache.py），版本变化后下一次查询即重建。
+"""
+import time
+from bisect import bisect_left
+from collections import namedtuple
+
+from .cache import catalog_generation
+from .models import AVAILABLE_STATUSES, Device
+
+PICKER_CACHE_SECONDS = 60
+DEFAULT_PICKER_LIMIT = 10
+MAX_PICKER_LIMIT = 20
+
+PickerDevice = namedtuple('PickerDevice', ['id', 'device_code', 'model', 'manufacturer'])
+
+_picker_cache = {'index': None, 'generation': None, 'loaded_at': 0.0}
+
+
+class _PrefixIndex:
+    """按小写键排序的设备数组，支持前缀查找"""
+
+    def __init__(self, devices, key):
+        entries = sorted(((key(device).lower(), device.device_code), device) for device in devices)
+        self.keys = [entry[0][0] for entry in entries]
+        self.devices = [entry[1] for entry in entries]
+
+    def iter_prefix(self, prefix):
+        position = bisect_left(self.keys, prefix)
+        while position < len(self.keys) and self.keys[position].startswith(prefix):
+            yield self.devices[position]
+            position += 1
+
+
+def _load_index():
+    devices = [
+        PickerDevice(*row)
+        for row in Device.objects.filter(status__in=AVAILABLE_STATUSES).order_by()
+        .values_list('id', 'device_code', 'model', 'manufacturer').iterator(chunk_size=5000)
+    ]
+    return (
+        _PrefixIndex(devices, lambda device: device.device_code),
+        _PrefixIndex(devices, lambda device: device.model),
+    )
+
+
+def get_picker_index():
+    """返回 (编号索引, 型号索引)（进程内缓存，设备数据版本变化或超时后重建）"""
+    now = time.monotonic()
+    generation = catalog_generation()
+    if (
+        _picker_cache['index'] is None
+        or _picker_cache['generation'] != generation
+        or now - _picker_cache['loaded_at'] > PICKER_CACHE_SECONDS
+    ):
+        _picker_cache['index'] = _load_index()
+        _picker_cache['generation'] = generation
+        _picker_cache['loaded_at'] = now
+    return _picker_cache['index']
+
+
+def clear_picker_index():
+    _picker_cache['index'] = None
+
+
+def pick_devices(prefix, limit=DEFAULT_PICKER_LIMIT):
+    """设备编号或型号以 prefix 开头（不区分大小写）的可预约设备，编号匹配的排在前面，最多 limit 台"""
+    prefix = (prefix or '').strip().lower()
+    limit = max(1, min(limit, MAX_PICKER_LIMIT))
+    if not prefix:
+        return []
+    results = []
+    seen = set()
+    for index in get_picker_index():
+        for device in index.iter_prefix(prefix):
+            if device.device_code in seen:
+                continue
+            seen.add(device.device_code)
+            results.append(device)
+            if len(results) >= limit:
+                return results
+    return results
@@ -0,0 +1,140 @@
+"""
+设备全文检索：替代 设备编号 / 型号 / 厂商 / 用途 四列 OR icontains 的全表扫描。
+
+- SQLite：FTS5 虚拟表 devices_device_fts（trigram 分词，支持任意子串匹配，中文同样适用），
+  rowid 与设备 ID 一致；Device.save/delete 时同步单条，批量导入后调用 index_devices，
+  数据不一致时用 rebuild_device_search_index 命令重建。结果按 bm25 相关度排序（设备编号权重最高）。
+- PostgreSQL：四列各建 pg_trgm GIN 索引，ILIKE 走索引，按三元组相似度排序。
+- 其他数据库，或关键词中有少于 3 个字符的词（trigram 无法索引）：退回 icontains。
+
+多个空格分隔的关键词之间为“并且”关系，每个词可出现在任意一列。
+"""
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'devices_device_fts'
+# 参与检索的列（顺序与 FTS 表的列、bm25 权重一致）
+SEARCH_FIELDS = ('device_code', 'model', 'manufacturer', 'purpose')
+BM25_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+# trigram 能索引的最短词长
+MIN_TERM_LENGTH = 3
+
+
+def search_terms(keyword):
+    return (keyword or '').split()
+
+
+def _use_fts(terms):
+    return connection.vendor == 'sqlite' and all(len(term) >= MIN_TERM_LENGTH for term in terms)
+
+
+def _use_trigram(terms):
+    return connection.vendor == 'postgresql' and all(len(term) >= MIN_TERM_LENGTH for term in terms)
+
+
+def fts_query(terms):
+    """每个词作为短语（双引号转义），词之间 AND"""
+    return ' AND '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def _icontains(terms):
+    condition = Q()
+    for term in terms:
+        condition &= (
+            Q(device_code__icontains=term) |
+            Q(model__icontains=term) |
+            Q(manufacturer__icontains=term) |
+            Q(purpose__icontains=term)
+        )
+    return condition
+
+
+def keyword_condition(keyword):
+    """关键词检索条件（用于 filter），SQLite 下为 FTS 子查询"""
+    terms = search_terms(keyword)
+    if not terms:
+        return Q()
+    if _use_fts(terms):
+        return Q(id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [fts_query(terms)]))
+    return _icontains(terms)
+
+
+def search_devices(queryset, keyword, ranked=True):
+    """
+    在 queryset 中按关键词检索设备
+    ranked 时按相关度排序（相关度相同按设备编号）；无法使用索引时按设备编号排序
+    """
+    terms = search_terms(keyword)
+    if not terms:
+        return queryset.order_by('device_code')
+    if ranked and _use_fts(terms):
+        weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+        db_table = queryset.model._meta.db_table
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = {db_table}.id', f'{FTS_TABLE} MATCH %s'],
+            params=[fts_query(terms)],
+            select={'search_rank': f'bm25({FTS_TABLE}, {weights})'},
+            order_by=['search_rank', 'device_code'],
+        )
+    queryset = queryset.filter(keyword_condition(keyword))
+    if ranked and _use_trigram(terms):
+        from django.contrib.postgres.search import TrigramWordSimilarity
+        from django.db.models.functions import Greatest
+
+        similarity = Greatest(*[TrigramWordSimilarity(keyword, field) for field in SEARCH_FIELDS])
+        return queryset.annotate(search_rank=similarity).order_by('-search_rank', 'device_code')
+    return queryset.order_by('device_code')
+
+
+# -------------------------- 索引维护（SQLite） --------------------------
+
+def _fts_available():
+    return connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+
+
+def _index_rows(cursor, devices):
+    rows = [
+        (device.id,) + tuple(getattr(device, field) or '' for field in SEARCH_FIELDS)
+        for device in devices
+    ]
+    if not rows:
+        return
+    cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+    columns = ', '.join(SEARCH_FIELDS)
+    placeholders = ', '.join(['%s'] * (len(SEARCH_FIELDS) + 1))
+    cursor.executemany(f'INSERT INTO {FTS_TABLE} (rowid, {columns}) VALUES ({placeholders})', rows)
+
+
+def index_devices(devices):
+    """把设备（新增或修改后）写入检索索引；非 SQLite 数据库无需处理"""
+    if connection.vendor != 'sqlite':
+        return
+    # 放在一个事务内：FTS5 逐条自动提交时每条都要刷盘，批量写入会慢两个数量级
+    with transaction.atomic(), connection.cursor() as cursor:
+        _index_rows(cursor, devices)
+
+
+def unindex_device(device_id):
+    """删除设备时移出检索索引"""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [device_id])
+
+
+def rebuild_search_index():
+    """按设备表重建整个检索索引，返回写入的设备数（非 SQLite 或索引表不存在时返回 None）"""
+    from .models import Device
+
+    if not _fts_available():
+        return None
+    columns = ', '.join(SEARCH_FIELDS)
+    values = ', '.join(f"COALESCE({field}, '')" for field in SEARCH_FIELDS)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, {columns}) SELECT id, {values} FROM {Device._meta.db_table}'
+        )
+        return cursor.rowcount
@@ -1,3 +1,300 @@
 from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.db.models import F
+from django.utils import timezone
+
+from devices.models import AVAILABLE_STATUSES, CatalogVersion, Device, DeviceType, MaintenanceWindow
+from ledger.models import DeviceLedger
+from devices.bulk import bulk_set_status
+from devices.cache import _device_cache, bump_catalog_generation, get_cached_device, get_device_record
+from devices.catalog import CATALOG_PAGE_SIZE, search_catalog
+from devices.picker import DEFAULT_PICKER_LIMIT, clear_picker_index, pick_devices
+from devices.search import rebuild_search_index, search_devices
+from devices.maintenance import clear_maintenance_index, find_maintenance, slot_datetime_range
+
+
+class MaintenanceIndexTestCase(TestCase):
+    """维护计划区间索引测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        self.device_type = DeviceType.objects.create(model='示波器X1')
+        self.device = Device.objects.create(
+            device_code='DEV001', model='示波器X1', status='available',
+            price_external=Decimal('50.00'), device_type=self.device_type
+        )
+        self.day = timezone.now().date() + timedelta(days=3)
+        start, _ = slot_datetime_range(self.day, 8 * 60, 8 * 60)
+        MaintenanceWindow.objects.create(
+            device=self.device, start_time=start, end_time=start + timedelta(hours=4), reason='季度保养'
+        )
+        MaintenanceWindow.objects.create(
+            device_type=self.device_type, start_time=start + timedelta(hours=10),
+            end_time=start + timedelta(hours=11), reason='型号升级'
+        )
+
+    def tearDown(self):
+        """测试数据回滚后清空进程内索引"""
+        clear_maintenance_index()
+
+    def test_overlap_lookup(self):
+        """测试区间重叠判断（半开区间，首尾相接不算重叠）"""
+        window = find_maintenance(self.device.id, None, *slot_datetime_range(self.day, 10 * 60, 14 * 60))
+        self.assertEqual(window.reason, '季度保养')
+        self.assertIsNone(find_maintenance(self.device.id, None, *slot_datetime_range(self.day, 12 * 60, 14 * 60)))
+        self.assertIsNone(find_maintenance(self.device.id, None, *slot_datetime_range(self.day, 6 * 60, 8 * 60)))
+
+    def test_type_window_applies_to_units(self):
+        """测试型号维护同时作用于该型号的具体设备"""
+        window = find_maintenance(
+            self.device.id, self.device_type.id, *slot_datetime_range(self.day, 18 * 60, 20 * 60)
+        )
+        self.assertEqual(window.reason, '型号升级')
+        self.assertIsNone(find_maintenance(self.device.id, None, *slot_datetime_range(self.day, 18 * 60, 20 * 60)))
+
+    def test_index_refreshed_on_change(self):
+        """测试维护计划删除后索引立即刷新"""
+        span = slot_datetime_range(self.day, 8 * 60, 10 * 60)
+        self.assertIsNotNone(find_maintenance(self.device.id, None, *span))
+        MaintenanceWindow.objects.filter(device=self.device).first().delete()
+        self.assertIsNone(find_maintenance(self.device.id, None, *span))
+        with self.assertNumQueries(0):
+            find_maintenance(self.device.id, None, *span)
+
+
+class DeviceCatalogTestCase(TestCase):
+    """用户端设备目录（分页 + 分面）测试"""
+
+    def setUp(self):
+        """设置测试数据：两个厂商、两种状态的 25 台设备"""
+        for i in range(25):
+            Device.objects.create(
+                device_code=f'DEV{i:03d}',
+                model='示波器X1' if i % 2 else '万用表M2',
+                manufacturer='泰克' if i < 15 else '福禄克',
+                purpose='电路实验',
+                status='available' if i % 5 else 'unavailable',
+            )
+
+    def tearDown(self):
+        """测试数据回滚后让进程内统计作废"""
+        bump_catalog_generation()
+
+    def test_facet_counts_and_pagination(self):
+        """测试分面计数与分页总数"""
+        catalog = search_catalog()
+        self.assertEqual(catalog.total, 25)
+        self.assertEqual(len(catalog.page_obj.object_list), CATALOG_PAGE_SIZE)
+        manufacturers = {option.value: option.count for option in catalog.facets[0].options}
+        self.assertEqual(manufacturers, {'泰克': 15, '福禄克': 10})
+        statuses = {option.label: option.count for option in catalog.facets[1].options}
+        self.assertEqual(statuses, {'可用': 20, '不可用': 5})
+
+        # 选中厂商后：结果与其他分面按厂商过滤，厂商分面本身仍显示全部选项
+        catalog = search_catalog(filters={'manufacturer': '福禄克'}, page=1)
+        self.assertEqual(catalog.total, 10)
+        self.assertEqual(len(catalog.page_obj.object_list), 10)
+        self.assertEqual(len(catalog.facets[0].options), 2)
+        statuses = {option.label: option.count for option in catalog.facets[1].options}
+        self.assertEqual(statuses, {'可用': 8, '不可用': 2})
+
+    def test_cached_groups_and_generation(self):
+        """测试分组统计按数据版本缓存：翻页只查当前页，设备变化后重新统计"""
+        search_catalog(keyword='DEV')
+        with self.assertNumQueries(1):
+            catalog = search_catalog(keyword='DEV', page=2)
+            codes = [device.device_code for device in catalog.page_obj]
+        self.assertEqual(codes, ['DEV020', 'DEV021', 'DEV022', 'DEV023', 'DEV024'])
+
+        Device.objects.filter(device_code='DEV024').first().delete()
+        self.assertEqual(search_catalog(keyword='DEV').total, 24)
+
+    def test_device_list_view(self):
+        """测试设备查询页面的分面链接"""
+        response = self.client.get('/user/device/list/', {'keyword': '示波器', 'status': 'unavailable'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total'], 2)
+        self.assertContains(response, 'keyword=%E7%A4%BA%E6%B3%A2%E5%99%A8&amp;status=unavailable&amp;manufacturer=')
+
+
+class DeviceSearchTestCase(TestCase):
+    """设备全文检索测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        self.scope = Device.objects.create(device_code='OSC-100', model='数字示波器', manufacturer='泰克', purpose='信号测量')
+        self.meter = Device.objects.create(device_code='MTR-200', model='万用表', manufacturer='福禄克', purpose='示波器校准')
+        Device.objects.create(device_code='PWR-300', model='直流电源', manufacturer='是德', purpose='供电')
+
+    def search(self, keyword):
+        return [device.device_code for device in search_devices(Device.objects.all(), keyword)]
+
+    def test_ranked_substring_search(self):
+        """测试子串匹配与相关度排序（型号命中排在用途命中之前）"""
+        self.assertEqual(self.search('示波器'), ['OSC-100', 'MTR-200'])
+        self.assertEqual(self.search('osc'), ['OSC-100'])
+        self.assertEqual(self.search('示波器 福禄克'), ['MTR-200'])
+        # 少于 3 个字符的词退回 icontains
+        self.assertEqual(self.search('示波'), ['MTR-200', 'OSC-100'])
+
+    def test_index_follows_save_and_delete(self):
+        """测试设备修改、删除后索引同步"""
+        self.meter.model = '手持示波表'
+        self.meter.purpose = '电路实验'
+        self.meter.save()
+        self.assertEqual(self.search('示波器'), ['OSC-100'])
+        self.assertEqual(self.search('示波表'), ['MTR-200'])
+        self.scope.delete()
+        self.assertEqual(self.search('泰克'), [])
+
+    def test_rebuild(self):
+        """测试重建索引"""
+        Device.objects.filter(pk=self.scope.pk).update(manufacturer='罗德与施瓦茨')
+        self.assertEqual(self.search('罗德与'), [])
+        self.assertEqual(rebuild_search_index(), 3)
+        self.assertEqual(self.search('罗德与'), ['OSC-100'])
+
+
+class DevicePickerTestCase(TestCase):
+    """预约表单设备输入联想测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        Device.objects.create(device_code='OSC-002', model='Scope S1', status='available')
+        Device.objects.create(device_code='OSC-001', model='Scope S1', status='可用')
+        Device.objects.create(device_code='MTR-001', model='OSC Probe', status='available')
+        Device.objects.create(device_code='OSC-003', model='Scope S1', status='unavailable')
+
+    def tearDown(self):
+        """测试数据回滚后清空进程内索引"""
+        clear_picker_index()
+
+    def codes(self, prefix, limit=DEFAULT_PICKER_LIMIT):
+        return [device.device_code for device in pick_devices(prefix, limit)]
+
+    def test_prefix_lookup(self):
+        """测试编号前缀优先、型号前缀其次，不可预约的设备不出现"""
+        self.assertEqual(self.codes('osc'), ['OSC-001', 'OSC-002', 'MTR-001'])
+        self.assertEqual(self.codes('scope'), ['OSC-001', 'OSC-002'])
+        self.assertEqual(self.codes('osc', limit=1), ['OSC-001'])
+        self.assertEqual(self.codes(''), [])
+        with self.assertNumQueries(0):
+            self.codes('mtr')
+
+    def test_index_refreshed_on_device_change(self):
+        """测试设备变化后索引重建"""
+        self.assertEqual(self.codes('osc-00'), ['OSC-001', 'OSC-002'])
+        device = Device.objects.get(device_code='OSC-003')
+        device.status = 'available'
+        device.save()
+        self.assertEqual(self.codes('osc-00'), ['OSC-001', 'OSC-002', 'OSC-003'])
+
+
+class DeviceBulkStatusTestCase(TestCase):
+    """设备批量修改状态测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        from django.contrib.auth.models import Group, User
+        self.devices = [
+            Device.objects.create(device_code=f'DEV{i:03d}', model='示波器X1', status='available')
+            for i in range(5)
+        ]
+        self.admin_user = User.objects.create_user(username='admin', password='admin123')
+        self.admin_user.groups.add(Group.objects.create(name='设备管理员'))
+        DeviceLedger.objects.all().delete()
+
+    def tearDown(self):
+        """测试数据回滚后让进程内统计作废"""
+        bump_catalog_generation()
+
+    def test_bulk_update_and_ledger(self):
+        """测试一条 UPDATE 修改状态并批量写入台账，状态未变的设备跳过"""
+        ids = [device.id for device in self.devices[:3]]
+        with self.assertNumQueries(6):  # 保存点 2 次 + 查询 1 次 + UPDATE 1 次 + 台账 INSERT 1 次 + 数据版本 1 次
+            changed = bulk_set_status(ids, 'unavailable', operator=self.admin_user)
+        self.assertEqual(changed, 3)
+        self.assertEqual(Device.objects.filter(status='unavailable').count(), 3)
+        self.assertEqual(DeviceLedger.objects.filter(description='设备状态变更：available → unavailable').count(), 3)
+        self.assertEqual(bulk_set_status(ids, 'unavailable'), 0)
+        with self.assertRaises(ValueError):
+            bulk_set_status(ids, 'broken')
+
+    def test_return_ledger_for_borrowed_devices(self):
+        """测试不可用 → 可用时为借出中的设备写入归还记录"""
+        bulk_set_status([self.devices[0].id, self.devices[1].id], 'unavailable')
+        borrow = DeviceLedger.objects.create(
+            device=self.devices[0], device_name='示波器X1', operation_type='borrow',
+            operation_date=timezone.now(), status_after_operation='unavailable'
+        )
+        bulk_set_status([self.devices[0].id, self.devices[1].id], 'available', operator=self.admin_user)
+        borrow.refresh_from_db()
+        self.assertIsNotNone(borrow.actual_return_date)
+        self.assertEqual(DeviceLedger.objects.filter(operation_type='return').count(), 1)
+
+    def test_bulk_status_view(self):
+        """测试批量接口的权限与提交"""
+        from django.contrib.auth.models import User
+        url = '/labadmin/device/bulk-status/'
+        data = {'device_ids': [self.devices[3].id, self.devices[4].id], 'status': 'unavailable',
+                'next': '/labadmin/device/manage/?page=1'}
+        self.client.force_login(User.objects.create_user(username='S001', password='student123'))
+        self.client.post(url, data)
+        self.assertEqual(Device.objects.filter(status='unavailable').count(), 0)
+
+        self.client.force_login(self.admin_user)
+        response = self.client.post(url, data)
+        self.assertRedirects(response, '/labadmin/device/manage/?page=1')
+        self.assertEqual(Device.objects.filter(status='unavailable').count(), 2)
+
+        response = self.client.get('/labadmin/device/manage/')
+        self.assertEqual(len(response.context['devices']), 5)
+        self.assertContains(response, 'name="device_ids"', count=5)
+
+
+class DeviceCacheTestCase(TestCase):
+    """进程内设备缓存测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        self.device = Device.objects.create(device_code='DEV001', model='示波器X1', status='available')
+
+    def tearDown(self):
+        """测试数据回滚后让进程内缓存作废"""
+        bump_catalog_generation()
+
+    def test_warm_lookup_without_queries(self):
+        """测试缓存命中后按编号、ID 查询都不访问数据库，不存在的编号同样缓存"""
+        self.assertEqual(get_device_record(device_code='DEV001').model, '示波器X1')
+        self.assertIsNone(get_device_record(device_code='NOPE'))
+        with self.assertNumQueries(0):
+            self.assertEqual(get_device_record(device_id=self.device.id).device_code, 'DEV001')
+            self.assertIsNone(get_device_record(device_code='NOPE'))
+            device = get_cached_device(device_code='DEV001', statuses=AVAILABLE_STATUSES)
+            self.assertEqual((device.pk, device.device_type_id), (self.device.id, None))
+        self.assertEqual(device.purchase_date, None)  # 未缓存的字段按需加载
+
+    def test_misses_are_bounded(self):
+        """测试大量不存在的编号不会让缓存无限增长"""
+        with mock.patch('devices.cache.MAX_CACHED_ENTRIES', 10):
+            for index in range(50):
+                get_device_record(device_code=f'NOPE{index}')
+            self.assertLessEqual(len(_device_cache['by_id']) + len(_device_cache['by_code']), 10)
+            self.assertEqual(get_device_record(device_code='DEV001').id, self.device.id)
+
+    def test_invalidated_by_save_and_other_workers(self):
+        """测试本进程保存后立即失效，其他进程修改后在读取版本号时失效"""
+        get_device_record(device_code='DEV001')
+        self.device.status = 'unavailable'
+        self.device.save()
+        self.assertIsNone(get_cached_device(device_code='DEV001', statuses=AVAILABLE_STATUSES))
+
+        # 模拟其他进程：直接改库并把版本号加一
+        Device.objects.filter(id=self.device.id).update(model='示波器X2')
+        CatalogVersion.objects.filter(name='devices').update(version=F('version') + 1)
+        self.assertEqual(get_device_record(device_code='DEV001').model, '示波器X1')
+        with mock.patch('devices.cache.GENERATION_CHECK_SECONDS', -1):
+            self.assertEqual(get_device_record(device_code='DEV001').model, '示波器X2')
@@ -1,11 +1,20 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.db.models import Q
 from django.contrib import messages  # 新增：用于提示操作结果
-from .models import Device
+from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.urls import reverse
+from django.utils.http import url_has_allowed_host_and_scheme
+from .models import DEVICE_STATUS, Device
+from .bulk import bulk_set_status
+from .search import search_devices
 from .forms import DeviceForm
 from ledger.models import DeviceLedger
 from django.utils import timezone
 
+# 设备管理列表每页条数
+DEVICE_PAGE_SIZE = 50
+
 def get_user_role_context(request):
     """辅助函数：获取用户角色信息"""
     is_admin = request.user.groups.filter(name='设备管理员').exists()
@@ -17,21 +26,13 @@ def get_user_role_context(request):
 
 def device_manage(request):
     """
-    设备管理主视图（一体化：列表、新增、编辑、搜索、状态修改）
+    设备管理主视图（一体化：分页列表、新增、编辑、搜索）
     对应路径：/labadmin/device/manage/
     """
     # 1. 处理搜索逻辑（GET 请求，keyword 参数）
     keyword = request.GET.get('keyword', '')
-    if keyword:
-        # 按设备编号/型号/厂商模糊搜索（增强搜索体验）
-        devices = Device.objects.filter(
-            Q(device_code__icontains=keyword) | 
-            Q(model__icontains=keyword) |
-            Q(manufacturer__icontains=keyword)
-        )
-    else:
-        # 无搜索时显示所有设备，按编号排序
-        devices = Device.objects.all().order_by('device_code')
+    # 按设备编号/型号/厂商/用途全文检索，按相关度排序；无搜索时显示所有设备，按编号排序
+    devices = search_devices(Device.objects.all(), keyword)
 
     # 初始化编辑状态标识
     edit_device_id = None
@@ -58,25 +59,7 @@ def device_manage(request):
             # 表单验证失败时提示错误
             messages.error(request, "表单填写有误，请检查后重新提交！")
 
-    # 3. 处理状态修改逻辑（GET 请求，status_action 和 pk 参数）
-    status_action = request.GET.get('status_action')
-    pk = request.GET.get('pk')
-    if status_action and pk:
-        device = get_object_or_404(Device, pk=pk)
-        if status_action == 'available':
-            # 如果是从不可用改为可用，创建归还记录
-            if device.status == 'unavailable':
-                create_return_ledger(device, request.user)
-            device.status = 'available'
-            msg = f"设备【{device.device_code}】已标记为可用！"
-        elif status_action == 'unavailable':
-            device.status = 'unavailable'
-            msg = f"设备【{device.device_code}】已标记为不可用！"
-        device.save()
-        messages.success(request, msg)
-        return redirect('device_manage')
-
-    # 4. 准备表单和上下文数据（编辑时自动填充表单）
+    # 3. 准备表单和上下文数据（编辑时自动填充表单）
     # 如果是编辑状态，初始化表单为对应设备数据
     if edit_device_id:
         device = get_object_or_404(Device, id=edit_device_id)
@@ -84,15 +67,50 @@ def device_manage(request):
     else:
         form = DeviceForm()  # 空表单用于新增
 
+    # 分页（状态修改通过 device_bulk_status 批量提交，单台切换也走同一接口）
+    page_obj = Paginator(devices, DEVICE_PAGE_SIZE).get_page(request.GET.get('page'))
+
     context = {
-        'devices': devices,
+        'devices': page_obj,
+        'page_obj': page_obj,
         'keyword': keyword,
+        'status_choices': DEVICE_STATUS,
         'form': form,
         'edit_device_id_js': edit_device_id,  # 传给模板标识编辑状态
     }
     context.update(get_user_role_context(request))
     return render(request, 'admin/device_manage.html', context)
 
+@login_required
+def device_bulk_status(request):
+    """
+    批量修改设备状态（POST：device_ids 多个设备ID、status 目标状态、next 返回地址）
+    对应路径：/labadmin/device/bulk-status/
+    """
+    role = get_user_role_context(request)
+    if not (role['is_admin'] or role['is_manager']):
+        messages.error(request, '你无权修改设备状态！')
+        return redirect('device_manage')
+    next_url = request.POST.get('next', '')
+    if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        next_url = reverse('device_manage')
+    if request.method != 'POST':
+        return redirect(next_url)
+
+    device_ids = [device_id for device_id in request.POST.getlist('device_ids') if device_id.isdigit()]
+    status = request.POST.get('status', '')
+    if not device_ids:
+        messages.error(request, '请先勾选要修改的设备！')
+        return redirect(next_url)
+    try:
+        changed = bulk_set_status(device_ids, status, operator=request.user)
+    except ValueError as exc:
+        messages.error(request, str(exc))
+        return redirect(next_url)
+    label = dict(DEVICE_STATUS)[status]
+    messages.success(request, f'已将 {changed} 台设备标记为{label}（所选 {len(device_ids)} 台）！')
+    return redirect(next_url)
+
 def device_delete(request, pk):
     """
     设备删除视图（独立视图，处理删除请求）
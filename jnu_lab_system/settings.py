@@ -54,6 +54,7 @@ INSTALLED_APPS = [
     'ledger',
     'manager',
     'labadmin',
+    'billing',
 ]
 
 MIDDLEWARE = [
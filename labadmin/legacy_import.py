@@ -0,0 +1,448 @@
+"""
+历史台账迁移：把实验室原有的 设备 / 教师 / 学生 / 校外 / 预约 五种 Excel 台账导入系统。
+表头与系统导出的台账一致（也接受几种常见写法），文件以 openpyxl 只读模式逐行读取，
+每 chunk_size 行为一批：一次查询剔除已存在的编号、一次查询解析关联的人员/设备，
+然后 bulk_create（设备同时批量写入"新增设备"台账记录，不逐条触发 Device.save），
+最后在同一事务内更新导入进度。中断后重新运行同一文件会从最后提交的行之后继续。
+
+导入的人员不创建登录账号（本人凭管理员发放的认领码注册时认领）；历史预约不做时段冲突检查，
+全部审批通过的预约按导入时的设备价格写入计费金额快照。
+"""
+import hashlib
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from zipfile import BadZipFile
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+from billing.utils import booking_charge_amount
+from booking.counters import adjust_user_booking_counters, user_booking_deltas
+from booking.inbox import adjust_inbox_counters, inbox_deltas
+from booking.models import Booking
+from booking.slots import get_slot_catalog, parse_time_slot
+from booking.utils import generate_booking_codes
+from devices.cache import bump_catalog_generation
+from devices.models import Device
+from devices.search import index_devices
+from ledger.models import DeviceLedger
+from user.models import UserInfo
+from .models import LegacyImportCheckpoint
+
+DEFAULT_CHUNK_SIZE = 2000
+# 导入顺序：预约依赖人员与设备，学生的导师依赖教师
+LEDGER_KINDS = ('devices', 'teachers', 'students', 'externals', 'bookings')
+LEDGER_LABELS = {
+    'devices': '设备台账',
+    'teachers': '教师台账',
+    'students': '学生台账',
+    'externals': '校外台账',
+    'bookings': '预约台账',
+}
+# 各台账的表头 → 字段
+LEDGER_HEADERS = {
+    'devices': {
+        '设备编号': 'device_code', '型号': 'model', '购入时间': 'purchase_date', '生产厂商': 'manufacturer',
+        '实验用途': 'purpose', '时段可用状态': 'status', '可用状态': 'status',
+        '校内租用价格（元/2小时）': 'price_internal', '校内价格': 'price_internal',
+        '校外租用价格（元/2小时）': 'price_external', '校外价格': 'price_external',
+    },
+    'teachers': {
+        '教师编号': 'user_code', '工号': 'user_code', '姓名': 'name', '性别': 'gender', '职称': 'title',
+        '专业方向': 'research_field', '研究方向': 'research_field', '所在学院': 'department', '联系电话': 'phone',
+    },
+    'students': {
+        '学号': 'user_code', '姓名': 'name', '性别': 'gender', '专业': 'major', '导师': 'advisor',
+        '所在学院': 'department', '联系电话': 'phone',
+    },
+    'externals': {
+        '编号': 'user_code', '姓名': 'name', '性别': 'gender', '所在单位名称': 'department', '所在单位': 'department',
+        '联系电话': 'phone', '职务': 'position', '单位地址': 'company_address',
+    },
+    'bookings': {
+        '预约编号': 'booking_code', '申请人编号': 'applicant_code', '设备编号': 'device_code',
+        '预约日期': 'booking_date', '预约时段': 'time_slot', '借用用途': 'purpose',
+        '指导教师编号': 'teacher_id', '审批状态': 'status',
+    },
+}
+LEDGER_REQUIRED = {
+    'devices': ('device_code', 'model'),
+    'teachers': ('user_code', 'name'),
+    'students': ('user_code', 'name'),
+    'externals': ('user_code', 'name'),
+    'bookings': ('applicant_code', 'device_code', 'booking_date', 'time_slot'),
+}
+USER_TYPES = {'teachers': 'teacher', 'students': 'student', 'externals': 'external'}
+DEVICE_STATUSES = {'可用': 'available', 'available': 'available', '不可用': 'unavailable', 'unavailable': 'unavailable'}
+BOOKING_STATUSES = dict(
+    [(label, status) for status, label in Booking.APPROVAL_STATUS]
+    + [(status, status) for status, _ in Booking.APPROVAL_STATUS]
+)
+# 导出的台账用 "-" 表示空值
+EMPTY_VALUES = ('', '-')
+
+LegacyRowError = namedtuple('LegacyRowError', ['row', 'message'])
+ImportStats = namedtuple('ImportStats', ['created', 'existing', 'errors', 'resumed_from', 'skipped_file'])
+
+
+class LegacyImportError(ValueError):
+    """台账文件无法读取或缺少必需的列"""
+
+
+class RowError(ValueError):
+    """单行数据错误"""
+
+
+# -------------------------- 单元格解析 --------------------------
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    return '' if text in EMPTY_VALUES else text
+
+
+def _date(value, label):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = _text(value)
+    if not text:
+        return None
+    try:
+        return datetime.strptime(text[:10], '%Y-%m-%d').date()
+    except ValueError:
+        raise RowError(f'{label}格式错误：{text}')
+
+
+def _decimal(value, label):
+    text = _text(value)
+    if not text:
+        return Decimal('0')
+    try:
+        return Decimal(text).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise RowError(f'{label}格式错误：{text}')
+
+
+def _time_slot(value):
+    """时段文本（"08:00-10:00"、时段目录中的名称或旧版 上午/下午）→ (起始时段, 时段数)"""
+    text = _text(value)
+    parsed = parse_time_slot(text)
+    if parsed:
+        return parsed
+    for index, slot in get_slot_catalog().items():
+        if slot.label == text:
+            return index, 1
+    raise RowError(f'无法识别的预约时段：{text}')
+
+
+def _check_lengths(data, max_lengths):
+    for field, max_length in max_lengths.items():
+        if len(data.get(field, '')) > max_length:
+            raise RowError(f'{field} 超过 {max_length} 个字符')
+
+
+# -------------------------- 文件读取 --------------------------
+
+def file_digest(path):
+    """台账文件内容摘要，用于识别同一文件的导入进度"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def iter_ledger_rows(path, kind, start_after=1):
+    """逐行读取台账，生成 (行号, 原始单元格字典)；跳过 start_after 及之前的行与空行"""
+    try:
+        workbook = load_workbook(path, read_only=True, data_only=True)
+    except (InvalidFileException, BadZipFile, KeyError, OSError) as exc:
+        raise LegacyImportError(f'无法读取{LEDGER_LABELS[kind]}文件：{path}') from exc
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        columns = {}
+        for index, title in enumerate(header):
+            field = LEDGER_HEADERS[kind].get(_text(title))
+            if field and field not in columns:
+                columns[field] = index
+        missing = [field for field in LEDGER_REQUIRED[kind] if field not in columns]
+        if missing:
+            raise LegacyImportError(f'{LEDGER_LABELS[kind]}缺少必需的列：{"、".join(missing)}')
+        for row_number, values in enumerate(rows, start=2):
+            if row_number <= start_after:
+                continue
+            data = {field: values[index] if index < len(values) else None for field, index in columns.items()}
+            if any(_text(value) for value in data.values()):
+                yield row_number, data
+    finally:
+        workbook.close()
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# -------------------------- 各台账的行 → 模型 --------------------------
+
+def _build_devices(chunk, context):
+    """返回 ([(行号, Device)], [错误])"""
+    built, errors = [], []
+    for row_number, raw in chunk:
+        try:
+            data = {field: _text(raw.get(field)) for field in ('device_code', 'model', 'manufacturer', 'purpose', 'status')}
+            for field in LEDGER_REQUIRED['devices']:
+                if not data[field]:
+                    raise RowError(f'缺少 {field}')
+            _check_lengths(data, {'device_code': 50, 'model': 100, 'manufacturer': 100, 'purpose': 200})
+            status = DEVICE_STATUSES.get(data['status'] or '可用')
+            if status is None:
+                raise RowError(f'无法识别的设备状态：{data["status"]}')
+            device = Device(
+                device_code=data['device_code'],
+                model=data['model'],
+                manufacturer=data['manufacturer'] or '未知厂商',
+                purpose=data['purpose'] or '未知用途',
+                purchase_date=_date(raw.get('purchase_date'), '购入时间'),
+                status=status,
+                price_internal=_decimal(raw.get('price_internal'), '校内价格'),
+                price_external=_decimal(raw.get('price_external'), '校外价格'),
+            )
+        except RowError as exc:
+            errors.append(LegacyRowError(row_number, str(exc)))
+            continue
+        built.append((row_number, device))
+    return built, errors
+
+
+NOT_NULL_USER_FIELDS = ('user_code', 'name', 'gender', 'department', 'phone')
+USER_TEXT_FIELDS = {
+    'user_code': 20, 'name': 50, 'gender': 2, 'department': 100, 'phone': 11, 'major': 50, 'advisor': 50,
+    'title': 20, 'research_field': 100, 'position': 50, 'company_address': 200,
+}
+
+
+def _build_users(chunk, context):
+    kind = context['kind']
+    built, errors = [], []
+    for row_number, raw in chunk:
+        try:
+            data = {field: _text(raw.get(field)) for field in USER_TEXT_FIELDS if field in LEDGER_HEADERS[kind].values()}
+            for field in LEDGER_REQUIRED[kind]:
+                if not data[field]:
+                    raise RowError(f'缺少 {field}')
+            _check_lengths(data, USER_TEXT_FIELDS)
+            user = UserInfo(user_type=USER_TYPES[kind], is_active=True, source='legacy')
+            for field, value in data.items():
+                # 各类人员的专属字段为空时存 NULL
+                if not value and field not in NOT_NULL_USER_FIELDS:
+                    value = None
+                setattr(user, field, value)
+            if user.gender not in ('男', '女'):
+                user.gender = '男'
+        except RowError as exc:
+            errors.append(LegacyRowError(row_number, str(exc)))
+            continue
+        built.append((row_number, user))
+
+    if kind == 'students':
+        # 按导师姓名关联指导教师账号（同名教师不唯一时只保留姓名），一次查询
+        names = {user.advisor for _, user in built if user.advisor}
+        teachers = {}
+        for teacher_id, name in UserInfo.objects.filter(user_type='teacher', name__in=names).values_list('id', 'name'):
+            teachers.setdefault(name, []).append(teacher_id)
+        for _, user in built:
+            matches = teachers.get(user.advisor, [])
+            if len(matches) == 1:
+                user.advisor_teacher_id = matches[0]
+    return built, errors
+
+
+def _build_bookings(chunk, context):
+    rows = []
+    errors = []
+    for row_number, raw in chunk:
+        data = {field: _text(raw.get(field)) for field in ('booking_code', 'applicant_code', 'device_code',
+                                                            'purpose', 'teacher_id', 'status')}
+        rows.append((row_number, raw, data))
+    # 一次查询解析申请人、设备与指导教师
+    applicants = UserInfo.objects.in_bulk({data['applicant_code'] for _, _, data in rows}, field_name='user_code')
+    devices = Device.objects.in_bulk({data['device_code'] for _, _, data in rows}, field_name='device_code')
+    advisors = UserInfo.objects.filter(
+        user_type='teacher', user_code__in={data['teacher_id'] for _, _, data in rows if data['teacher_id']}
+    ).in_bulk(field_name='user_code')
+
+    built = []
+    for row_number, raw, data in rows:
+        try:
+            for field in ('applicant_code', 'device_code'):
+                if not data[field]:
+                    raise RowError(f'缺少 {field}')
+            applicant = applicants.get(data['applicant_code'])
+            if applicant is None:
+                raise RowError(f'申请人不存在：{data["applicant_code"]}')
+            device = devices.get(data['device_code'])
+            if device is None:
+                raise RowError(f'设备不存在：{data["device_code"]}')
+            booking_date = _date(raw.get('booking_date'), '预约日期')
+            if booking_date is None:
+                raise RowError('缺少预约日期')
+            time_slot, slot_count = _time_slot(raw.get('time_slot'))
+            status = BOOKING_STATUSES.get(data['status'] or '全部审批通过')
+            if status is None:
+                raise RowError(f'无法识别的审批状态：{data["status"]}')
+            if len(data['booking_code']) > 20 or len(data['teacher_id']) > 20:
+                raise RowError('预约编号或指导教师编号超过 20 个字符')
+            advisor = advisors.get(data['teacher_id']) if applicant.user_type == 'student' else None
+            booking = Booking(
+                booking_code=data['booking_code'],
+                applicant=applicant,
+                device=device,
+                booking_date=booking_date,
+                time_slot=time_slot,
+                slot_count=slot_count,
+                purpose=data['purpose'] or None,
+                teacher_id=data['teacher_id'] or None,
+                advisor=advisor,
+                status=status,
+            )
+            if status == 'manager_approved':
+                booking.charged_amount = booking_charge_amount(booking)
+        except RowError as exc:
+            errors.append(LegacyRowError(row_number, str(exc)))
+            continue
+        built.append((row_number, booking))
+
+    # 没有预约编号的历史记录按系统规则生成编号
+    unnamed = [booking for _, booking in built if not booking.booking_code]
+    for booking, code in zip(unnamed, generate_booking_codes(len(unnamed))):
+        booking.booking_code = code
+    return built, errors
+
+
+BUILDERS = {
+    'devices': (_build_devices, Device, 'device_code'),
+    'teachers': (_build_users, UserInfo, 'user_code'),
+    'students': (_build_users, UserInfo, 'user_code'),
+    'externals': (_build_users, UserInfo, 'user_code'),
+    'bookings': (_build_bookings, Booking, 'booking_code'),
+}
+
+
+# -------------------------- 写入 --------------------------
+
+def _after_devices(devices, context):
+    """批量写入"新增设备"台账记录（代替逐条 Device.save 中的记录）"""
+    if any(device.pk is None for device in devices):
+        ids = dict(Device.objects.filter(device_code__in=[d.device_code for d in devices]).values_list('device_code', 'id'))
+        for device in devices:
+            device.pk = ids[device.device_code]
+    now = timezone.now()
+    DeviceLedger.objects.bulk_create([
+        DeviceLedger(
+            device=device,
+            device_name=device.model,
+            operation_type='other',
+            operation_date=now,
+            status_after_operation=device.status,
+            description=f'新增设备：{device.device_code} - {device.model}',
+            operator=context['operator'],
+        )
+        for device in devices
+    ], batch_size=context['chunk_size'])
+    index_devices(devices)
+    bump_catalog_generation()
+
+
+def _after_bookings(bookings, context):
+    """bulk_create 不经过 Booking.save，按整批调整审批收件箱与用户借用次数计数"""
+    adjust_inbox_counters(inbox_deltas(bookings))
+    adjust_user_booking_counters(user_booking_deltas(bookings))
+
+
+# 批量插入后的附带写入（人员台账没有）
+AFTER_CREATE = {
+    'devices': _after_devices,
+    'bookings': _after_bookings,
+}
+
+
+def import_ledger(path, kind, chunk_size=DEFAULT_CHUNK_SIZE, operator=None, restart=False, on_error=None):
+    """
+    导入一个台账文件，返回 ImportStats
+    restart 为 True 时忽略已有进度从头导入（已存在的编号仍会跳过）；on_error(错误) 用于逐行报告错误
+    """
+    if kind not in LEDGER_KINDS:
+        raise LegacyImportError(f'未知的台账类型：{kind}')
+    digest = file_digest(path)
+    checkpoint, _ = LegacyImportCheckpoint.objects.get_or_create(
+        kind=kind, source_digest=digest, defaults={'file_name': str(path)[-255:]},
+    )
+    if restart:
+        checkpoint.last_row = 1
+        checkpoint.created_count = checkpoint.existing_count = checkpoint.error_count = 0
+        checkpoint.finished = False
+        checkpoint.save()
+    elif checkpoint.finished:
+        return ImportStats(0, 0, 0, checkpoint.last_row, True)
+
+    resumed_from = checkpoint.last_row
+    build, model, key_field = BUILDERS[kind]
+    context = {'kind': kind, 'operator': operator, 'chunk_size': chunk_size}
+    created = existing = error_count = 0
+    seen = set()
+    for chunk in _chunks(iter_ledger_rows(path, kind, start_after=checkpoint.last_row), chunk_size):
+        built, errors = build(chunk, context)
+        keys = [getattr(obj, key_field) for _, obj in built]
+        present = set(model.objects.filter(**{f'{key_field}__in': keys}).order_by().values_list(key_field, flat=True))
+        objects = []
+        skipped = 0
+        for row_number, obj in built:
+            key = getattr(obj, key_field)
+            if key in present:
+                skipped += 1
+            elif key in seen:
+                errors.append(LegacyRowError(row_number, f'编号在文件中重复：{key}'))
+            else:
+                seen.add(key)
+                objects.append(obj)
+        with transaction.atomic():
+            model.objects.bulk_create(objects, batch_size=chunk_size)
+            if kind in AFTER_CREATE:
+                AFTER_CREATE[kind](objects, context)
+            # 与本批数据在同一事务内记录进度，中断时进度与已提交的数据一致
+            checkpoint.last_row = chunk[-1][0]
+            checkpoint.created_count += len(objects)
+            checkpoint.existing_count += skipped
+            checkpoint.error_count += len(errors)
+            checkpoint.save()
+        existing += skipped
+        created += len(objects)
+        error_count += len(errors)
+        if on_error:
+            for error in sorted(errors):
+                on_error(error)
+    checkpoint.finished = True
+    checkpoint.save(update_fields=['finished', 'updated_at'])
+    return ImportStats(created, existing, error_count, resumed_from, False)
+
+
+def default_operator():
+    """台账记录的操作员：与 Device.save 一致，取第一个管理员账号"""
+    return User.objects.filter(is_staff=True).first()
@@ -8,6 +8,7 @@ from datetime import datetime, date, timedelta
 from labadmin.models import Report
 from decimal import Decimal
 from django.db.models import Count, Sum, Q
+from billing.utils import PAID_USER_TYPES
 from booking.models import Booking
 from devices.models import Device
 from user.models import UserInfo
@@ -213,10 +214,13 @@ class Command(BaseCommand):
         rejected_count = bookings.filter(Q(status='admin_rejected') | Q(status='manager_rejected')).count()
         pending_count = bookings.filter(status='pending').count()
         
+        # 收入只统计收费的用户类型（与计费流水、月度结算一致，校内人员不收费）
+        paid = Q(applicant__user_type__in=PAID_USER_TYPES)
+        
         # 按设备统计
         device_stats = approved_bookings.values('device__device_code', 'device__model').annotate(
             booking_count=Count('id'),
-            revenue=Sum('device__price_external')
+            revenue=Sum('charged_amount', filter=paid)
         ).order_by('-booking_count')
         
         # 按用户类型统计
@@ -230,11 +234,9 @@ class Command(BaseCommand):
             booking_count=Count('id')
         ).order_by('booking_date')
         
-        # 计算总收入（仅校外人员）
-        total_revenue = approved_bookings.filter(
-            applicant__user_type='external'
-        ).aggregate(
-            total=Sum('device__price_external')
+        # 计算总收入：汇总审批通过时写入的计费金额快照（无需关联设备表）
+        total_revenue = approved_bookings.aggregate(
+            total=Sum('charged_amount', filter=paid)
         )['total'] or Decimal('0')
         
         # 设备使用率统计
@@ -255,8 +257,8 @@ class Command(BaseCommand):
                 'booking_count': booking_count,
                 'usage_hours': usage_hours,
                 'usage_rate': round(usage_rate, 2),
-                'revenue': float(device_bookings.filter(applicant__user_type='external').aggregate(
-                    total=Sum('device__price_external')
+                'revenue': float(device_bookings.aggregate(
+                    total=Sum('charged_amount', filter=paid)
                 )['total'] or Decimal('0'))
             })
         
@@ -0,0 +1,85 @@
+"""
+历史台账导入命令（设备 / 教师 / 学生 / 校外 / 预约 五种 Excel 台账，按依赖顺序导入）
+使用方法：python manage.py import_legacy_ledgers [--devices 文件] [--teachers 文件] [--students 文件]
+                                              [--externals 文件] [--bookings 文件]
+                                              [--chunk-size N] [--restart] [--operator 用户名]
+中断（或出错）后用相同参数重新运行即可从上次提交的行之后继续
+"""
+import time as time_module
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from labadmin.legacy_import import (
+    DEFAULT_CHUNK_SIZE, LEDGER_KINDS, LEDGER_LABELS, LegacyImportError, default_operator, import_ledger,
+)
+
+# 每个文件最多逐条打印的错误行数
+MAX_REPORTED_ERRORS = 20
+
+
+class Command(BaseCommand):
+    help = '批量导入历史 Excel 台账（支持断点续传）'
+
+    def add_arguments(self, parser):
+        for kind in LEDGER_KINDS:
+            parser.add_argument(f'--{kind}', help=f'{LEDGER_LABELS[kind]}文件（.xlsx）')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f'每批导入的行数（默认 {DEFAULT_CHUNK_SIZE}）',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='忽略已有的导入进度，从第一行重新导入（已存在的编号仍会跳过）',
+        )
+        parser.add_argument(
+            '--operator',
+            help='设备台账记录的操作员用户名（默认第一个管理员账号）',
+        )
+
+    def handle(self, *args, **options):
+        files = [(kind, options[kind]) for kind in LEDGER_KINDS if options.get(kind)]
+        if not files:
+            raise CommandError('请至少指定一个台账文件，如 --devices devices.xlsx')
+        if options['operator']:
+            operator = User.objects.filter(username=options['operator']).first()
+            if operator is None:
+                raise CommandError(f'操作员不存在：{options["operator"]}')
+        else:
+            operator = default_operator()
+
+        for kind, path in files:
+            label = LEDGER_LABELS[kind]
+            reported = []
+
+            def on_error(error):
+                reported.append(error)
+                if len(reported) <= MAX_REPORTED_ERRORS:
+                    self.stdout.write(self.style.WARNING(f'  {label} 第 {error.row} 行：{error.message}'))
+
+            started = time_module.perf_counter()
+            try:
+                stats = import_ledger(
+                    path, kind,
+                    chunk_size=options['chunk_size'],
+                    operator=operator,
+                    restart=options['restart'],
+                    on_error=on_error,
+                )
+            except (LegacyImportError, OSError) as e:
+                raise CommandError(str(e))
+            elapsed = time_module.perf_counter() - started
+
+            if stats.skipped_file:
+                self.stdout.write(f'{label}：该文件已导入完成，跳过（如需重新导入请加 --restart）')
+                continue
+            if len(reported) > MAX_REPORTED_ERRORS:
+                self.stdout.write(self.style.WARNING(f'  …… 另有 {len(reported) - MAX_REPORTED_ERRORS} 行错误'))
+            resumed = f'（从第 {stats.resumed_from + 1} 行继续）' if stats.resumed_from > 1 else ''
+            self.stdout.write(self.style.SUCCESS(
+                f'{label}{resumed}：新增 {stats.created} 条，已存在 {stats.existing} 条，'
+                f'错误 {stats.errors} 条，耗时 {elapsed:.3f} 秒'
+            ))
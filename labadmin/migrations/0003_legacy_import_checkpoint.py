@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('labadmin', '0002_alter_report_report_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LegacyImportCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20, verbose_name='台账类型')),
+                ('source_digest', models.CharField(max_length=64, verbose_name='文件摘要')),
+                ('file_name', models.CharField(max_length=255, verbose_name='文件名')),
+                ('last_row', models.PositiveIntegerField(default=1, verbose_name='已导入到的行号')),
+                ('created_count', models.PositiveIntegerField(default=0, verbose_name='新增条数')),
+                ('existing_count', models.PositiveIntegerField(default=0, verbose_name='已存在跳过条数')),
+                ('error_count', models.PositiveIntegerField(default=0, verbose_name='错误条数')),
+                ('finished', models.BooleanField(default=False, verbose_name='已完成')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '历史台账导入进度',
+                'verbose_name_plural': '历史台账导入进度',
+                'constraints': [models.UniqueConstraint(fields=('kind', 'source_digest'), name='uniq_legacy_import_checkpoint')],
+            },
+        ),
+    ]
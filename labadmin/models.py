@@ -59,3 +59,26 @@ class Report(models.Model):
     def set_report_data(self, data):
         """设置报表数据"""
         self.report_data = data
+
+
+class LegacyImportCheckpoint(models.Model):
+    """历史台账导入进度：每个台账文件（按内容摘要区分）记录已提交到的行号，中断后从下一行继续"""
+    kind = models.CharField(max_length=20, verbose_name='台账类型')
+    source_digest = models.CharField(max_length=64, verbose_name='文件摘要')
+    file_name = models.CharField(max_length=255, verbose_name='文件名')
+    last_row = models.PositiveIntegerField(default=1, verbose_name='已导入到的行号')
+    created_count = models.PositiveIntegerField(default=0, verbose_name='新增条数')
+    existing_count = models.PositiveIntegerField(default=0, verbose_name='已存在跳过条数')
+    error_count = models.PositiveIntegerField(default=0, verbose_name='错误条数')
+    finished = models.BooleanField(default=False, verbose_name='已完成')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+
+    class Meta:
+        verbose_name = '历史台账导入进度'
+        verbose_name_plural = '历史台账导入进度'
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'source_digest'], name='uniq_legacy_import_checkpoint'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.file_name}：第 {self.last_row} 行"
@@ -1,3 +1,180 @@
+import os
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
 from django.test import TestCase
+from openpyxl import Workbook
+
+from booking.models import Booking, InboxCounter
+from devices.models import Device
+from labadmin import legacy_import
+from labadmin.legacy_import import import_ledger
+from labadmin.models import LegacyImportCheckpoint
+from ledger.models import DeviceLedger
+from user.models import UserInfo
+
+
+class LegacyImportTestCase(TestCase):
+    """历史台账导入测试"""
+
+    def setUp(self):
+        """准备临时目录"""
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+
+    def write_sheet(self, name, header, rows):
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(header)
+        for row in rows:
+            sheet.append(row)
+        path = os.path.join(self.folder.name, name)
+        workbook.save(path)
+        return path
+
+    def device_file(self, count):
+        return self.write_sheet('devices.xlsx', ['设备编号', '型号', '购入时间', '生产厂商', '实验用途', '时段可用状态',
+                                                 '校内租用价格（元/2小时）', '校外租用价格（元/2小时）'], [
+            (f'DEV{index:03d}', '示波器', date(2020, 1, 1), '厂商', '-', '可用', 10, 50)
+            for index in range(count)
+        ])
+
+    def test_devices_with_ledger_entries(self):
+        """测试设备批量导入并写入新增设备台账"""
+        path = self.device_file(5)
+        with self.assertNumQueries(27):  # 进度 4 次 + 每批固定 11 次（含检索索引 4 次、数据版本 1 次）× 2 批 + 完成标记 1 次
+            stats = import_ledger(path, 'devices', chunk_size=3)
+        self.assertEqual((stats.created, stats.existing, stats.errors), (5, 0, 0))
+        self.assertEqual(DeviceLedger.objects.filter(description__startswith='新增设备：').count(), 5)
+        device = Device.objects.get(device_code='DEV004')
+        self.assertEqual((device.status, device.purpose, device.price_external), ('available', '未知用途', Decimal('50.00')))
+
+        # 同一文件已导入完成：直接跳过；重新导入时已存在的编号跳过
+        self.assertTrue(import_ledger(path, 'devices').skipped_file)
+        stats = import_ledger(path, 'devices', restart=True)
+        self.assertEqual((stats.created, stats.existing), (0, 5))
+
+    def test_resume_after_failure(self):
+        """测试中途失败后从最后提交的批次之后继续"""
+        path = self.device_file(5)
+        original = legacy_import._after_devices
+        calls = []
+
+        def failing(devices, context):
+            calls.append(len(devices))
+            if len(calls) == 2:
+                raise RuntimeError('中断')
+            original(devices, context)
+
+        with mock.patch.dict(legacy_import.AFTER_CREATE, {'devices': failing}):
+            with self.assertRaises(RuntimeError):
+                import_ledger(path, 'devices', chunk_size=2)
+        self.assertEqual(Device.objects.count(), 2)
+        self.assertEqual(LegacyImportCheckpoint.objects.get().last_row, 3)
+
+        stats = import_ledger(path, 'devices', chunk_size=2)
+        self.assertEqual((stats.created, stats.resumed_from), (3, 3))
+        self.assertEqual(Device.objects.count(), 5)
+        self.assertEqual(DeviceLedger.objects.count(), 5)
+
+    def test_people_and_bookings(self):
+        """测试人员与预约台账导入，预约计数随之更新"""
+        import_ledger(self.device_file(1), 'devices')
+        import_ledger(self.write_sheet('teachers.xlsx', ['教师编号', '姓名', '性别', '职称', '专业方向', '所在学院', '联系电话'], [
+            ('T001', '张老师', '男', '教授', '-', '计算机学院', 13800138001),
+        ]), 'teachers')
+        stats = import_ledger(self.write_sheet('students.xlsx', ['学号', '姓名', '性别', '专业', '导师', '所在学院', '联系电话'], [
+            (20230001, '李同学', '女', '软件工程', '张老师', '计算机学院', '13800138002'),
+            (None, '无学号', '男', None, None, '计算机学院', None),
+        ]), 'students')
+        self.assertEqual((stats.created, stats.errors), (1, 1))
+        student = UserInfo.objects.get(user_code='20230001')
+        self.assertEqual(student.advisor_teacher.user_code, 'T001')
+        self.assertIsNone(student.auth_user)
+        self.assertEqual(student.source, 'legacy')
+
+        booking_date = date.today() + timedelta(days=3)
+        stats = import_ledger(self.write_sheet('bookings.xlsx', ['预约编号', '申请人编号', '设备编号', '预约日期',
+                                                                 '预约时段', '借用用途', '指导教师编号', '审批状态'], [
+            ('OLD001', 'T001', 'DEV000', date(2023, 5, 1), '08:00-12:00', '实验', '-', '全部审批通过'),
+            ('OLD002', '20230001', 'DEV000', booking_date, '14:00-16:00', '-', 'T001', '待指导教师审批'),
+            (None, 'T001', 'DEV000', date(2023, 5, 2), '08:00-10:00', '-', '-', 'manager_approved'),
+            ('OLD003', 'X999', 'DEV000', date(2023, 5, 3), '08:00-10:00', '-', '-', '全部审批通过'),
+            ('OLD004', 'T001', 'DEV000', date(2023, 5, 3), '07:00-08:00', '-', '-', '全部审批通过'),
+        ]), 'bookings')
+        self.assertEqual((stats.created, stats.errors), (3, 2))
+        old = Booking.objects.get(booking_code='OLD001')
+        self.assertEqual((old.time_slot, old.slot_count, old.charged_amount), (4, 2, Decimal('20.00')))
+        self.assertEqual(Booking.objects.get(booking_code='OLD002').advisor.user_code, 'T001')
+        teacher = UserInfo.objects.get(user_code='T001')
+        self.assertEqual((teacher.booking_count, teacher.approved_booking_count), (2, 2))
+        self.assertEqual(InboxCounter.objects.get(role='advisor', owner_key=teacher.id).count, 1)
+
+
+class BookingApprovalTestCase(TestCase):
+    """管理员 / 负责人审批测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        from django.contrib.auth.models import Group, User
+        self.device = Device.objects.create(
+            device_code='DEV001', model='测试设备A', status='available', price_external=Decimal('100.00')
+        )
+        self.external = UserInfo.objects.create(
+            user_code='E001', name='王先生', user_type='external', department='外部公司', phone='13800138003'
+        )
+        self.teacher = UserInfo.objects.create(
+            user_code='T001', name='张老师', user_type='teacher', department='计算机学院', phone='13800138001'
+        )
+        self.admin = User.objects.create_user(username='admin', password='admin123')
+        self.admin.groups.add(Group.objects.create(name='设备管理员'))
+        self.booking_date = date.today() + timedelta(days=3)
+
+    def make_booking(self, index, applicant, status, **kwargs):
+        fields = {'device': self.device, 'time_slot': 4}
+        fields.update(kwargs)
+        return Booking.objects.create(
+            booking_code=f'BOOK20990101{index:03d}', applicant=applicant,
+            booking_date=self.booking_date, status=status, **fields
+        )
+
+    def test_cannot_approve_finished_booking(self):
+        """测试已撤销、候补中的预约不能被批准"""
+        cancelled = self.make_booking(1, self.teacher, 'cancelled')
+        waitlisted = self.make_booking(2, self.external, 'waitlisted', time_slot=6)
+        self.client.force_login(self.admin)
+        self.client.post('/labadmin/booking/approve/', {'approve': str(cancelled.id)})
+        self.client.post('/labadmin/booking/approve/', {
+            'booking_ids': [str(waitlisted.id)], 'batch_approve': '1',
+        })
+        cancelled.refresh_from_db()
+        waitlisted.refresh_from_db()
+        self.assertEqual((cancelled.status, waitlisted.status), ('cancelled', 'waitlisted'))
+        self.assertIsNone(cancelled.charged_amount)
+
+    def test_repeated_reject_releases_pool_unit_once(self):
+        """测试重复拒绝同一预约只释放一次型号池单元"""
+        from booking.models import ApprovalRecord
+        from booking.pool import pool_remaining, reserve_pool_slot
+        from devices.models import DeviceType
 
-# Create your tests here.
+        device_type = DeviceType.objects.create(model='示波器X1')
+        for code in ('OSC001', 'OSC002'):
+            Device.objects.create(device_code=code, model='示波器X1', status='available', device_type=device_type)
+        device_type.refresh_from_db()
+        first, second = [
+            self.make_booking(index, self.teacher, 'pending', device=None, device_type=device_type)
+            for index in (1, 2)
+        ]
+        for _ in (first, second):
+            reserve_pool_slot(device_type, self.booking_date, 4)
+        self.client.force_login(self.admin)
+        for _ in range(2):
+            self.client.post('/labadmin/booking/approve/', {'reject': str(first.id)})
+        self.client.post('/labadmin/booking/approve/', {'booking_ids': [str(first.id)], 'batch_reject': '1'})
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'admin_rejected')
+        self.assertEqual(pool_remaining(device_type, self.booking_date, 4), 1)
+        self.assertEqual(ApprovalRecord.objects.filter(booking=first).count(), 1)
@@ -1,14 +1,18 @@
 from django.urls import path, include
 from . import views
-from devices.views import device_manage, device_delete, device_detail
+from devices.views import device_manage, device_delete, device_detail, device_bulk_status
 
 urlpatterns = [
     # 管理员首页
     path('home/', views.admin_home, name='admin_home'),
     # 预约审批页
     path('booking/approve/', views.booking_approve, name='booking_approve'),
+    # 冲突处理方案页
+    path('booking/plan/', views.booking_plan, name='booking_plan'),
     # 设备管理页
     path('device/manage/', device_manage, name='device_manage'),
+    # 设备批量修改状态
+    path('device/bulk-status/', device_bulk_status, name='device_bulk_status'),
     # 设备详情/编辑页（接收设备ID pk）
     path('device/detail/<int:pk>/', device_detail, name='device_detail'),
     # 报表统计页
@@ -13,14 +13,22 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 
 from booking.models import Booking, ApprovalRecord
+from booking.waitlist import free_booking_slot, join_waitlist
+from booking.resolver import build_resolution_plan, internal_conflict_exists
+from booking.slots import booking_maintenance
+from booking.rules import APPROVAL_STATUSES, build_context, evaluate, evaluate_batch
+from billing.utils import PAID_USER_TYPES, booking_charge_amount, record_charge
 from user.models import UserInfo
 from devices.models import Device
+from devices.catalog import catalog_from_request
 from ledger.models import DeviceLedger
 from .models import Report
 from django.utils import timezone
 from datetime import timedelta, datetime, date
 from django.db.models import Count, Sum, Q, Avg
 from django.http import JsonResponse, HttpResponse
+from django.urls import reverse
+from django.db import transaction
 import json
 from decimal import Decimal
 from openpyxl import Workbook
@@ -43,24 +51,15 @@ def device_list(request):
     用户端设备查询视图
     对应路径：/user/device/list/
     """
-    # 1. 处理搜索逻辑
-    keyword = request.GET.get('keyword', '')
-    # 基础查询：获取所有设备（按编号排序）
-    devices = Device.objects.all().order_by('device_code')
-    
-    # 如果有搜索关键词，过滤结果
-    if keyword:
-        devices = devices.filter(
-            Q(device_code__icontains=keyword) |  # 按设备编号搜索
-            Q(model__icontains=keyword) |        # 按型号搜索
-            Q(manufacturer__icontains=keyword) | # 按厂商搜索
-            Q(purpose__icontains=keyword)        # 按实验用途搜索
-        )
-
-    # 2. 准备上下文数据
+    # 分页 + 分面查询（分面计数来自按数据版本缓存的一次分组统计）
+    catalog = catalog_from_request(request)
     context = {
-        'devices': devices,
-        'keyword': keyword,  # 回显搜索关键词
+        'devices': catalog.page_obj,
+        'page_obj': catalog.page_obj,
+        'facets': catalog.facets,
+        'filters': catalog.filters,
+        'total': catalog.total,
+        'keyword': request.GET.get('keyword', '').strip(),  # 回显搜索关键词
     }
     return render(request, 'user/device_list.html', context)
 
@@ -90,10 +89,13 @@ def generate_report_data(report_type, start_date, end_date):
     rejected_count = bookings.filter(Q(status='admin_rejected') | Q(status='manager_rejected')).count()
     pending_count = bookings.filter(status='pending').count()
     
+    # 收入只统计收费的用户类型（与计费流水、月度结算一致，校内人员不收费）
+    paid = Q(applicant__user_type__in=PAID_USER_TYPES)
+    
     # 按设备统计
     device_stats = approved_bookings.values('device__device_code', 'device__model').annotate(
         booking_count=Count('id'),
-        revenue=Sum('device__price_external')
+        revenue=Sum('charged_amount', filter=paid)
     ).order_by('-booking_count')
     
     # 按用户类型统计
@@ -107,11 +109,9 @@ def generate_report_data(report_type, start_date, end_date):
         booking_count=Count('id')
     ).order_by('booking_date')
     
-    # 计算总收入（仅校外人员）
-    total_revenue = approved_bookings.filter(
-        applicant__user_type='external'
-    ).aggregate(
-        total=Sum('device__price_external')
+    # 计算总收入：汇总审批通过时写入的计费金额快照（无需关联设备表）
+    total_revenue = approved_bookings.aggregate(
+        total=Sum('charged_amount', filter=paid)
     )['total'] or Decimal('0')
     
     # 设备使用率统计
@@ -132,8 +132,8 @@ def generate_report_data(report_type, start_date, end_date):
             'booking_count': booking_count,
             'usage_hours': usage_hours,
             'usage_rate': round(usage_rate, 2),
-            'revenue': float(device_bookings.filter(applicant__user_type='external').aggregate(
-                total=Sum('device__price_external')
+            'revenue': float(device_bookings.aggregate(
+                total=Sum('charged_amount', filter=paid)
             )['total'] or Decimal('0'))
         })
     
@@ -456,53 +456,145 @@ def booking_approve(request):
         elif 'batch_approve' in request.POST or 'batch_reject' in request.POST:
             booking_ids = request.POST.getlist('booking_ids')
             action = 'approve' if 'batch_approve' in request.POST else 'reject'
-            for booking_id in booking_ids:
-                handle_approval(request, booking_id, action)
+            handle_batch_approval(request, booking_ids, action)
         
         return redirect('booking_approve')
     
     context = {
-        'bookings': bookings,
+        'bookings': attach_rule_violations(bookings.select_related('applicant', 'device', 'device_type'), is_admin),
         'user_type_filter': user_type_filter,
         'is_admin': is_admin,
         'is_manager': is_manager
     }
     return render(request, 'admin/booking_approve.html', context)
 
-def handle_approval(request, booking_id, action):
-    """处理审批逻辑（核心）"""
-    booking = get_object_or_404(Booking, id=booking_id)
+@login_required
+def booking_plan(request):
+    """冲突处理方案：按天批量给出 批准/候补/拒绝 建议，管理员审核后一键执行"""
     is_admin = request.user.groups.filter(name='设备管理员').exists()
     is_manager = request.user.groups.filter(name='实验室负责人').exists()
+    if not is_admin and not is_manager:
+        messages.error(request, '你无审批权限！')
+        return redirect('manager_home')
     
-    # 1. 管理员审批逻辑
-    if is_admin:
-        if action == 'approve':
-            # 学生/教师：直接审批通过
-            if booking.applicant.user_type in ['student', 'teacher']:
+    date_input = request.GET.get('date') or request.POST.get('date') or ''
+    try:
+        plan_date = datetime.strptime(date_input, '%Y-%m-%d').date() if date_input else timezone.now().date() + timedelta(days=1)
+    except ValueError:
+        messages.error(request, '日期格式错误！')
+        plan_date = timezone.now().date() + timedelta(days=1)
+    
+    plan = build_resolution_plan(plan_date)
+    
+    # 执行方案：管理员处理待审批的申请，负责人处理管理员已批准的申请
+    if request.method == 'POST' and 'apply_plan' in request.POST:
+        actionable_status = 'pending' if is_admin else 'admin_approved'
+        # 方案内所有预约的业务规则检查共用一次预取
+        rule_context = build_context(
+            [item['booking'] for group in plan for item in group['decisions']],
+            level=approval_rule_level(is_admin),
+        )
+        applied = 0
+        for group in plan:
+            for item in group['decisions']:
+                booking = item['booking']
+                if booking.status != actionable_status:
+                    continue
+                if item['decision'] == 'approve':
+                    handle_approval(request, booking.id, 'approve', rule_context=rule_context)
+                    applied += 1
+                elif item['decision'] == 'reject':
+                    handle_approval(request, booking.id, 'reject')
+                    applied += 1
+                elif item['decision'] == 'waitlist':
+                    join_waitlist(booking)
+                    applied += 1
+        messages.success(request, f'已按方案处理 {applied} 条申请')
+        return redirect(f"{reverse('booking_plan')}?date={plan_date.isoformat()}")
+    
+    context = {
+        'plan': plan,
+        'plan_date': plan_date,
+        'contested_count': sum(1 for group in plan if group['contested']),
+        'is_admin': is_admin,
+        'is_manager': is_manager,
+    }
+    return render(request, 'admin/booking_plan.html', context)
+
+def handle_approval(request, booking_id, action, rule_context=None):
+    """处理审批逻辑（核心）；批量审批时传入共用的规则检查上下文 rule_context"""
+    booking = get_object_or_404(Booking.objects.select_related('applicant'), id=booking_id)
+    is_admin = request.user.groups.filter(name='设备管理员').exists()
+    is_manager = request.user.groups.filter(name='实验室负责人').exists()
+    
+    # 业务规则：借用资格、学生指导教师、校外人员两级审批
+    if action == 'approve':
+        violations = evaluate(booking, 'approve', context=rule_context, level=approval_rule_level(is_admin))
+        if violations:
+            messages.error(request, f'预约 {booking.booking_code} 无法批准：{violations[0].message}')
+            return
+    
+    # 校内人员优先：校外人员的申请与校内人员冲突时不能批准
+    if action == 'approve' and internal_conflict_exists(booking):
+        messages.error(request, f'预约 {booking.booking_code} 与校内人员的预约冲突，校内人员优先，无法批准！')
+        return
+    
+    # 维护期间的预约不能批准（查进程内维护区间索引）
+    if action == 'approve':
+        maintenance = booking_maintenance(booking)
+        if maintenance:
+            messages.error(request, f'预约 {booking.booking_code} 所在时段设备维护中（{maintenance.reason}），无法批准！')
+            return
+    
+    level = approval_rule_level(is_admin)
+    promoted = None
+    with transaction.atomic():
+        # 锁定后重新读取预约：重复提交、过期的批量勾选或两人同时审批时，后到的请求看到已处理后的状态直接返回，
+        # 不会重复改状态、重复释放型号池单元
+        booking = Booking.objects.select_for_update(of=('self',)).select_related('applicant').get(id=booking.id)
+        old_status = booking.status
+        if old_status not in APPROVAL_STATUSES[level]:
+            messages.error(request, f'预约 {booking.booking_code} 当前状态为「{booking.get_status_display()}」，无需重复审批！')
+            return
+        
+        # 1. 管理员审批逻辑
+        if is_admin:
+            if action == 'approve':
+                # 学生/教师：直接审批通过
+                if booking.applicant.user_type in ['student', 'teacher']:
+                    booking.status = 'manager_approved'
+                    # 审批通过时创建借出台账记录
+                    create_borrow_ledger(booking, request.user)
+                # 校外人员：需负责人审批
+                else:
+                    booking.status = 'admin_approved'
+                approval_level = 'admin'
+            else:
+                booking.status = 'admin_rejected'
+                approval_level = 'admin'
+        
+        # 2. 负责人审批逻辑（仅校外人员）
+        elif is_manager:
+            if action == 'approve':
                 booking.status = 'manager_approved'
                 # 审批通过时创建借出台账记录
                 create_borrow_ledger(booking, request.user)
-            # 校外人员：需负责人审批
             else:
-                booking.status = 'admin_approved'
-            approval_level = 'admin'
-        else:
-            booking.status = 'admin_rejected'
-            approval_level = 'admin'
-    
-    # 2. 负责人审批逻辑（仅校外人员）
-    elif is_manager:
-        if action == 'approve':
-            booking.status = 'manager_approved'
-            # 审批通过时创建借出台账记录
-            create_borrow_ledger(booking, request.user)
-        else:
-            booking.status = 'manager_rejected'
-        approval_level = 'manager'
-    
-    # 保存预约状态
-    booking.save()
+                booking.status = 'manager_rejected'
+            approval_level = 'manager'
+        
+        # 保存预约状态；全部审批通过时按当前单价记收费流水，被拒绝的预约在同一事务内释放时段并递补候补队首
+        if booking.status == 'manager_approved':
+            # 写入计费金额快照，之后调价不影响已批准预约的收入统计
+            booking.charged_amount = booking_charge_amount(booking)
+        booking.save()
+        if booking.status == 'manager_approved':
+            record_charge(booking, request.user)
+        # 只有仍占用时段（持有型号池单元）的预约被拒绝时才释放，已释放过的不会再释放一次
+        if action == 'reject' and old_status in Booking.ACTIVE_STATUSES:
+            promoted = free_booking_slot(booking)
+    if promoted:
+        messages.info(request, f'时段已释放，候补预约 {promoted.booking_code} 已自动转为待审批')
     
     # 记录审批日志
     ApprovalRecord.objects.create(
@@ -517,9 +609,34 @@ def handle_approval(request, booking_id, action):
     action_text = '批准' if action == 'approve' else '拒绝'
     messages.success(request, f'已{action_text}预约申请：{booking.booking_code}')
 
+def approval_rule_level(is_admin):
+    """规则检查使用的审批级别（同时属于两个角色时按管理员处理，与 handle_approval 一致）"""
+    return 'admin' if is_admin else 'manager'
+
+def handle_batch_approval(request, booking_ids, action):
+    """批量审批：整批预约的业务规则检查共用一次预取"""
+    rule_context = None
+    if action == 'approve':
+        is_admin = request.user.groups.filter(name='设备管理员').exists()
+        bookings = list(Booking.objects.filter(id__in=booking_ids).select_related('applicant'))
+        rule_context = build_context(bookings, level=approval_rule_level(is_admin))
+    for booking_id in booking_ids:
+        handle_approval(request, booking_id, action, rule_context=rule_context)
+
+def attach_rule_violations(bookings, is_admin):
+    """审批队列批量检查业务规则，结果挂在每条预约的 rule_violations 上供页面展示"""
+    bookings = list(bookings)
+    for booking, violations in zip(bookings, evaluate_batch(bookings, 'approve', level=approval_rule_level(is_admin))):
+        booking.rule_violations = violations
+    return bookings
+
 def create_borrow_ledger(booking, operator):
     """审批通过时创建借出台账记录"""
     try:
+        # 型号池预约：具体设备单元由 assign_units 命令按天批量分配，届时再写借出台账
+        if booking.device_id is None:
+            return
+        
         # 计算预期归还时间（基于预约日期，假设借用2小时）
         expected_return_date = booking.booking_date  # 可以根据实际需求调整
         
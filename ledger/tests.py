@@ -268,7 +268,8 @@ class LedgerViewTestCase(TestCase):
             applicant=self.teacher,
             device=self.device1,
             booking_date=date.today(),
-            time_slot='上午',
+            time_slot=4,
+            slot_count=2,
             purpose='教学使用',
             status='manager_approved'
         )
@@ -278,7 +279,8 @@ class LedgerViewTestCase(TestCase):
             applicant=self.student,
             device=self.device1,
             booking_date=date.today(),
-            time_slot='下午',
+            time_slot=7,
+            slot_count=2,
             purpose='实验使用',
             status='manager_approved'
         )
@@ -288,7 +290,8 @@ class LedgerViewTestCase(TestCase):
             applicant=self.external,
             device=self.device2,
             booking_date=date.today(),
-            time_slot='全天',
+            time_slot=0,
+            slot_count=12,
             purpose='研究使用',
             status='manager_approved'
         )
@@ -546,7 +549,8 @@ class LedgerExportTestCase(TestCase):
             applicant=self.teacher,
             device=self.device1,
             booking_date=date.today(),
-            time_slot='上午',
+            time_slot=4,
+            slot_count=2,
             purpose='教学使用',
             status='manager_approved'
         )
@@ -556,7 +560,8 @@ class LedgerExportTestCase(TestCase):
             applicant=self.student,
             device=self.device1,
             booking_date=date.today(),
-            time_slot='下午',
+            time_slot=7,
+            slot_count=2,
             purpose='实验使用',
             status='manager_approved'
         )
@@ -758,7 +763,8 @@ class LedgerIntegrationTestCase(TestCase):
             applicant=self.teacher,
             device=self.device1,
             booking_date=date.today(),
-            time_slot='上午',
+            time_slot=4,
+            slot_count=2,
             purpose='教学使用',
             status='manager_approved'
         )
@@ -5,7 +5,7 @@ from django.contrib import messages
 from django.utils import timezone
 from datetime import timedelta
 from django.http import HttpResponse
-from django.db.models import Q, Count
+from django.db.models import Q
 import csv
 from .models import DeviceLedger
 from devices.models import Device, DEVICE_STATUS
@@ -131,13 +131,11 @@ def device_operation_history_list(request):
 @check_ledger_permission
 def teacher_ledger_list(request):
     """教师台账列表视图：显示申请过设备借用的教师信息"""
-    # 筛选出申请过设备借用的教师（通过Booking关联），预加载设备信息
+    # 筛选出申请过设备借用的教师（借用次数计数 > 0，走 user_type + booking_count 索引），预加载设备信息
     teachers = UserInfo.objects.filter(
         user_type='teacher',
-        booking__isnull=False
-    ).distinct().prefetch_related('booking_set__device').annotate(
-        booking_count=Count('booking')
-    ).order_by('user_code')
+        booking_count__gt=0
+    ).prefetch_related('booking_set__device', 'booking_set__device_type').order_by('user_code')
 
     # 筛选
     user_code = request.GET.get('user_code')
@@ -172,13 +170,11 @@ def teacher_ledger_list(request):
 @check_ledger_permission
 def student_ledger_list(request):
     """学生台账列表视图：显示申请过设备借用的学生信息"""
-    # 筛选出申请过设备借用的学生（通过Booking关联），预加载设备信息
+    # 筛选出申请过设备借用的学生（借用次数计数 > 0，走 user_type + booking_count 索引），预加载设备信息
     students = UserInfo.objects.filter(
         user_type='student',
-        booking__isnull=False
-    ).distinct().prefetch_related('booking_set__device').annotate(
-        booking_count=Count('booking')
-    ).order_by('user_code')
+        booking_count__gt=0
+    ).prefetch_related('booking_set__device', 'booking_set__device_type').order_by('user_code')
 
     # 筛选
     user_code = request.GET.get('user_code')
@@ -217,13 +213,11 @@ def student_ledger_list(request):
 @check_ledger_permission
 def external_ledger_list(request):
     """校外人员台账列表视图：显示申请过设备借用的校外人员信息"""
-    # 筛选出申请过设备借用的校外人员（通过Booking关联），预加载设备信息
+    # 筛选出申请过设备借用的校外人员（借用次数计数 > 0，走 user_type + booking_count 索引），预加载设备信息
     externals = UserInfo.objects.filter(
         user_type='external',
-        booking__isnull=False
-    ).distinct().prefetch_related('booking_set__device').annotate(
-        booking_count=Count('booking')
-    ).order_by('user_code')
+        booking_count__gt=0
+    ).prefetch_related('booking_set__device', 'booking_set__device_type').order_by('user_code')
 
     # 筛选
     user_code = request.GET.get('user_code')
@@ -254,7 +248,7 @@ def external_ledger_list(request):
 @check_ledger_permission
 def booking_ledger_list(request):
     """预约台账列表视图：显示所有预约申请信息"""
-    bookings = Booking.objects.select_related('applicant', 'device').order_by('-create_time')
+    bookings = Booking.objects.select_related('applicant', 'device', 'device_type').order_by('-create_time')
 
     # 筛选
     booking_code = request.GET.get('booking_code')
@@ -417,10 +411,8 @@ def export_teacher_ledger_csv(request):
     """导出教师台账为Excel文件（.xlsx）"""
     teachers = UserInfo.objects.filter(
         user_type='teacher',
-        booking__isnull=False
-    ).distinct().prefetch_related('booking_set__device').annotate(
-        booking_count=Count('booking')
-    ).order_by('user_code')
+        booking_count__gt=0
+    ).prefetch_related('booking_set__device', 'booking_set__device_type').order_by('user_code')
 
     # 应用相同的筛选条件
     user_code = request.GET.get('user_code')
@@ -459,7 +451,7 @@ def export_teacher_ledger_csv(request):
 
     # 写入数据
     for teacher in teachers:
-        device_codes = [booking.device.device_code for booking in teacher.booking_set.all()]
+        device_codes = [booking.device_code_display for booking in teacher.booking_set.all()]
         device_str = '、'.join(device_codes) if device_codes else '-'
         # 转换datetime为naive datetime（移除时区信息）
         create_time = teacher.create_time.replace(tzinfo=None) if teacher.create_time else None
@@ -510,10 +502,8 @@ def export_student_ledger_csv(request):
     """导出学生台账为Excel文件（.xlsx）"""
     students = UserInfo.objects.filter(
         user_type='student',
-        booking__isnull=False
-    ).distinct().prefetch_related('booking_set__device').annotate(
-        booking_count=Count('booking')
-    ).order_by('user_code')
+        booking_count__gt=0
+    ).prefetch_related('booking_set__device', 'booking_set__device_type').order_by('user_code')
 
     # 应用相同的筛选条件
     user_code = request.GET.get('user_code')
@@ -556,7 +546,7 @@ def export_student_ledger_csv(request):
 
     # 写入数据
     for student in students:
-        device_codes = [booking.device.device_code for booking in student.booking_set.all()]
+        device_codes = [booking.device_code_display for booking in student.booking_set.all()]
         device_str = '、'.join(device_codes) if device_codes else '-'
         # 转换datetime为naive datetime（移除时区信息）
         create_time = student.create_time.replace(tzinfo=None) if student.create_time else None
@@ -607,10 +597,8 @@ def export_external_ledger_csv(request):
     """导出校外人员台账为Excel文件（.xlsx）"""
     externals = UserInfo.objects.filter(
         user_type='external',
-        booking__isnull=False
-    ).distinct().prefetch_related('booking_set__device').annotate(
-        booking_count=Count('booking')
-    ).order_by('user_code')
+        booking_count__gt=0
+    ).prefetch_related('booking_set__device', 'booking_set__device_type').order_by('user_code')
 
     # 应用相同的筛选条件
     user_code = request.GET.get('user_code')
@@ -645,7 +633,7 @@ def export_external_ledger_csv(request):
 
     # 写入数据
     for external in externals:
-        device_codes = [booking.device.device_code for booking in external.booking_set.all()]
+        device_codes = [booking.device_code_display for booking in external.booking_set.all()]
         device_str = '、'.join(device_codes) if device_codes else '-'
         # 转换datetime为naive datetime（移除时区信息）
         create_time = external.create_time.replace(tzinfo=None) if external.create_time else None
@@ -692,7 +680,7 @@ def export_external_ledger_csv(request):
 @check_ledger_permission
 def export_booking_ledger_csv(request):
     """导出预约台账为Excel文件（.xlsx）"""
-    bookings = Booking.objects.select_related('applicant', 'device').order_by('-create_time')
+    bookings = Booking.objects.select_related('applicant', 'device', 'device_type').order_by('-create_time')
 
     # 应用相同的筛选条件
     booking_code = request.GET.get('booking_code')
@@ -758,10 +746,10 @@ def export_booking_ledger_csv(request):
             booking.applicant.user_code,
             booking.applicant.name,
             booking.applicant.get_user_type_display(),
-            booking.device.device_code,
-            booking.device.model,
+            booking.device_code_display,
+            booking.device_model,
             booking_date,
-            booking.time_slot,
+            booking.time_slot_label,
             booking.purpose or '-',
             booking.teacher_id or '-',
             booking.get_status_display(),
@@ -1,3 +1,45 @@
+from django.contrib.auth.models import User, Group
 from django.test import TestCase
 
-# Create your tests here.
+from user.models import UserInfo
+from manager.views import USER_PAGE_SIZE
+
+
+class UserManageTestCase(TestCase):
+    """用户管理页面测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        manager = User.objects.create_user(username='manager', password='manager123')
+        manager.groups.add(Group.objects.create(name='实验室负责人'))
+        UserInfo.objects.bulk_create([
+            UserInfo(user_code=f'S{index:04d}', name=f'学生{index}', user_type='student',
+                     department='计算机学院', phone='13800138000', is_active=index % 5 != 0,
+                     booking_count=1 if index < 3 else 0)
+            for index in range(USER_PAGE_SIZE + 5)
+        ])
+        UserInfo.objects.create(user_code='T001', name='张老师', user_type='teacher',
+                                department='计算机学院', phone='13800138001')
+        self.client.login(username='manager', password='manager123')
+
+    def test_statistics_and_pagination(self):
+        """测试统计数据与分页"""
+        response = self.client.get('/manager/user/manage/', {'user_type': 'student'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_users'], USER_PAGE_SIZE + 5)
+        self.assertEqual(response.context['inactive_users'], 5)
+        self.assertEqual(response.context['active_users'], USER_PAGE_SIZE)
+        self.assertEqual(response.context['users_with_bookings'], 3)
+        self.assertEqual(len(response.context['users']), USER_PAGE_SIZE)
+        response = self.client.get('/manager/user/manage/', {'user_type': 'student', 'page': 2})
+        self.assertEqual(len(response.context['users']), 5)
+
+    def test_prefix_search(self):
+        """测试按编号/姓名前缀搜索"""
+        response = self.client.get('/manager/user/manage/', {'keyword': 'S001'})
+        self.assertEqual([u.user_code for u in response.context['users']],
+                         ['S0019', 'S0018', 'S0017', 'S0016', 'S0015', 'S0014', 'S0013', 'S0012', 'S0011', 'S0010'])
+        response = self.client.get('/manager/user/manage/', {'keyword': '张'})
+        self.assertEqual([u.user_code for u in response.context['users']], ['T001'])
+        response = self.client.get('/manager/user/manage/', {'keyword': '老师'})
+        self.assertEqual(response.context['total_users'], 0)
@@ -1,6 +1,7 @@
 from django.shortcuts import render, redirect, get_object_or_404
 
-from django.db.models import Q
+from django.core.paginator import Paginator
+from django.db.models import Count, Q
 from user.models import UserInfo
 from user.forms import UserInfoForm
 from django.contrib.auth.hashers import make_password  # 密码加密
@@ -16,7 +17,7 @@ from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment
 from openpyxl.utils import get_column_letter
 
-from labadmin.views import handle_approval
+from labadmin.views import handle_approval, handle_batch_approval, attach_rule_violations
 
 # Create your views here.
 # ---------------------- 负责人视图 ----------------------
@@ -71,13 +72,12 @@ def booking_approve(request):
         elif 'batch_approve' in request.POST or 'batch_reject' in request.POST:
             booking_ids = request.POST.getlist('booking_ids')
             action = 'approve' if 'batch_approve' in request.POST else 'reject'
-            for booking_id in booking_ids:
-                handle_approval(request, booking_id, action)
+            handle_batch_approval(request, booking_ids, action)
         
         return redirect('booking_approve')
     
     context = {
-        'bookings': bookings,
+        'bookings': attach_rule_violations(bookings.select_related('applicant', 'device', 'device_type'), is_admin),
         'user_type_filter': user_type_filter,
         'is_admin': is_admin,
         'is_manager': is_manager
@@ -336,22 +336,24 @@ def manager_export_report_csv(request, report_id):
     wb.save(response)
     return response
 
+# 用户列表每页条数
+USER_PAGE_SIZE = 20
+
 # -----------------------s--- 1. 用户列表（含搜索、筛选） --------------------------
 def user_manage(request):
     """
     用户管理主页面：展示所有用户，支持按姓名/编号搜索、按类型筛选
     对应路径：/manager/user/manage/
     """
-    # 1. 处理筛选和搜索（原有逻辑不变）
+    # 1. 处理筛选和搜索（按编号/姓名前缀搜索，走索引）
     user_type = request.GET.get('user_type', '')
-    keyword = request.GET.get('keyword', '')
-    # 使用annotate添加借用次数统计
-    from django.db.models import Count
-    user = UserInfo.objects.annotate(booking_count=Count('booking'))
+    keyword = request.GET.get('keyword', '').strip()
+    # 借用次数直接读取 UserInfo 上的计数列
+    user = UserInfo.objects.all()
     if user_type and user_type in ['student', 'teacher', 'external']:
         user = user.filter(user_type=user_type)
     if keyword:
-        user = user.filter(Q(name__icontains=keyword) | Q(user_code__icontains=keyword))
+        user = user.filter(UserInfo.prefix_search(keyword))
     
     # 2. 处理新增用户（POST请求）【核心修改：用户名=用户编号，密码=用户编号】
     if request.method == 'POST':
@@ -366,60 +368,59 @@ def user_manage(request):
             
             # 检查用户名是否已存在（用户编号本身已设置unique=True，此处双重保险）
             if User.objects.filter(username=username).exists():
-                # 理论上不会触发，因为user_code是唯一的
+                # 理论上不会触发，因为user_code是唯一的；带着错误信息继续渲染列表页
                 form.add_error('user_code', '该用户编号已作为登录账号存在！')
-                return render(request, 'manager/user_manage.html', {
-                    'user': user,
-                    'keyword': keyword,
-                    'user_type': user_type,
-                    'form': form,
-                })
-            
-            # 创建登录账号
-            auth_user = User.objects.create(
-                username=username,          # 账号=用户编号
-                password=password,          # 密码=用户编号（加密）
-                first_name=user_info.name,  # 姓名（可选）
-                is_active=user_info.is_active  # 借用资格=账号是否激活
-            )
-            
-            # 关联登录账号到UserInfo，并加入普通用户组
-            user_info.auth_user = auth_user
-            user_info.save()
-            
-            # 可选：将普通用户加入「普通用户」组
-            user_group = Group.objects.get(name='普通用户')
-            auth_user.groups.add(user_group)
-            auth_user.save()
-            
-            messages.success(request, f'用户【{user_info.name}】创建成功！')
-            return redirect('user_manage')
+            else:
+                # 创建登录账号
+                auth_user = User.objects.create(
+                    username=username,          # 账号=用户编号
+                    password=password,          # 密码=用户编号（加密）
+                    first_name=user_info.name,  # 姓名（可选）
+                    is_active=user_info.is_active  # 借用资格=账号是否激活
+                )
+                
+                # 关联登录账号到UserInfo，并加入普通用户组
+                user_info.auth_user = auth_user
+                user_info.save()
+                
+                # 可选：将普通用户加入「普通用户」组
+                user_group = Group.objects.get(name='普通用户')
+                auth_user.groups.add(user_group)
+                auth_user.save()
+                
+                messages.success(request, f'用户【{user_info.name}】创建成功！')
+                return redirect('user_manage')
     else:
         form = UserInfoForm()
     
-    # 3. 准备上下文（原有逻辑不变）
+    # 3. 准备上下文
     # 获取用户角色信息
     is_admin = request.user.groups.filter(name='设备管理员').exists()
     is_manager = request.user.groups.filter(name='实验室负责人').exists()
     
-    # 统计信息
-    total_users = user.count()
-    active_users = user.filter(is_active=True).count()
-    inactive_users = user.filter(is_active=False).count()
-    users_with_bookings = user.filter(booking_count__gt=0).count()
+    # 统计信息：一次条件聚合查询
+    stats = user.aggregate(
+        total_users=Count('id'),
+        active_users=Count('id', filter=Q(is_active=True)),
+        inactive_users=Count('id', filter=Q(is_active=False)),
+        users_with_bookings=Count('id', filter=Q(booking_count__gt=0)),
+    )
+    
+    # 分页（总数已由上面的聚合得到，分页器不再单独 COUNT）
+    paginator = Paginator(user.order_by('-create_time', '-id'), USER_PAGE_SIZE)
+    paginator.count = stats['total_users']
+    page_obj = paginator.get_page(request.GET.get('page'))
     
     context = {
-        'users': user,
+        'users': page_obj,
+        'page_obj': page_obj,
         'keyword': keyword,
         'user_type': user_type,
         'form': form,
         'is_admin': is_admin,
         'is_manager': is_manager,
-        'total_users': total_users,
-        'active_users': active_users,
-        'inactive_users': inactive_users,
-        'users_with_bookings': users_with_bookings,
     }
+    context.update(stats)
     return render(request, 'manager/user_manage.html', context)
 
 # -------------------------- 2. 编辑用户 --------------------------
@@ -500,17 +501,16 @@ def user_toggle_status(request, pk):
 def user_export_ledger(request):
     """导出用户台账为Excel文件（.xlsx）"""
     from django.http import HttpResponse
-    from django.db.models import Count
     
     user_type = request.GET.get('user_type', '')
-    keyword = request.GET.get('keyword', '')
+    keyword = request.GET.get('keyword', '').strip()
     
     # 根据筛选条件获取用户
-    users = UserInfo.objects.annotate(booking_count=Count('booking'))
+    users = UserInfo.objects.all()
     if user_type and user_type in ['student', 'teacher', 'external']:
         users = users.filter(user_type=user_type)
     if keyword:
-        users = users.filter(Q(name__icontains=keyword) | Q(user_code__icontains=keyword))
+        users = users.filter(UserInfo.prefix_search(keyword))
     
     # 创建Excel工作簿
     wb = Workbook()
@@ -9,7 +9,7 @@ class UserInfoAdmin(admin.ModelAdmin):
     # 列表页显示的核心字段（优先展示关键信息）
     list_display = [
         'user_code', 'name', 'user_type', 'get_user_type_display',  # 显示用户类型的中文名称
-        'department', 'phone', 'is_active', 'create_time'
+        'department', 'phone', 'booking_count', 'is_active', 'create_time'
     ]
     
     # 支持搜索的字段（按编号、姓名、单位搜索）
@@ -30,7 +30,7 @@ class UserInfoAdmin(admin.ModelAdmin):
             'fields': ('user_code', 'name', 'user_type', 'department', 'phone', 'gender', 'is_active')
         }),
         ('学生专属信息（仅学生填写）', {
-            'fields': ('major', 'advisor'),
+            'fields': ('major', 'advisor', 'advisor_teacher'),
             'classes': ('collapse',)  # 可折叠，默认收起
         }),
         ('教师专属信息（仅教师填写）', {
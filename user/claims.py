@@ -0,0 +1,50 @@
+"""
+人员记录认领：校园目录同步与历史台账导入的人员没有登录账号，
+管理员用 issue_claim_codes 命令为其生成一次性认领码并线下发给本人，
+本人在注册页填写学号/工号、姓名与认领码后认领该记录（其预约与借用记录随之归入新账号）。
+数据库只保存认领码的摘要，认领成功后清空；系统内由管理员、教师添加的人员不能认领。
+"""
+import hashlib
+import hmac
+import secrets
+
+from .models import UserInfo
+
+# 可以认领的记录来源
+CLAIMABLE_SOURCES = ('directory', 'legacy')
+CLAIM_CODE_LENGTH = 10
+# 去掉容易混淆的 0/O、1/I/L
+CLAIM_CODE_ALPHABET = 'ABCDEFGHJKMNPQRSTUVWXYZ23456789'
+
+
+def claim_code_digest(user_code, code):
+    """认领码摘要（与人员编号一起计算，同一认领码用在其他人员上无效）"""
+    raw = f'{user_code}:{(code or "").strip().upper()}'
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def is_claimable(user_info):
+    """尚无登录账号、由目录同步或历史台账导入的人员记录"""
+    return user_info.auth_user_id is None and user_info.source in CLAIMABLE_SOURCES
+
+
+def claimable_users():
+    return UserInfo.objects.filter(auth_user__isnull=True, source__in=CLAIMABLE_SOURCES)
+
+
+def issue_claim_codes(users, batch_size=1000):
+    """为一批人员生成新的认领码（此前发放的作废），返回 [(人员, 认领码)]"""
+    issued = []
+    for user in users:
+        code = ''.join(secrets.choice(CLAIM_CODE_ALPHABET) for _ in range(CLAIM_CODE_LENGTH))
+        user.claim_code_hash = claim_code_digest(user.user_code, code)
+        issued.append((user, code))
+    UserInfo.objects.bulk_update([user for user, _ in issued], ['claim_code_hash'], batch_size=batch_size)
+    return issued
+
+
+def check_claim_code(user_info, code):
+    """认领码是否与该人员当前有效的认领码一致"""
+    if not code or not user_info.claim_code_hash:
+        return False
+    return hmac.compare_digest(user_info.claim_code_hash, claim_code_digest(user_info.user_code, code))
@@ -0,0 +1,209 @@
+"""
+校园人员目录增量同步：读取学校导出的学生/教师目录（CSV 或 JSONL），按 user_code 与 UserInfo 比对。
+每行目录数据计算一个指纹（各字段拼接后的哈希）保存在 UserInfo.directory_fingerprint，
+同步时只需取出 user_code、id、指纹等几列比较，指纹相同的行直接跳过，
+新增与变化的行分别成批 bulk_create / bulk_update。
+
+目录导入的用户不创建登录账号，本人在注册页用学号/工号、姓名和管理员发放的认领码注册时认领该记录；
+用户在系统内修改的信息只有在目录中对应的行发生变化时才会被目录数据覆盖；
+已被禁用的人员重新出现在目录中时，即使行未变化也会重新写入并恢复借用资格与登录账号。
+"""
+import csv
+import hashlib
+import json
+from collections import namedtuple
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .models import UserInfo
+
+DEFAULT_BATCH_SIZE = 1000
+# 目录中允许的人员类型
+DIRECTORY_USER_TYPES = ('student', 'teacher')
+# 参与比对的目录字段（顺序固定，决定指纹）
+DIRECTORY_FIELDS = (
+    'user_code', 'name', 'user_type', 'department', 'phone', 'gender',
+    'major', 'title', 'research_field', 'advisor_code',
+)
+REQUIRED_FIELDS = ('user_code', 'name', 'user_type', 'department')
+# 直接写入 UserInfo 的字段（advisor_code 另行解析为指导教师外键）
+PROFILE_FIELDS = ('name', 'user_type', 'department', 'phone', 'gender', 'major', 'title', 'research_field')
+# 可为空的专属字段，目录中为空时写入 NULL
+NULLABLE_FIELDS = ('major', 'title', 'research_field')
+UPDATE_FIELDS = PROFILE_FIELDS + ('advisor', 'advisor_teacher', 'directory_fingerprint', 'source', 'is_active', 'update_time')
+MAX_LENGTHS = {
+    'user_code': 20, 'name': 50, 'department': 100, 'phone': 11,
+    'major': 50, 'title': 20, 'research_field': 100, 'advisor_code': 20,
+}
+
+DirectoryRowError = namedtuple('DirectoryRowError', ['line', 'user_code', 'message'])
+SyncResult = namedtuple('SyncResult', ['created', 'updated', 'unchanged', 'deactivated', 'errors'])
+
+
+class DirectoryFormatError(ValueError):
+    """目录文件格式无法识别"""
+
+
+def read_directory(path):
+    """按扩展名逐行读取目录文件，生成 (行号, 原始字典)"""
+    if path.endswith('.csv'):
+        with open(path, newline='', encoding='utf-8-sig') as file:
+            for line, row in enumerate(csv.DictReader(file), start=2):
+                yield line, row
+    elif path.endswith('.jsonl'):
+        with open(path, encoding='utf-8') as file:
+            for line, text in enumerate(file, start=1):
+                if not text.strip():
+                    continue
+                try:
+                    row = json.loads(text)
+                except json.JSONDecodeError:
+                    row = None
+                yield line, row if isinstance(row, dict) else None
+    else:
+        raise DirectoryFormatError('目录文件须为 .csv 或 .jsonl 格式')
+
+
+def normalize_row(raw):
+    """清洗一行目录数据，返回 (字段字典, 错误信息)"""
+    if raw is None:
+        return None, '无法解析该行'
+    row = {field: str(raw.get(field) or '').strip() for field in DIRECTORY_FIELDS}
+    for field in REQUIRED_FIELDS:
+        if not row[field]:
+            return row, f'缺少字段 {field}'
+    if row['user_type'] not in DIRECTORY_USER_TYPES:
+        return row, f'人员类型无效：{row["user_type"]}'
+    for field, max_length in MAX_LENGTHS.items():
+        if len(row[field]) > max_length:
+            return row, f'字段 {field} 超过 {max_length} 个字符'
+    if row['gender'] not in ('男', '女'):
+        row['gender'] = '男'
+    return row, ''
+
+
+def row_fingerprint(row):
+    """目录行指纹：固定顺序拼接各字段后取哈希"""
+    raw = '\x1f'.join(row[field] for field in DIRECTORY_FIELDS)
+    return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _apply_profile(user, row, fingerprint, now):
+    for field in PROFILE_FIELDS:
+        value = row[field]
+        if not value and field in NULLABLE_FIELDS:
+            value = None
+        setattr(user, field, value)
+    user.directory_fingerprint = fingerprint
+    # 目录中的人员可凭认领码认领（见 user.claims）
+    user.source = 'directory'
+    # 目录中存在的人员即具备借用资格（此前因不在目录中被禁用的恢复）
+    user.is_active = True
+    user.update_time = now
+
+
+def _advisor_map(rows):
+    """学生行引用的指导教师编号 → (ID, 姓名)，一次查询"""
+    codes = {row['advisor_code'] for row, _ in rows if row['user_type'] == 'student' and row['advisor_code']}
+    if not codes:
+        return {}
+    return {
+        code: (teacher_id, name)
+        for code, teacher_id, name in UserInfo.objects.filter(user_code__in=codes, user_type='teacher')
+        .order_by().values_list('user_code', 'id', 'name')
+    }
+
+
+def _write(rows, existing, batch_size, now, advisors=None):
+    """把一组变化的行写入数据库：新增的 bulk_create，变化的 bulk_update，返回 (新增数, 更新数)"""
+    to_create = []
+    to_update = []
+    for row, fingerprint in rows:
+        user_id = existing[row['user_code']][0] if row['user_code'] in existing else None
+        user = UserInfo(id=user_id, user_code=row['user_code'])
+        _apply_profile(user, row, fingerprint, now)
+        if advisors is not None:
+            teacher_id, teacher_name = advisors.get(row['advisor_code'], (None, None))
+            user.advisor_teacher_id = teacher_id
+            user.advisor = teacher_name
+        (to_update if user_id else to_create).append(user)
+    UserInfo.objects.bulk_create(to_create, batch_size=batch_size)
+    fields = UPDATE_FIELDS if advisors is not None else tuple(
+        field for field in UPDATE_FIELDS if field not in ('advisor', 'advisor_teacher')
+    )
+    UserInfo.objects.bulk_update(to_update, fields, batch_size=batch_size)
+    return len(to_create), len(to_update)
+
+
+def sync_directory(entries, batch_size=DEFAULT_BATCH_SIZE, dry_run=False, deactivate_missing=False):
+    """
+    按目录数据增量同步 UserInfo
+    entries 为 (行号, 原始字典) 序列（见 read_directory）；deactivate_missing 时，
+    以前由目录导入、本次目录中已不存在的人员禁用借用资格
+    """
+    errors = []
+    seen = {}
+    for line, raw in entries:
+        row, message = normalize_row(raw)
+        if not message and row['user_code'] in seen:
+            message = f'编号与第 {seen[row["user_code"]][0]} 行重复'
+        if message:
+            errors.append(DirectoryRowError(line, (row or {}).get('user_code', ''), message))
+            continue
+        seen[row['user_code']] = (line, row)
+
+    # 一次查询取出全部已有用户的编号、ID、指纹与借用资格
+    existing = {
+        code: (user_id, fingerprint, is_active)
+        for code, user_id, fingerprint, is_active in UserInfo.objects.order_by()
+        .values_list('user_code', 'id', 'directory_fingerprint', 'is_active').iterator(chunk_size=5000)
+    }
+    changed = []
+    unchanged = 0
+    reactivated_ids = []
+    for _, row in seen.values():
+        fingerprint = row_fingerprint(row)
+        current = existing.get(row['user_code'])
+        if current and current[1] == fingerprint and current[2]:
+            unchanged += 1
+        else:
+            changed.append((row, fingerprint))
+            if current and not current[2]:
+                reactivated_ids.append(current[0])
+
+    missing_ids = []
+    if deactivate_missing:
+        missing_ids = [
+            user_id for code, (user_id, fingerprint, is_active) in existing.items()
+            if fingerprint and is_active and code not in seen
+        ]
+
+    created = updated = 0
+    if not dry_run:
+        now = timezone.now()
+        with transaction.atomic():
+            # 先写教师，学生的指导教师才能按编号解析到 ID
+            teachers = [item for item in changed if item[0]['user_type'] == 'teacher']
+            students = [item for item in changed if item[0]['user_type'] == 'student']
+            for rows, with_advisor in ((teachers, False), (students, True)):
+                if not rows:
+                    continue
+                advisors = _advisor_map(rows) if with_advisor else None
+                counts = _write(rows, existing, batch_size, now, advisors)
+                created += counts[0]
+                updated += counts[1]
+            for start in range(0, len(missing_ids), batch_size):
+                batch = missing_ids[start:start + batch_size]
+                UserInfo.objects.filter(id__in=batch).update(is_active=False, update_time=now)
+                # 同步禁用已认领的登录账号
+                User.objects.filter(userinfo__id__in=batch).update(is_active=False)
+            for start in range(0, len(reactivated_ids), batch_size):
+                # 重新出现在目录中的人员恢复已认领的登录账号
+                batch = reactivated_ids[start:start + batch_size]
+                User.objects.filter(userinfo__id__in=batch, is_active=False).update(is_active=True)
+    else:
+        created = sum(1 for row, _ in changed if row['user_code'] not in existing)
+        updated = len(changed) - created
+    return SyncResult(created, updated, unchanged, len(missing_ids), errors)
@@ -1,5 +1,6 @@
 from django import forms
 from django.contrib.auth.hashers import make_password
+from .claims import check_claim_code, is_claimable
 from .models import UserInfo
 
 class UserInfoForm(forms.ModelForm):
@@ -56,6 +57,13 @@ class RegistrationForm(forms.ModelForm):
         label='确认密码',
         required=True
     )
+    # 系统中已有本人信息（目录同步或历史台账导入）时填写管理员发放的认领码
+    claim_code = forms.CharField(
+        max_length=20,
+        widget=forms.TextInput(attrs={'class': 'form-control', 'autocomplete': 'off'}),
+        label='认领码',
+        required=False
+    )
     
     class Meta:
         model = UserInfo
@@ -89,13 +97,30 @@ class RegistrationForm(forms.ModelForm):
         if password and confirm_password and password != confirm_password:
             raise forms.ValidationError('两次输入的密码不一致！')
         
-        # 验证用户编号唯一性
-        if user_code and UserInfo.objects.filter(user_code=user_code).exists():
-            raise forms.ValidationError('该用户编号已被注册！')
-        
+        # 验证用户编号唯一性；目录同步或历史台账导入、尚未注册账号的人员凭姓名与管理员发放的认领码认领
+        self.directory_user = None
+        existing = UserInfo.objects.filter(user_code=user_code).first() if user_code else None
+        if existing:
+            if existing.auth_user_id:
+                raise forms.ValidationError('该用户编号已被注册！')
+            if not is_claimable(existing):
+                raise forms.ValidationError('该用户编号已存在，请联系管理员开通账号！')
+            # 已被禁用（如已不在学校目录中）的人员不能认领，否则会得到一个可登录的账号
+            if not existing.is_active:
+                raise forms.ValidationError('该人员的借用资格已被禁用，请联系管理员！')
+            if existing.name != cleaned_data.get('name'):
+                raise forms.ValidationError('系统中已有该编号的人员信息，请填写与之一致的姓名！')
+            if not check_claim_code(existing, cleaned_data.get('claim_code')):
+                raise forms.ValidationError('系统中已有该编号的人员信息，请填写管理员发放的认领码！')
+            self.directory_user = existing
         
         return cleaned_data
 
+    def validate_unique(self):
+        # 认领目录中已有的记录时，编号重复是预期的
+        if getattr(self, 'directory_user', None) is None:
+            super().validate_unique()
+
 # 教师维护学生列表
 class StudentForm(forms.ModelForm):
     """学生信息表单（用于教师添加/编辑学生）"""
@@ -167,4 +192,19 @@ class StudentIdForm(forms.Form):
         # 检查学号格式（可选）
         if not user_code:
             raise forms.ValidationError('请输入学号！')
-        return user_code
\ No newline at end of file
+        return user_code
+
+# 批量导入学生表单
+class StudentImportForm(forms.Form):
+    """教师上传 Excel 批量导入学生"""
+    file = forms.FileField(
+        label='Excel 文件',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.xlsx'}),
+        help_text='表头需包含：学号、姓名、所在学院、联系电话（可选：性别、专业）；默认密码为学号'
+    )
+
+    def clean_file(self):
+        file = self.cleaned_data['file']
+        if not file.name.lower().endswith('.xlsx'):
+            raise forms.ValidationError('请上传 .xlsx 格式的 Excel 文件！')
+        return file
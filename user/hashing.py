@@ -0,0 +1,33 @@
+"""
+批量生成密码哈希：PBKDF2 每个密码需数百毫秒，批量导入账号时在进程池中并行计算。
+本模块不导入任何模型，子进程（spawn/forkserver 方式启动时）可以在 Django 初始化之前安全加载。
+"""
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+# 少于该数量时直接在当前进程计算，不值得启动进程池
+PARALLEL_THRESHOLD = 8
+
+
+def _init_worker():
+    """子进程初始化：非 fork 方式启动的子进程需要先加载 Django 配置"""
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def hash_password(raw_password):
+    from django.contrib.auth.hashers import make_password
+    return make_password(raw_password)
+
+
+def hash_passwords(raw_passwords, workers=None):
+    """按顺序返回每个明文密码的哈希；workers 为进程数（默认 CPU 核数）"""
+    raw_passwords = list(raw_passwords)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(raw_passwords) < PARALLEL_THRESHOLD:
+        return [hash_password(raw) for raw in raw_passwords]
+    chunksize = max(1, len(raw_passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        return list(executor.map(hash_password, raw_passwords, chunksize=chunksize))
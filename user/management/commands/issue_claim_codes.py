@@ -0,0 +1,47 @@
+"""
+为目录同步 / 历史台账导入、尚未注册账号的人员生成一次性认领码，写入 CSV 文件供管理员线下发放
+使用方法：python manage.py issue_claim_codes --output <CSV 文件> [用户编号 ...] [--reissue]
+不指定用户编号时为全部尚未发放认领码的可认领人员生成；--reissue 时已发放的也重新生成（旧码作废）
+"""
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from user.claims import claimable_users, issue_claim_codes
+
+
+class Command(BaseCommand):
+    help = '为可认领的人员生成一次性认领码'
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_codes', nargs='*', help='只为这些用户编号生成（指定时总是重新生成）')
+        parser.add_argument('--output', required=True, help='认领码输出文件（CSV）')
+        parser.add_argument(
+            '--reissue',
+            action='store_true',
+            help='已发放认领码的人员也重新生成（旧码作废）',
+        )
+
+    def handle(self, *args, **options):
+        users = claimable_users().order_by('user_code')
+        if options['user_codes']:
+            users = users.filter(user_code__in=options['user_codes'])
+            missing = set(options['user_codes']) - set(users.values_list('user_code', flat=True))
+            if missing:
+                raise CommandError(f'以下编号不存在、已注册或不是导入的人员：{"、".join(sorted(missing))}')
+        elif not options['reissue']:
+            users = users.filter(claim_code_hash__isnull=True)
+
+        # 文件写入失败时回滚，不会让旧认领码作废而新认领码又没有发出去
+        with transaction.atomic():
+            issued = issue_claim_codes(list(users))
+            try:
+                with open(options['output'], 'w', newline='', encoding='utf-8-sig') as file:
+                    writer = csv.writer(file)
+                    writer.writerow(['用户编号', '姓名', '所在学院/单位', '认领码'])
+                    for user, code in issued:
+                        writer.writerow([user.user_code, user.name, user.department, code])
+            except OSError as e:
+                raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f'已为 {len(issued)} 人生成认领码，写入 {options["output"]}'))
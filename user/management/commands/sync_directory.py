@@ -0,0 +1,64 @@
+"""
+校园人员目录同步命令（学生/教师目录的 CSV 或 JSONL 导出文件，只写入有变化的行）
+使用方法：python manage.py sync_directory <目录文件> [--batch-size N] [--dry-run] [--deactivate-missing]
+CSV 表头 / JSONL 键：user_code, name, user_type(student/teacher), department, phone, gender,
+                    major, title, research_field, advisor_code（学生的指导教师工号）
+建议通过定时任务每天夜间运行一次
+"""
+import time as time_module
+
+from django.core.management.base import BaseCommand, CommandError
+
+from user.directory import DEFAULT_BATCH_SIZE, DirectoryFormatError, read_directory, sync_directory
+
+# 最多逐条打印的错误行数
+MAX_REPORTED_ERRORS = 20
+
+
+class Command(BaseCommand):
+    help = '按校园人员目录增量同步用户信息'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='目录文件路径（.csv 或 .jsonl）')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'每批写入的行数（默认 {DEFAULT_BATCH_SIZE}）',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='仅统计将要新增/更新的人数，不实际修改',
+        )
+        parser.add_argument(
+            '--deactivate-missing',
+            action='store_true',
+            help='禁用以前由目录导入、本次目录中已不存在的人员',
+        )
+
+    def handle(self, *args, **options):
+        started = time_module.perf_counter()
+        try:
+            result = sync_directory(
+                read_directory(options['path']),
+                batch_size=options['batch_size'],
+                dry_run=options['dry_run'],
+                deactivate_missing=options['deactivate_missing'],
+            )
+        except (DirectoryFormatError, OSError) as e:
+            raise CommandError(str(e))
+        elapsed = time_module.perf_counter() - started
+
+        for error in result.errors[:MAX_REPORTED_ERRORS]:
+            self.stdout.write(self.style.WARNING(f'  第 {error.line} 行 {error.user_code}：{error.message}'))
+        if len(result.errors) > MAX_REPORTED_ERRORS:
+            self.stdout.write(self.style.WARNING(f'  …… 另有 {len(result.errors) - MAX_REPORTED_ERRORS} 行错误'))
+        summary = (
+            f'新增 {result.created} 人，更新 {result.updated} 人，未变化 {result.unchanged} 人，'
+            f'禁用 {result.deactivated} 人，错误 {len(result.errors)} 行，耗时 {elapsed:.3f} 秒'
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'[预览] {summary}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_advisor_teacher(apps, schema_editor):
+    """按教师姓名关联指导教师账号（同名教师不唯一时跳过，由教师在“添加学生”中重新关联）"""
+    UserInfo = apps.get_model('user', 'UserInfo')
+    teachers = {}
+    for teacher_id, name in UserInfo.objects.filter(user_type='teacher').values_list('id', 'name'):
+        teachers.setdefault(name, []).append(teacher_id)
+    to_update = []
+    for student in UserInfo.objects.filter(user_type='student').exclude(advisor__isnull=True).exclude(advisor='').only('id', 'advisor'):
+        matches = teachers.get(student.advisor, [])
+        if len(matches) == 1:
+            student.advisor_teacher_id = matches[0]
+            to_update.append(student)
+    UserInfo.objects.bulk_update(to_update, ['advisor_teacher'], batch_size=500)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userinfo',
+            name='advisor_teacher',
+            field=models.ForeignKey(blank=True, limit_choices_to={'user_type': 'teacher'}, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='advisees', to='user.userinfo', verbose_name='指导教师账号'),
+        ),
+        migrations.RunPython(link_advisor_teacher, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+# 与 booking.counters.STATUS_COUNTER_FIELDS 一致（迁移中不引用业务模块）
+STATUS_COUNTER_FIELDS = {
+    'advisor_pending': 'pending_booking_count',
+    'pending': 'pending_booking_count',
+    'admin_approved': 'pending_booking_count',
+    'waitlisted': 'pending_booking_count',
+    'manager_approved': 'approved_booking_count',
+    'advisor_rejected': 'rejected_booking_count',
+    'admin_rejected': 'rejected_booking_count',
+    'manager_rejected': 'rejected_booking_count',
+    'cancelled': 'cancelled_booking_count',
+    'expired': 'cancelled_booking_count',
+}
+
+
+def backfill_booking_counters(apps, schema_editor):
+    """按预约表一次分组统计，写入已有用户的借用次数计数"""
+    from django.db.models import Count
+
+    UserInfo = apps.get_model('user', 'UserInfo')
+    Booking = apps.get_model('booking', 'Booking')
+    totals = {}
+    for row in Booking.objects.values('applicant_id', 'status').annotate(n=Count('id')).order_by():
+        fields = totals.setdefault(row['applicant_id'], {})
+        fields['booking_count'] = fields.get('booking_count', 0) + row['n']
+        field = STATUS_COUNTER_FIELDS.get(row['status'])
+        if field:
+            fields[field] = fields.get(field, 0) + row['n']
+    to_update = []
+    for user in UserInfo.objects.filter(id__in=totals).only('id'):
+        for field, value in totals[user.id].items():
+            setattr(user, field, value)
+        to_update.append(user)
+    UserInfo.objects.bulk_update(
+        to_update,
+        ['booking_count', 'pending_booking_count', 'approved_booking_count',
+         'rejected_booking_count', 'cancelled_booking_count'],
+        batch_size=500,
+    )
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0002_userinfo_advisor_teacher'),
+        ('booking', '0010_inbox_counter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userinfo',
+            name='approved_booking_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='已批准次数'),
+        ),
+        migrations.AddField(
+            model_name='userinfo',
+            name='booking_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='借用次数'),
+        ),
+        migrations.AddField(
+            model_name='userinfo',
+            name='cancelled_booking_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='撤销/过期次数'),
+        ),
+        migrations.AddField(
+            model_name='userinfo',
+            name='pending_booking_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='审批中次数'),
+        ),
+        migrations.AddField(
+            model_name='userinfo',
+            name='rejected_booking_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='被拒绝次数'),
+        ),
+        migrations.AddIndex(
+            model_name='userinfo',
+            index=models.Index(fields=['user_type', 'booking_count'], name='user_userin_user_ty_fda944_idx'),
+        ),
+        migrations.RunPython(backfill_booking_counters, migrations.RunPython.noop),
+    ]
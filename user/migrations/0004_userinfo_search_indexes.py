@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0003_userinfo_booking_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userinfo',
+            name='name',
+            field=models.CharField(db_index=True, max_length=50, verbose_name='姓名'),
+        ),
+        migrations.AddIndex(
+            model_name='userinfo',
+            index=models.Index(fields=['create_time'], name='user_userin_create__a2d1e1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userinfo',
+            index=models.Index(fields=['user_type', 'create_time'], name='user_userin_user_ty_465c5c_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0004_userinfo_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userinfo',
+            name='directory_fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=32, null=True, verbose_name='目录指纹'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:20
+
+from django.db import migrations, models
+
+
+def mark_directory_users(apps, schema_editor):
+    """已由目录同步写入的人员（有目录指纹）标记为目录来源"""
+    UserInfo = apps.get_model('user', 'UserInfo')
+    UserInfo.objects.filter(directory_fingerprint__isnull=False).update(source='directory')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0005_userinfo_directory_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userinfo',
+            name='claim_code_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, verbose_name='认领码摘要'),
+        ),
+        migrations.AddField(
+            model_name='userinfo',
+            name='source',
+            field=models.CharField(choices=[('manual', '系统内添加'), ('directory', '校园目录'), ('legacy', '历史台账')], default='manual', editable=False, max_length=10, verbose_name='记录来源'),
+        ),
+        migrations.RunPython(mark_directory_users, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User  # 导入内置User模型
 
 class UserInfo(models.Model):
@@ -17,7 +18,7 @@ class UserInfo(models.Model):
         unique=True,  # 编号唯一，避免重复
         help_text='学生填学号，教师填工号，校外人员填自定义编号（如O开头）'
     )
-    name = models.CharField(max_length=50, verbose_name='姓名')
+    name = models.CharField(max_length=50, db_index=True, verbose_name='姓名')
     user_type = models.CharField(
         max_length=10, 
         choices=USER_TYPE_CHOICES, 
@@ -30,6 +31,16 @@ class UserInfo(models.Model):
     # 学生专属字段
     major = models.CharField(max_length=50, blank=True, null=True, verbose_name='专业')
     advisor = models.CharField(max_length=50, blank=True, null=True, verbose_name='指导教师')
+    # 指导教师账号（按外键关联，advisor 仅保留教师姓名用于展示和检索）
+    advisor_teacher = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='advisees',
+        limit_choices_to={'user_type': 'teacher'},
+        verbose_name='指导教师账号'
+    )
     
     # 教师专属字段
     title = models.CharField(max_length=20, blank=True, null=True, verbose_name='职称')
@@ -40,6 +51,24 @@ class UserInfo(models.Model):
     company_address = models.CharField(max_length=200, blank=True, null=True, verbose_name='单位地址')
     
     is_active = models.BooleanField(default=True, verbose_name='借用资格（正常/禁用）')
+    # 校园目录同步：最近一次同步时目录行的指纹（非目录导入的用户为空），见 user.directory
+    directory_fingerprint = models.CharField(max_length=32, blank=True, null=True, editable=False, verbose_name='目录指纹')
+    # 记录来源：目录同步 / 历史台账导入的人员可凭管理员发放的认领码在注册页认领，见 user.claims
+    SOURCE_CHOICES = (
+        ('manual', '系统内添加'),
+        ('directory', '校园目录'),
+        ('legacy', '历史台账'),
+    )
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default='manual', editable=False, verbose_name='记录来源')
+    # 一次性认领码的摘要（认领成功后清空）
+    claim_code_hash = models.CharField(max_length=64, blank=True, null=True, editable=False, verbose_name='认领码摘要')
+
+    # 借用次数计数（冗余字段，由预约的创建/状态变化/删除维护，见 booking.counters）
+    booking_count = models.PositiveIntegerField(default=0, db_index=True, editable=False, verbose_name='借用次数')
+    pending_booking_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='审批中次数')
+    approved_booking_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='已批准次数')
+    rejected_booking_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='被拒绝次数')
+    cancelled_booking_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='撤销/过期次数')
     create_time = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
     update_time = models.DateTimeField(auto_now=True, verbose_name='更新时间')
     
@@ -56,6 +85,27 @@ class UserInfo(models.Model):
         verbose_name = '用户信息'
         verbose_name_plural = '用户信息'
         ordering = ['-create_time']  # 按创建时间倒序排列
+        indexes = [
+            # 人员台账：按类型筛选借用过设备的用户
+            models.Index(fields=['user_type', 'booking_count']),
+            # 用户管理：按创建时间倒序分页（可先按类型筛选）
+            models.Index(fields=['create_time']),
+            models.Index(fields=['user_type', 'create_time']),
+        ]
 
     def __str__(self):
-        return f'{self.name}（{self.get_user_type_display()}）'
\ No newline at end of file
+        return f'{self.name}（{self.get_user_type_display()}）'
+
+    @staticmethod
+    def prefix_search(keyword):
+        """
+        按用户编号或姓名的前缀搜索
+        用 >= / < 范围条件代替 LIKE，user_code（唯一索引）与 name 上的索引都能直接使用
+        """
+        upper = keyword + '\U0010ffff'
+        return Q(user_code__gte=keyword, user_code__lt=upper) | Q(name__gte=keyword, name__lt=upper)
+
+    def set_advisor(self, teacher):
+        """设置（teacher 为 None 时清除）指导教师，同步教师姓名"""
+        self.advisor_teacher = teacher
+        self.advisor = teacher.name if teacher else ''
\ No newline at end of file
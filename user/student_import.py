@@ -0,0 +1,191 @@
+"""
+教师通过 Excel 批量导入指导学生：
+以 openpyxl 只读模式逐行读取上传的 .xlsx，先逐行校验字段，再按批查询核对已注册的学号（不逐行查询），
+密码哈希在进程池中并行计算，最后在一个事务内 bulk_create 登录账号与用户信息。
+有问题的行逐行报告（行号 + 原因），其余行照常导入。
+"""
+from collections import namedtuple
+from zipfile import BadZipFile
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+from .hashing import hash_passwords
+from .models import UserInfo
+
+# 单次导入的最大行数
+MAX_IMPORT_ROWS = 5000
+# 表头 → 字段（同一字段允许几种常见写法）
+HEADER_FIELDS = {
+    '学号': 'user_code',
+    '姓名': 'name',
+    '性别': 'gender',
+    '所在学院': 'department',
+    '学院': 'department',
+    '联系电话': 'phone',
+    '电话': 'phone',
+    '专业': 'major',
+}
+REQUIRED_FIELDS = {
+    'user_code': '学号',
+    'name': '姓名',
+    'department': '所在学院',
+    'phone': '联系电话',
+}
+GENDERS = ('男', '女')
+# 查询已注册学号时每批的数量（避免超出数据库参数个数限制）
+LOOKUP_BATCH_SIZE = 500
+
+ImportRowError = namedtuple('ImportRowError', ['row', 'user_code', 'message'])
+ImportResult = namedtuple('ImportResult', ['created', 'errors'])
+
+
+class StudentImportError(ValueError):
+    """文件无法读取或缺少必需的列"""
+
+
+def _cell_text(value):
+    """单元格值转为文本：Excel 中的学号、电话常被存为数字"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def read_student_rows(file):
+    """逐行读取学生信息，返回 [(行号, {字段: 文本})]；跳过空行"""
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except (InvalidFileException, BadZipFile, KeyError, OSError) as exc:
+        raise StudentImportError('无法读取文件，请上传 .xlsx 格式的 Excel 文件！') from exc
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        columns = {}
+        for index, title in enumerate(header):
+            field = HEADER_FIELDS.get(_cell_text(title))
+            if field and field not in columns:
+                columns[field] = index
+        missing = [label for field, label in REQUIRED_FIELDS.items() if field not in columns]
+        if missing:
+            raise StudentImportError(f'表头缺少必需的列：{"、".join(missing)}')
+
+        result = []
+        for row_number, values in enumerate(rows, start=2):
+            data = {
+                field: _cell_text(values[index]) if index < len(values) else ''
+                for field, index in columns.items()
+            }
+            if not any(data.values()):
+                continue
+            if len(result) >= MAX_IMPORT_ROWS:
+                raise StudentImportError(f'单次最多导入 {MAX_IMPORT_ROWS} 名学生，请拆分文件后导入！')
+            result.append((row_number, data))
+        return result
+    finally:
+        workbook.close()
+
+
+def _row_error(data):
+    """单行字段校验，返回错误信息（无错误返回空字符串）"""
+    for field, label in REQUIRED_FIELDS.items():
+        if not data.get(field):
+            return f'缺少{label}'
+    if len(data['user_code']) > 20:
+        return '学号不能超过20个字符'
+    if len(data['name']) > 50:
+        return '姓名不能超过50个字符'
+    if len(data['department']) > 100:
+        return '所在学院不能超过100个字符'
+    if len(data.get('major', '')) > 50:
+        return '专业不能超过50个字符'
+    if not data['phone'].isdigit() or len(data['phone']) > 11:
+        return '联系电话格式不正确'
+    if data.get('gender') and data['gender'] not in GENDERS:
+        return '性别只能填写“男”或“女”'
+    return ''
+
+
+def existing_user_codes(user_codes):
+    """已注册的学号（用户信息或登录账号中已存在），每批一次查询"""
+    user_codes = list(user_codes)
+    existing = set()
+    for start in range(0, len(user_codes), LOOKUP_BATCH_SIZE):
+        batch = user_codes[start:start + LOOKUP_BATCH_SIZE]
+        existing.update(UserInfo.objects.filter(user_code__in=batch).order_by().values_list('user_code', flat=True))
+        existing.update(User.objects.filter(username__in=batch).values_list('username', flat=True))
+    return existing
+
+
+def validate_student_rows(rows):
+    """校验所有行，返回 (可导入的行, 错误列表)"""
+    errors = []
+    candidates = []
+    first_row = {}
+    for row_number, data in rows:
+        message = _row_error(data)
+        if not message and data['user_code'] in first_row:
+            message = f'学号与第 {first_row[data["user_code"]]} 行重复'
+        if message:
+            errors.append(ImportRowError(row_number, data.get('user_code', ''), message))
+            continue
+        first_row[data['user_code']] = row_number
+        candidates.append((row_number, data))
+
+    existing = existing_user_codes(first_row)
+    valid = []
+    for row_number, data in candidates:
+        if data['user_code'] in existing:
+            errors.append(ImportRowError(row_number, data['user_code'], '该学号已被注册'))
+        else:
+            valid.append((row_number, data))
+    errors.sort(key=lambda error: error.row)
+    return valid, errors
+
+
+def import_students(file, teacher, workers=None):
+    """
+    从 Excel 导入 teacher 指导的学生，默认密码为学号
+    返回 ImportResult(created=[新建的 UserInfo], errors=[ImportRowError])
+    """
+    valid, errors = validate_student_rows(read_student_rows(file))
+    if not valid:
+        return ImportResult([], errors)
+
+    passwords = hash_passwords([data['user_code'] for _, data in valid], workers=workers)
+    users = [
+        User(username=data['user_code'], password=password, first_name=data['name'], is_active=True)
+        for (_, data), password in zip(valid, passwords)
+    ]
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=500)
+            if any(user.pk is None for user in users):
+                # 数据库不支持批量插入后返回主键时，按用户名取回
+                ids = dict(User.objects.filter(username__in=[user.username for user in users])
+                           .values_list('username', 'id'))
+                for user in users:
+                    user.pk = ids[user.username]
+            students = []
+            for (_, data), user in zip(valid, users):
+                student = UserInfo(
+                    user_code=data['user_code'],
+                    name=data['name'],
+                    user_type='student',
+                    gender=data.get('gender') or '男',
+                    department=data['department'],
+                    phone=data['phone'],
+                    major=data.get('major') or None,
+                    is_active=True,
+                    auth_user=user,
+                )
+                student.set_advisor(teacher)
+                students.append(student)
+            UserInfo.objects.bulk_create(students, batch_size=500)
+    except IntegrityError:
+        # 校验之后有人同时注册了相同学号：整批回滚，提示重新导入
+        return ImportResult([], errors + [ImportRowError(0, '', '导入期间部分学号已被注册，请重新导入')])
+    return ImportResult(students, errors)
@@ -1,3 +1,231 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import tempfile
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from openpyxl import Workbook
+
+from user.directory import sync_directory
+from user.hashing import hash_passwords
+from user.models import UserInfo
+from user.student_import import StudentImportError, import_students
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+def make_workbook(rows, header=('学号', '姓名', '性别', '所在学院', '联系电话', '专业')):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    buffer = BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class StudentImportTestCase(TestCase):
+    """Excel 批量导入学生测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        teacher_user = User.objects.create_user(username='T001', password='T001')
+        self.teacher = UserInfo.objects.create(
+            user_code='T001', name='张老师', user_type='teacher', department='计算机学院',
+            phone='13800138001', auth_user=teacher_user
+        )
+        UserInfo.objects.create(
+            user_code='S0001', name='已注册', user_type='student', department='计算机学院', phone='13800138002'
+        )
+
+    def test_import_with_row_errors(self):
+        """测试合法行全部导入，问题行逐行报告"""
+        file = make_workbook([
+            (20230001, '李同学', '女', '计算机学院', 13800138003, '软件工程'),
+            ('20230002', '王同学', None, '计算机学院', '13800138004', None),
+            (None, None, None, None, None, None),
+            ('S0001', '重复', '男', '计算机学院', '13800138005', None),
+            ('20230001', '同号', '男', '计算机学院', '13800138006', None),
+            ('20230003', '', '男', '计算机学院', '13800138007', None),
+            ('20230004', '赵同学', '未知', '计算机学院', '13800138008', None),
+            ('20230005', '钱同学', '男', '计算机学院', '1380013800x', None),
+        ])
+        with self.assertNumQueries(6):  # 核对已注册学号 2 次 + 保存点 2 次 + 两次批量插入
+            result = import_students(file, self.teacher, workers=1)
+        self.assertEqual([student.user_code for student in result.created], ['20230001', '20230002'])
+        self.assertEqual([(error.row, error.message) for error in result.errors], [
+            (5, '该学号已被注册'),
+            (6, '学号与第 2 行重复'),
+            (7, '缺少姓名'),
+            (8, '性别只能填写“男”或“女”'),
+            (9, '联系电话格式不正确'),
+        ])
+        student = UserInfo.objects.get(user_code='20230001')
+        self.assertEqual(student.advisor_teacher, self.teacher)
+        self.assertEqual(student.advisor, '张老师')
+        self.assertEqual(student.phone, '13800138003')
+        self.assertTrue(student.auth_user.check_password('20230001'))
+
+    def test_missing_header(self):
+        """测试缺少必需列时整体报错"""
+        with self.assertRaises(StudentImportError):
+            import_students(make_workbook([], header=('学号', '姓名')), self.teacher)
+        with self.assertRaises(StudentImportError):
+            import_students(BytesIO(b'not an excel file'), self.teacher)
+
+    def test_parallel_hashing(self):
+        """测试进程池并行计算的哈希与原顺序一致"""
+        raw_passwords = [f'pw{index}' for index in range(10)]
+        hashes = hash_passwords(raw_passwords, workers=2)
+        user = User(username='x')
+        for raw, encoded in zip(raw_passwords, hashes):
+            user.password = encoded
+            self.assertTrue(user.check_password(raw))
+
+    def test_import_view(self):
+        """测试教师上传页面"""
+        self.client.login(username='T001', password='T001')
+        upload = SimpleUploadedFile(
+            'students.xlsx', make_workbook([('20230009', '孙同学', '男', '计算机学院', '13800138009', '')]).read()
+        )
+        response = self.client.post('/user/student/import/', {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(UserInfo.objects.filter(user_code='20230009', advisor_teacher=self.teacher).exists())
+
+
+class DirectorySyncTestCase(TestCase):
+    """校园人员目录同步测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        self.rows = [
+            {'user_code': 'T100', 'name': '张老师', 'user_type': 'teacher', 'department': '计算机学院',
+             'phone': '13800138001', 'title': '教授'},
+            {'user_code': 'S100', 'name': '李同学', 'user_type': 'student', 'department': '计算机学院',
+             'phone': '13800138002', 'gender': '女', 'major': '软件工程', 'advisor_code': 'T100'},
+            {'user_code': 'S101', 'name': '王同学', 'user_type': 'student', 'department': '计算机学院'},
+        ]
+
+    def entries(self, rows):
+        return list(enumerate(rows, start=1))
+
+    def test_incremental_sync(self):
+        """测试首次全部写入，再次同步只更新有变化的行"""
+        result = sync_directory(self.entries(self.rows))
+        self.assertEqual((result.created, result.updated, result.unchanged), (3, 0, 0))
+        student = UserInfo.objects.get(user_code='S100')
+        self.assertEqual(student.advisor_teacher.user_code, 'T100')
+        self.assertEqual(student.advisor, '张老师')
+        self.assertIsNone(UserInfo.objects.get(user_code='S101').major)
+
+        self.rows[2]['phone'] = '13800138003'
+        with self.assertNumQueries(4):  # 读取已有用户 + 保存点 2 次 + 一次批量更新
+            result = sync_directory(self.entries(self.rows))
+        self.assertEqual((result.created, result.updated, result.unchanged), (0, 1, 2))
+        self.assertEqual(UserInfo.objects.get(user_code='S101').phone, '13800138003')
+
+    def test_row_errors_and_deactivate_missing(self):
+        """测试错误行报告与禁用目录中已移除的人员"""
+        sync_directory(self.entries(self.rows))
+        UserInfo.objects.create(user_code='E001', name='校外', user_type='external', department='公司', phone='1')
+        rows = self.rows[:2] + [
+            {'user_code': 'S102', 'name': '', 'user_type': 'student', 'department': '计算机学院'},
+            {'user_code': 'X1', 'name': '某人', 'user_type': 'external', 'department': '公司'},
+            {'user_code': 'T100', 'name': '重复', 'user_type': 'teacher', 'department': '计算机学院'},
+        ]
+        result = sync_directory(self.entries(rows), deactivate_missing=True)
+        self.assertEqual([(error.line, error.message) for error in result.errors], [
+            (3, '缺少字段 name'), (4, '人员类型无效：external'), (5, '编号与第 1 行重复'),
+        ])
+        self.assertEqual(result.deactivated, 1)
+        self.assertFalse(UserInfo.objects.get(user_code='S101').is_active)
+        self.assertTrue(UserInfo.objects.get(user_code='E001').is_active)
+
+    def test_reactivates_returning_users(self):
+        """测试被禁用的人员重新出现在目录中（行未变化）时恢复借用资格与登录账号"""
+        sync_directory(self.entries(self.rows))
+        account = User.objects.create_user(username='S101', password='pw123456')
+        UserInfo.objects.filter(user_code='S101').update(auth_user=account)
+        result = sync_directory(self.entries(self.rows[:2]), deactivate_missing=True)
+        self.assertEqual(result.deactivated, 1)
+        account.refresh_from_db()
+        self.assertFalse(account.is_active)
+
+        result = sync_directory(self.entries(self.rows), deactivate_missing=True)
+        self.assertEqual((result.created, result.updated, result.unchanged, result.deactivated), (0, 1, 2, 0))
+        self.assertTrue(UserInfo.objects.get(user_code='S101').is_active)
+        account.refresh_from_db()
+        self.assertTrue(account.is_active)
+
+    def test_command_and_registration_claim(self):
+        """测试命令读取 JSONL 文件，目录中的人员凭姓名与认领码在注册页认领"""
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'directory.jsonl')
+            with open(path, 'w', encoding='utf-8') as file:
+                for row in self.rows:
+                    file.write(json.dumps(row, ensure_ascii=False) + '\n')
+            out = StringIO()
+            call_command('sync_directory', path, stdout=out)
+            self.assertIn('新增 3 人', out.getvalue())
+            # 管理员为目录中的人员生成认领码
+            codes_path = os.path.join(folder, 'codes.csv')
+            call_command('issue_claim_codes', 'S101', output=codes_path, stdout=StringIO())
+            with open(codes_path, encoding='utf-8-sig') as file:
+                claim_code = list(csv.reader(file))[1][3]
+
+        form_data = {
+            'user_code': 'S101', 'name': '王同学', 'gender': '男', 'user_type': 'student',
+            'department': '计算机学院', 'phone': '13800138009', 'password': 'pw123456', 'confirm_password': 'pw123456',
+            'claim_code': claim_code,
+        }
+        for wrong in ({'name': '冒名'}, {'claim_code': ''}, {'claim_code': 'ABCDEFGHJK'}):
+            response = self.client.post('/user/register/', dict(form_data, **wrong))
+            self.assertEqual(response.status_code, 200)
+        self.assertFalse(User.objects.filter(username='S101').exists())
+        response = self.client.post('/user/register/', dict(form_data, claim_code=claim_code.lower()))
+        self.assertEqual(response.status_code, 302)
+        student = UserInfo.objects.get(user_code='S101')
+        self.assertEqual(student.auth_user.username, 'S101')
+        self.assertEqual(student.phone, '13800138009')
+        self.assertIsNone(student.claim_code_hash)
+        self.assertEqual(UserInfo.objects.filter(user_code='S101').count(), 1)
+
+    def test_disabled_records_cannot_be_claimed(self):
+        """测试目录同步已禁用的人员不能在注册页认领"""
+        from user.claims import issue_claim_codes
+
+        sync_directory(self.entries(self.rows))
+        sync_directory(self.entries(self.rows[:2]), deactivate_missing=True)
+        [(_, claim_code)] = issue_claim_codes([UserInfo.objects.get(user_code='S101')])
+        response = self.client.post('/user/register/', {
+            'user_code': 'S101', 'name': '王同学', 'gender': '男', 'user_type': 'student',
+            'department': '计算机学院', 'phone': '13800138009', 'password': 'pw123456', 'confirm_password': 'pw123456',
+            'claim_code': claim_code,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '借用资格已被禁用')
+        self.assertFalse(User.objects.filter(username='S101').exists())
+        self.assertIsNone(UserInfo.objects.get(user_code='S101').auth_user)
+
+    def test_manual_records_cannot_be_claimed(self):
+        """测试系统内添加、没有登录账号的人员不能在注册页认领"""
+        UserInfo.objects.create(
+            user_code='S200', name='赵同学', user_type='student', department='计算机学院', phone='13800138010'
+        )
+        response = self.client.post('/user/register/', {
+            'user_code': 'S200', 'name': '赵同学', 'gender': '男', 'user_type': 'student',
+            'department': '计算机学院', 'phone': '13800138011', 'password': 'pw123456', 'confirm_password': 'pw123456',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '请联系管理员开通账号')
+        self.assertFalse(User.objects.filter(username='S200').exists())
+        with tempfile.TemporaryDirectory() as folder:
+            with self.assertRaises(CommandError):
+                call_command('issue_claim_codes', 'S200', output=os.path.join(folder, 'codes.csv'))
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from . import views
-from booking.views import booking_apply, cancel_booking, my_booking, device_booking_detail, check_availability
+from booking.views import booking_apply, booking_series_apply, cancel_booking, my_booking, device_booking_detail, check_availability, suggest_slots, advisor_approval, approval_inbox_api, device_typeahead
 
 urlpatterns = [
     # 普通用户首页
@@ -11,8 +11,18 @@ urlpatterns = [
     path('device/booking/<int:device_id>/', device_booking_detail, name='device_booking_detail'),
     # 预约申请页
     path('booking/apply/', booking_apply, name='booking_apply'),
+    # 预约表单的设备输入联想接口（JSON）
+    path('booking/devices/', device_typeahead, name='device_typeahead'),
+    # 周期预约申请页
+    path('booking/series/', booking_series_apply, name='booking_series_apply'),
     # 查询空闲状态
     path('check-availability/', check_availability, name='check_availability'),
+    # 推荐空闲时段
+    path('suggest-slots/', suggest_slots, name='suggest_slots'),
+    # 指导教师审批学生预约
+    path('booking/advisor/', advisor_approval, name='advisor_approval'),
+    # 审批收件箱接口（JSON）
+    path('booking/inbox/', approval_inbox_api, name='approval_inbox_api'),
     # 我的预约页
     path('booking/my/', my_booking, name='my_booking'),
     # 删除预约
@@ -29,4 +39,6 @@ urlpatterns = [
     # 教师新增学生
     path('student/add/', views.add_student, name='add_student'),  # 第一步
     path('student/add/full/', views.add_student_full, name='add_student_full'),  # 第二步
+    # 教师通过 Excel 批量导入学生
+    path('student/import/', views.import_student_excel, name='import_students'),
 ]
\ No newline at end of file
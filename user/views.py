@@ -15,6 +15,7 @@ from django.contrib import messages
 from booking.models import Booking, ApprovalRecord
 from user.models import UserInfo
 from devices.models import Device
+from devices.catalog import catalog_from_request
 
 from .forms import RegistrationForm
 from django.contrib.auth.models import User
@@ -22,7 +23,8 @@ from django.contrib.auth.hashers import make_password
 
 from django.contrib.auth.decorators import user_passes_test
 # 添加 StudentForm
-from .forms import UserInfoForm, RegistrationForm, StudentForm, StudentIdForm
+from .forms import UserInfoForm, RegistrationForm, StudentForm, StudentIdForm, StudentImportForm
+from .student_import import StudentImportError, import_students
 
 
 
@@ -36,12 +38,12 @@ def user_profile(request):
         messages.error(request, '未找到你的个人信息，请联系管理员！')
         return redirect('user_home')
     
-    # 教师用户：获取指导的学生列表（按advisor字段精确匹配）
+    # 教师用户：获取指导的学生列表（按指导教师外键关联）
     advisor_students = []
     if user_info.user_type == 'teacher':
         advisor_students = UserInfo.objects.filter(
             user_type='student', 
-            advisor=user_info.name  # 精确匹配教师姓名
+            advisor_teacher=user_info
         )
     
     # 处理表单提交
@@ -55,7 +57,9 @@ def user_profile(request):
         # 更新不同用户类型的专属字段
         if user_info.user_type == 'student':
             user_info.major = request.POST.get('major')
-            user_info.advisor = request.POST.get('advisor')
+            # 已由教师关联的指导教师以外键为准，不随手填姓名修改
+            if not user_info.advisor_teacher_id:
+                user_info.advisor = request.POST.get('advisor')
         elif user_info.user_type == 'teacher':
             user_info.title = request.POST.get('title')
             user_info.research_field = request.POST.get('research_field')
@@ -132,24 +136,15 @@ def device_list(request):
     用户端设备查询视图
     对应路径：/user/device/list/
     """
-    # 1. 处理搜索逻辑
-    keyword = request.GET.get('keyword', '')
-    # 基础查询：获取所有设备（按编号排序）
-    devices = Device.objects.all().order_by('device_code')
-    
-    # 如果有搜索关键词，过滤结果
-    if keyword:
-        devices = devices.filter(
-            Q(device_code__icontains=keyword) |  # 按设备编号搜索
-            Q(model__icontains=keyword) |        # 按型号搜索
-            Q(manufacturer__icontains=keyword) | # 按厂商搜索
-            Q(purpose__icontains=keyword)        # 按实验用途搜索
-        )
-
-    # 2. 准备上下文数据
+    # 分页 + 分面查询（分面计数来自按数据版本缓存的一次分组统计）
+    catalog = catalog_from_request(request)
     context = {
-        'devices': devices,
-        'keyword': keyword,  # 回显搜索关键词
+        'devices': catalog.page_obj,
+        'page_obj': catalog.page_obj,
+        'facets': catalog.facets,
+        'filters': catalog.filters,
+        'total': catalog.total,
+        'keyword': request.GET.get('keyword', '').strip(),  # 回显搜索关键词
     }
     return render(request, 'user/device_list.html', context)
 
@@ -178,6 +173,18 @@ def register_view(request):
                     is_active=True  # 默认激活
                 )
                 
+                # 目录同步或历史台账导入的人员：认领已有记录（类型、学院以已有信息为准），只补充联系方式
+                if form.directory_user:
+                    user_info = form.directory_user
+                    user_info.auth_user = user
+                    user_info.gender = gender
+                    user_info.phone = phone
+                    # 认领码只能使用一次
+                    user_info.claim_code_hash = None
+                    user_info.save(update_fields=['auth_user', 'gender', 'phone', 'claim_code_hash', 'update_time'])
+                    messages.success(request, f'注册成功！请使用用户编号 {user_code} 登录')
+                    return redirect('user_login')
+
                 # 2. 创建UserInfo记录
                 user_info = UserInfo.objects.create(
                     user_code=user_code,
@@ -243,7 +250,7 @@ def add_student(request):
                 
                 if existing_student.user_type == 'student':
                     # 如果学生已存在，直接更新指导教师
-                    existing_student.advisor = teacher_info.name
+                    existing_student.set_advisor(teacher_info)
                     existing_student.save()
                     
                     messages.success(request, f'学生 {existing_student.name} 已注册，成功添加！')
@@ -303,6 +310,7 @@ def add_student_full(request):
                 student.auth_user = user
                 student.user_type = 'student'
                 student.is_active = True
+                student.set_advisor(teacher_info)
                 student.save()
                 
                 # 3. 清除session
@@ -328,6 +336,36 @@ def add_student_full(request):
     }
     return render(request, 'user/add_student_step2.html', context)
 
+@login_required
+@teacher_required
+def import_student_excel(request):
+    """教师通过 Excel 批量导入指导学生"""
+    teacher_info = UserInfo.objects.get(auth_user=request.user)
+    result = None
+
+    if request.method == 'POST':
+        form = StudentImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                result = import_students(form.cleaned_data['file'], teacher_info)
+            except StudentImportError as e:
+                messages.error(request, str(e))
+            else:
+                if result.created:
+                    messages.success(request, f'成功导入 {len(result.created)} 名学生！')
+                if result.errors:
+                    messages.warning(request, f'{len(result.errors)} 行未导入，请根据下方提示修改后重新导入。')
+    else:
+        form = StudentImportForm()
+
+    context = {
+        'form': form,
+        'title': '批量导入学生',
+        'teacher_info': teacher_info,
+        'result': result,
+    }
+    return render(request, 'user/import_students.html', context)
+
 @login_required
 @teacher_required
 def edit_student(request, student_id):
@@ -340,7 +378,7 @@ def edit_student(request, student_id):
         UserInfo, 
         id=student_id, 
         user_type='student',
-        advisor=teacher_info.name  # 确保学生是当前教师指导的
+        advisor_teacher=teacher_info  # 确保学生是当前教师指导的
     )
     
     if request.method == 'POST':
@@ -383,13 +421,13 @@ def remove_student(request, student_id):
         UserInfo, 
         id=student_id, 
         user_type='student',
-        advisor=teacher_info.name
+        advisor_teacher=teacher_info
     )
     
     if request.method == 'POST':
         try:
-            # 清除指导教师字段（软删除）
-            student.advisor = ''
+            # 清除指导教师关联（软删除）
+            student.set_advisor(None)
             student.save()
             
             messages.success(request, f'已移除学生 {student.name}')